@@ -1,23 +1,27 @@
-import requests
-import pandas as pd
+import logging
+
 from datetime import datetime
 import re  # already imported in your code
 
+from diagnostics import configure_logging, count, get_logger, trace_selection
+from edgar_client import get_company_facts
+from facts_stream import wanted_facts
+from profiling import configure_profiling, stage
+from settings import HEADERS, year_window
+from statement_matrix import StatementBuilder, StatementMatrix, item_axis
+from taxonomies import company_facts_view
+
+log = get_logger("income_statement")
+
 CIK = "0000002488"  # AMD CIK ( CIK here is AMD)
-BASE_URL = "https://data.sec.gov"
-HEADERS = {"User-Agent": "Use your email address"}
 
 ANNUAL_FORMS = {"10-K", "10-K/A", "20-F", "20-F/A", "40-F", "40-F/A"}
 
 def get_xbrl_data():
-    url = f"{BASE_URL}/api/xbrl/companyfacts/CIK{CIK}.json"
-    response = requests.get(url, headers=HEADERS)
-    if response.status_code == 200:
-        data = response.json()
-        return data["facts"]["us-gaap"] if "facts" in data and "us-gaap" in data["facts"] else {}
-    else:
-        print(f"Error: {response.status_code}")
-        return {}
+    # Cached, throttled and retried fetch: one download per CIK per day across all three statements
+    data = get_company_facts(CIK, headers=HEADERS, wanted=wanted_facts(INCOME_TAGS))
+    # All taxonomies of the one decoded document: us-gaap first, ifrs-full / dei fallbacks
+    return company_facts_view(data)
 
 def get_duration_days(entry):
     start = entry.get("start")
@@ -90,221 +94,197 @@ def is_annual_fact(entry):
 
     return False
 
+INCOME_TAGS = {
+    # Revenue Section
+    "Revenues": ("Total Net Revenues", "USD", "Revenues"),
+    "SalesRevenueNet": ("Net Sale revenue (Legacy) ", "USD", "Revenues"), # Ignore this value if a value exists in Total Revenue' 
+    "RevenueFromContractWithCustomerExcludingAssessedTax": ("Total Revenues", "USD", "Revenues"),
+
+    # Cost of Revenue Section
+    "FloorBrokerageExchangeAndClearanceFees": ("Brokerage and Transaction", "USD", "COR"),
+    "CostOfGoodsAndServicesSold": ("CostOfGoodsAndServicesSold","USD", "COR"),
+    "CostOfRevenue":("CostOfRevenue", "USD","COR"),
+
+    # Operating Expense Section
+    "AdvertisingExpense": ("Advertising Expense", "USD", "Operating Expenses"),
+    "AllocatedShareBasedCompensationExpense": ("Employee Stock Pay Cost", "USD", "Operating Expenses"),
+    "ResearchAndDevelopmentExpense": ("Research and Development", "USD", "Operating Expenses"),
+    "CapitalizedComputerSoftwareAmortization1": ("Software Amortization", "USD", "Operating Expenses"),
+    "MarketingExpense": ("Marketing", "USD", "Operating Expenses"),
+    "SellingGeneralAndAdministrativeExpense": ("SG&A", "USD", "Operating Expenses"),
+    "GeneralAndAdministrativeExpense": ("General and Administrative", "USD", "Operating Expenses"),
+    "Depreciation": ("Depreciation", "USD", "Operating Expenses"),
+    "OtherCostAndExpenseOperating": ("Other Operating Expenses", "USD", "Operating Expenses"),
+    "ShareBasedCompensation": ("Share-Based Compensation", "USD", "Operating Expenses"),
+    "ShortTermLeaseCost": ("Short-Term Lease Cost", "USD", "Operating Expenses"),
+    "OperatingExpenses": ("Total Operating Expenses", "USD", "Operating Expenses"),
+
+    # Non-Operating Expenses Section
+    "InterestExpenseBorrowings": ("Interest Expense", "USD", "NonOperatingExpense"),
+    "InterestExpense": ("Total Interest Expense", "USD", "NonOperatingExpense"),
+    "InterestExpenseDebt": ("interest paid towrds debt", "USD", "NonOperatingExpense"),
+    "InterestIncomeExpenseNet": ("Net Interest Expense", "USD", "NonOperatingExpense"),
+    "OtherNonoperatingIncomeExpense": ("Other Non-Operating Income (Expense)", "USD", "NonOperatingExpense"),
+    "ContractWithCustomerAssetCreditLossExpense": ("Credit Loss Expense", "USD", "NonOperatingExpense"),
+    "AmortizationOfIntangibleAssets": ("Amortization of Intangible Assets", "USD", "NonOperatingExpense"),
+    "ProvisionForDoubtfulAccounts": ("Provision for Doubtful Accounts", "USD", "NonOperatingExpense"),
+    "DepreciationDepletionAndAmortization": ("Depreciation and Amortization", "USD", "NonOperatingExpense"),
+
+    # Income Before Tax Section
+    "IncomeLossFromContinuingOperationsBeforeIncomeTaxesMinorityInterestAndIncomeLossFromEquityMethodInvestments": (
+        "Income Before Equity Investments, Taxes, and Noncontrolling Interest", "USD", "Income Before Tax"
+    ),
+    "IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest": (
+        "Income Before Tax", "USD", "Income Before Tax"
+    ),
+
+    # Income Taxes Section
+    "CurrentIncomeTaxExpenseBenefit": ("Current Income Tax Expense (Benefit)", "USD", "Income Taxes"),
+    "CurrentFederalTaxExpenseBenefit": ("Federal Income Tax Expense (Benefit)", "USD", "Income Taxes"),
+    "CurrentForeignTaxExpenseBenefit": ("Foreign Income Tax Expense (Benefit)", "USD", "Income Taxes"),
+    "CurrentStateAndLocalTaxExpenseBenefit": ("State and Local Income Tax Expense (Benefit)", "USD", "Income Taxes"),
+    "DeferredIncomeTaxExpenseBenefit": ("Deferred Income Tax Expense (Benefit)", "USD", "Income Taxes"),
+    "IncomeTaxExpenseBenefit": ("Provision for Income Taxes", "USD", "Income Taxes"),
+
+    # Net Income Section
+    "NetIncomeLoss": ("Net Income (Loss)", "USD", "Net Income"),
+    "NetIncomeLossAvailableToCommonStockholdersBasic": ("Net Income (Loss) Attributable to Common Stockholders (Basic)", "USD", "Net Income"),
+    "NetIncomeLossAvailableToCommonStockholdersDiluted": ("Net Income (Loss) Attributable to Common Stockholders (Diluted)", "USD", "Net Income"),
+
+    # Per Share Metrics Section
+    "EarningsPerShareBasic": ("Earnings Per Share (Basic)", "pure", "Per Share Metrics"),
+    "EarningsPerShareDiluted": ("Earnings Per Share (Diluted)", "pure", "Per Share Metrics"),
+    "WeightedAverageNumberOfSharesOutstandingBasic": ("Weighted-Average Shares (Basic)", "shares", "Per Share Metrics"),
+    "WeightedAverageNumberOfDilutedSharesOutstanding": ("Weighted-Average Shares (Diluted)", "shares", "Per Share Metrics")
+}
+
+INCOME_CATEGORIES = [
+    "Revenues",
+    "COR",
+    "Operating Expenses",
+    "NonOperatingExpense",
+    "Income Before Tax",
+    "Income Taxes",
+    "Net Income",
+    "Per Share Metrics"
+]
+
+# Fixed line-item axis of the statement matrix (categories in order, labels sorted within each)
+ITEMS = item_axis(INCOME_TAGS, INCOME_CATEGORIES)
+
+def select_annual_entries(entries, unit):
+    """
+    Pick the best annual fact per year out of one tag/unit entry list.
+    Returns {year: info} where info carries the value plus the form/frame/period
+    details it was chosen on.
+    """
+    annual_by_year = {}
+    first_year, last_year = year_window()
+
+    for entry in entries:
+        if not is_annual_fact(entry):
+            continue
+
+        year = get_entry_year(entry)
+        if year is None or not (first_year <= year <= last_year):
+            continue
+
+        value = entry["val"] / 1_000_000 if unit == "USD" else entry["val"]
+        duration_days = get_duration_days(entry)
+
+        prev = annual_by_year.get(year)
+
+        # Simple quality score: prefer FY, then 4 qtrs, then longer duration
+        fp = (entry.get("fp") or "").upper()
+        qtrs = entry.get("qtrs")
+        try:
+            qtrs_int = int(qtrs) if qtrs is not None else 0
+        except (ValueError, TypeError):
+            qtrs_int = 0
+
+        form = entry.get("form", "")
+        score = (
+            1 if fp == "FY" else 0,
+            1 if form in ANNUAL_FORMS else 0,
+            qtrs_int,
+            duration_days
+        )
+
+        if prev is None or score > prev["score"]:
+            annual_by_year[year] = {
+                "value": value,
+                "form": form,
+                "start": entry.get("start"),
+                "end": entry.get("end"),
+                "frame": entry.get("frame"),
+                "qtrs": entry.get("qtrs"),
+                "fp": fp,
+                "duration_days": duration_days,
+                "score": score,
+            }
+
+    return annual_by_year
+
 def extract_income_data(xbrl_data):
-    income_tags = {
-        # Revenue Section
-        "Revenues": ("Total Net Revenues", "USD", "Revenues"),
-        "SalesRevenueNet": ("Net Sale revenue (Legacy) ", "USD", "Revenues"), # Ignore this value if a value exists in Total Revenue' 
-        "RevenueFromContractWithCustomerExcludingAssessedTax": ("Total Revenues", "USD", "Revenues"),
-
-        # Cost of Revenue Section
-        "FloorBrokerageExchangeAndClearanceFees": ("Brokerage and Transaction", "USD", "COR"),
-        "CostOfGoodsAndServicesSold": ("CostOfGoodsAndServicesSold","USD", "COR"),
-        "CostOfRevenue":("CostOfRevenue", "USD","COR"),
-
-        # Operating Expense Section
-        "AdvertisingExpense": ("Advertising Expense", "USD", "Operating Expenses"),
-        "AllocatedShareBasedCompensationExpense": ("Employee Stock Pay Cost", "USD", "Operating Expenses"),
-        "ResearchAndDevelopmentExpense": ("Research and Development", "USD", "Operating Expenses"),
-        "CapitalizedComputerSoftwareAmortization1": ("Software Amortization", "USD", "Operating Expenses"),
-        "MarketingExpense": ("Marketing", "USD", "Operating Expenses"),
-        "SellingGeneralAndAdministrativeExpense": ("SG&A", "USD", "Operating Expenses"),
-        "GeneralAndAdministrativeExpense": ("General and Administrative", "USD", "Operating Expenses"),
-        "Depreciation": ("Depreciation", "USD", "Operating Expenses"),
-        "OtherCostAndExpenseOperating": ("Other Operating Expenses", "USD", "Operating Expenses"),
-        "ShareBasedCompensation": ("Share-Based Compensation", "USD", "Operating Expenses"),
-        "ShortTermLeaseCost": ("Short-Term Lease Cost", "USD", "Operating Expenses"),
-        "OperatingExpenses": ("Total Operating Expenses", "USD", "Operating Expenses"),
-
-        # Non-Operating Expenses Section
-        "InterestExpenseBorrowings": ("Interest Expense", "USD", "NonOperatingExpense"),
-        "InterestExpense": ("Total Interest Expense", "USD", "NonOperatingExpense"),
-        "InterestExpenseDebt": ("interest paid towrds debt", "USD", "NonOperatingExpense"),
-        "InterestIncomeExpenseNet": ("Net Interest Expense", "USD", "NonOperatingExpense"),
-        "OtherNonoperatingIncomeExpense": ("Other Non-Operating Income (Expense)", "USD", "NonOperatingExpense"),
-        "ContractWithCustomerAssetCreditLossExpense": ("Credit Loss Expense", "USD", "NonOperatingExpense"),
-        "AmortizationOfIntangibleAssets": ("Amortization of Intangible Assets", "USD", "NonOperatingExpense"),
-        "ProvisionForDoubtfulAccounts": ("Provision for Doubtful Accounts", "USD", "NonOperatingExpense"),
-        "DepreciationDepletionAndAmortization": ("Depreciation and Amortization", "USD", "NonOperatingExpense"),
-
-        # Income Before Tax Section
-        "IncomeLossFromContinuingOperationsBeforeIncomeTaxesMinorityInterestAndIncomeLossFromEquityMethodInvestments": (
-            "Income Before Equity Investments, Taxes, and Noncontrolling Interest", "USD", "Income Before Tax"
-        ),
-        "IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest": (
-            "Income Before Tax", "USD", "Income Before Tax"
-        ),
-
-        # Income Taxes Section
-        "CurrentIncomeTaxExpenseBenefit": ("Current Income Tax Expense (Benefit)", "USD", "Income Taxes"),
-        "CurrentFederalTaxExpenseBenefit": ("Federal Income Tax Expense (Benefit)", "USD", "Income Taxes"),
-        "CurrentForeignTaxExpenseBenefit": ("Foreign Income Tax Expense (Benefit)", "USD", "Income Taxes"),
-        "CurrentStateAndLocalTaxExpenseBenefit": ("State and Local Income Tax Expense (Benefit)", "USD", "Income Taxes"),
-        "DeferredIncomeTaxExpenseBenefit": ("Deferred Income Tax Expense (Benefit)", "USD", "Income Taxes"),
-        "IncomeTaxExpenseBenefit": ("Provision for Income Taxes", "USD", "Income Taxes"),
-
-        # Net Income Section
-        "NetIncomeLoss": ("Net Income (Loss)", "USD", "Net Income"),
-        "NetIncomeLossAvailableToCommonStockholdersBasic": ("Net Income (Loss) Attributable to Common Stockholders (Basic)", "USD", "Net Income"),
-        "NetIncomeLossAvailableToCommonStockholdersDiluted": ("Net Income (Loss) Attributable to Common Stockholders (Diluted)", "USD", "Net Income"),
-
-        # Per Share Metrics Section
-        "EarningsPerShareBasic": ("Earnings Per Share (Basic)", "pure", "Per Share Metrics"),
-        "EarningsPerShareDiluted": ("Earnings Per Share (Diluted)", "pure", "Per Share Metrics"),
-        "WeightedAverageNumberOfSharesOutstandingBasic": ("Weighted-Average Shares (Basic)", "shares", "Per Share Metrics"),
-        "WeightedAverageNumberOfDilutedSharesOutstanding": ("Weighted-Average Shares (Diluted)", "shares", "Per Share Metrics")
-    }
-
-    income_data = {
-        "Revenues":{},
-        "COR":{},
-        "Operating Expenses":{},
-        "NonOperatingExpense":{},
-        "Income Before Tax":{},
-        "Income Taxes":{},
-        "Net Income":{},
-        "Per Share Metrics":{}
-    }
-
-    for tag, (label, unit, category) in income_tags.items():
+
+    first_year, last_year = year_window()
+    income_data = StatementBuilder(ITEMS, range(first_year, last_year + 1), INCOME_CATEGORIES, "IS")
+
+    for tag, (label, unit, category) in INCOME_TAGS.items():
         if tag not in xbrl_data:
-            print(f"Tag {tag} not found in XBRL data.")
+            count("IS", "tags_missing")
+            log.debug("Tag %s not found in XBRL data.", tag)
             continue
 
+        count("IS", "tags_found")
         units = xbrl_data[tag]["units"]
-        print(f"\nChecking tag '{tag}' – Available units: {list(units.keys())}, expected: '{unit}'")
         if unit not in units:
-            print(f"Tag {tag} does not have expected unit '{unit}'. Available units: {list(units.keys())}")
+            count("IS", "units_missing")
+            log.debug("Tag %s does not have expected unit '%s'. Available units: %s", tag, unit, list(units))
             continue
 
         entries = units[unit]
-        annual_by_year = {}
-
-        for entry in entries:
-            if not is_annual_fact(entry):
-                continue
-
-            year = get_entry_year(entry)
-            if year is None or not (2014 <= year <= 2025):
-                continue
-
-            value = entry["val"] / 1_000_000 if unit == "USD" else entry["val"]
-            duration_days = get_duration_days(entry)
-
-            prev = annual_by_year.get(year)
-
-            # Simple quality score: prefer FY, then 4 qtrs, then longer duration
-            fp = (entry.get("fp") or "").upper()
-            qtrs = entry.get("qtrs")
-            try:
-                qtrs_int = int(qtrs) if qtrs is not None else 0
-            except (ValueError, TypeError):
-                qtrs_int = 0
-
-            form = entry.get("form", "")
-            score = (
-                1 if fp == "FY" else 0,
-                1 if form in ANNUAL_FORMS else 0,
-                qtrs_int,
-                duration_days
-            )
-
-            if prev is None or score > prev["score"]:
-                annual_by_year[year] = {
-                    "value": value,
-                    "form": form,
-                    "start": entry.get("start"),
-                    "end": entry.get("end"),
-                    "frame": entry.get("frame"),
-                    "qtrs": entry.get("qtrs"),
-                    "fp": fp,
-                    "duration_days": duration_days,
-                    "score": score,
-                }
+        annual_by_year = select_annual_entries(entries, unit)
+        count("IS", "facts_scanned", len(entries))
+        count("IS", "facts_kept", len(annual_by_year))
+        trace_selection("IS", tag, label, category, annual_by_year)
 
         if annual_by_year:
-            if label not in income_data[category]:
-                income_data[category][label] = {}
             for year, info in sorted(annual_by_year.items()):
-                income_data[category][label][year] = info["value"]
-                print(
-                    f"Tag: {tag}, Label: {label}, Category: {category} -> "
-                    f"Year: {year}, Form: {info['form']}, fp: {info['fp']}, "
-                    f"Frame: {info['frame']}, qtrs: {info['qtrs']}, "
-                    f"Start: {info['start']}, End: {info['end']}, "
-                    f"Duration: {info['duration_days']} days, "
-                    f"Value (millions if USD): {info['value']}"
-                )
+                income_data.set(category, label, year, info["value"])
+            log.debug("Tag %s -> %s / %s: %d year(s) from %d fact(s)",
+                      tag, category, label, len(annual_by_year), len(entries))
         else:
-            print(f"  No annual entries found for tag {tag} with unit {unit} in 2014–2025.")
+            log.debug("No annual entries found for tag %s with unit %s in %d-%d.", tag, unit, *year_window())
 
-    return income_data
+    return income_data.build()
 
 
 def create_dataframe(income_data):
-    # Collect all unique years across all categories and items
-    years = set()
-    for category, items in income_data.items():
-        for label, year_data in items.items():
-            years.update(year_data.keys())
-    years = sorted(years)  # Sort years in ascending order
-
-    # Define the order of categories
-    category_order = [
-        "Revenues",
-        "COR",
-        "Operating Expenses",
-        "NonOperatingExpense",
-        "Income Before Tax",
-        "Income Taxes",
-        "Net Income",
-        "Per Share Metrics"
-    ]
-    
-
-    # List to hold sub-DataFrames for each category
-    dfs = []
-
-    # Build a sub-DataFrame for each category
-    for category in category_order:
-        if category in income_data and income_data[category]:  # Check if category has data
-            # Create a section header row
-            header_row = pd.DataFrame([[f"**{category}**", "" ] + [None] * len(years)],
-                                      columns=["Category", "Item"] + years)
-
-            # Build data for items in this category
-            category_data = []
-            for label in sorted(income_data[category].keys()):  # Sort labels alphabetically for consistency
-                row = [label] + [income_data[category][label].get(year, None) for year in years]
-                category_data.append(row)
-
-            # Create a sub-DataFrame for the items in this category
-            category_df = pd.DataFrame(category_data, columns=["Item"] + years)
-
-            # Concatenate the header and the category items
-            dfs.extend([header_row, category_df])
-
-    # Concatenate all sub-DataFrames vertically
-    final_df = pd.concat(dfs, ignore_index=True)
-
-    return final_df
+    # One frame in statement order: a "**category**" header row, then the category's line items
+    # (labels sorted alphabetically for consistency), one column per year with data
+    return StatementMatrix.coerce(income_data, ITEMS, INCOME_CATEGORIES, "IS").presentation_frame()
 
 def save_to_csv(df, filename):
     df.to_csv(filename, index=False)
-    print(f"Data saved to {filename}")
+    log.info("Data saved to %s", filename)
 
 if __name__ == "__main__":
+    configure_logging()
+    configure_profiling()
     xbrl_data = get_xbrl_data()
-    income_data = extract_income_data(xbrl_data)
-    print("\nExtracted Income Data (2014-2025, annual forms only, in millions where USD):")
-    for category, items in income_data.items():
-        print(f"\nCategory: {category}")
-        for label, years in items.items():
-            print(f"  {label}: {dict(sorted(years.items()))}")
-    
-    df = create_dataframe(income_data)
-    print("\nDataFrame:")
-    print(df)
+    with stage("select", CIK) as s:
+        income_data = extract_income_data(xbrl_data)
+        s["items"] = len(xbrl_data)
+    if log.isEnabledFor(logging.DEBUG):
+        for category, items in income_data.items():
+            for label, years in items.items():
+                log.debug("%s / %s: %s", category, label, dict(sorted(years.items())))
+
+    with stage("frame", CIK) as s:
+        df = create_dataframe(income_data)
+        s["items"] = len(df)
+    log.debug("DataFrame:\n%s", df)
 
     # DYNAMIC FILENAME LOGIC
     dynamic_filename = f"{CIK}_Income_Statement.csv"
@@ -1,17 +1,30 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from annual_selection import extract_statements_from_facts
+from concept_index import concept_frame, concept_panel, concept_tags, concepts_for_view
+from diagnostics import configure_logging, get_logger
+from edgar_client import get_company_facts
+from fact_store import FACT_STORE_DIR, read_fact_store
+from facts_stream import wanted_facts
+from profiling import configure_profiling, stage
+from ratio_engine import add_ratios
+from settings import HEADERS
+from statement_engine import assemble_statements, select_statements, statement_facts, statement_matrix
+from taxonomies import CURRENCY_UNIT, company_facts_view, reporting_currencies
 
 # ==========================================
 # CONFIGURATION
 # ==========================================
 CIK = "0001045810"
+OUTPUT_FILE = f"{CIK}_MASTER_ANALYSIS.csv"   # set to None to keep the result in memory only
 FILES = {
     'IS': f"{CIK}_Income_Statement.csv",
     'BS': f"{CIK}_balance_sheet.csv",
     'CF': f"{CIK}_Cashflow_statement.csv"
 }
 
+log = get_logger("master_analysis")
+
 def clean_transpose(file_path, prefix):
     try:
         # Load data
@@ -35,7 +48,7 @@ def clean_transpose(file_path, prefix):
             df_t.index = df_t.index.astype(int) 
             df_t = df_t.sort_index()
         except ValueError:
-            print(f"Note: Could not convert index to integer for {prefix}. Check year formatting.")
+            log.warning("Could not convert index to integer for %s. Check year formatting.", prefix)
 
         # 3. PREFIX: Rename columns (e.g., "IS_Net Income")
         df_t.columns = [f"{prefix}_{col}" for col in df_t.columns]
@@ -46,83 +59,108 @@ def clean_transpose(file_path, prefix):
         return df_t
     
     except FileNotFoundError:
-        print(f"Error: Could not find file {file_path}. Please run your extraction scripts first.")
+        log.error("Could not find file %s. Please run your extraction scripts first.", file_path)
         return pd.DataFrame()
 
-# ==========================================
-# EXECUTION
-# ==========================================
-
-# 1. Load and Clean the 3 Statements
-print("Processing Income Statement...")
-df_is = clean_transpose(FILES['IS'], 'IS')
 
-print("Processing Balance Sheet...")
-df_bs = clean_transpose(FILES['BS'], 'BS')
+def load_master_frame_from_csv(files=FILES):
+    """Legacy path: rebuild the master frame from the three presentation CSVs."""
+    return build_master_frame_from_frames([clean_transpose(files[key], key) for key in ("IS", "BS", "CF")])
 
-print("Processing Cash Flow...")
-df_cf = clean_transpose(FILES['CF'], 'CF')
-
-# 2. MERGE into MASTER DataFrame
-master_df = df_is.join(df_bs, how='outer').join(df_cf, how='outer')
-
-# Helper function
-def get_col(df, col_name):
-    if col_name in df.columns:
-        return df[col_name].fillna(0)
-    else:
-        # We silence the warning to avoid spamming, but return 0
-        return 0
 
 # ==========================================
-# 3. CALCULATE RATIOS
+# IN-MEMORY PIPELINE
 # ==========================================
 
-# IMPORTANT DEBUG STEP: 
-# This prints your actual column names. If your ratios are 0, check this list!
-print("\n--- AVAILABLE COLUMNS (Use these exact names in your formulas) ---")
-# print(master_df.columns.tolist()) 
-print("------------------------------------------------------------------\n")
-
-# --- Profitability Ratios ---
-master_df['Calc_Net_Margin'] = get_col(master_df, 'IS_Net Income (Loss)') / get_col(master_df, 'IS_Total Net Revenues')
-master_df['Calc_ROE'] = get_col(master_df, 'IS_Net Income (Loss)') / get_col(master_df, "BS_Total stockholders' equity")
-
-# --- Liquidity Ratios ---
-master_df['Calc_Current_Ratio'] = get_col(master_df, 'BS_Total current assets') / get_col(master_df, 'BS_Total current liabilities')
-
-# --- STRESS TEST CONFIGURATION ---
-# UPDATE THESE NAMES based on what you see in the print output above!
-# I have put standard guesses here, but your CSV might be different.
-cash_col_name   = 'BS_Cash and cash equivalents'       # Check your CSV! Might be 'BS_CashAndCashEquivalentsAtCarryingValue'
-receiv_col_name = 'BS_Accounts receivable, net'        # Check your CSV! Might be 'BS_AccountsReceivableNetCurrent'
-secur_col_name  = 'BS_Marketable securities, current'  # Check your CSV! Might be 'BS_MarketableSecuritiesCurrent'
-liab_col_name   = 'BS_Total current liabilities'       # Check your CSV! Might be 'BS_LiabilitiesCurrent'
-
-# Load variables safely
-cash      = get_col(master_df, cash_col_name)
-receiv    = get_col(master_df, receiv_col_name)
-securities = get_col(master_df, secur_col_name)
-liabilities = get_col(master_df, liab_col_name)
-
-# Quick Ratio Base
-master_df['Calc_Quick_Ratio_Base'] = (cash + receiv + securities) / liabilities
-
-# Scenario A: Marketable Securities drop by 10%
-master_df['Calc_Stress_Quick_10pct'] = (cash + receiv + (securities * 0.90)) / liabilities
-
-# Scenario B: Marketable Securities drop by 15%
-master_df['Calc_Stress_Quick_15pct'] = (cash + receiv + (securities * 0.85)) / liabilities
-
-# Scenario C: Marketable Securities drop by 25%
-master_df['Calc_Stress_Quick_25pct'] = (cash + receiv + (securities * 0.75)) / liabilities
-
-# --- Cash Flow Ratios ---
-master_df['Calc_FCF'] = get_col(master_df, 'CF_Net cash provided by (used in) operating activities') - get_col(master_df, 'CF_Cash spent on assets more than 1 year')
-
-# Save the Master File
-master_df.to_csv(f"{CIK}_MASTER_ANALYSIS.csv")
-print(f"Success! Master Analysis File saved as: {CIK}_MASTER_ANALYSIS.csv")
-
-# Print a preview
-print(master_df[['Calc_Net_Margin', 'Calc_Quick_Ratio_Base', 'Calc_Stress_Quick_25pct']].tail())
\ No newline at end of file
+def statement_frame(data, prefix):
+    """
+    One statement (a StatementMatrix or {category: {label: {year: value}}} dict) -> float64
+    frame indexed by Year with "{prefix}_{label}" columns, in the same column order
+    clean_transpose produces (categories in statement order, labels sorted within each category).
+    A label repeated in a later category becomes "{prefix}_{label} ({category})"
+    instead of a duplicate column.
+    """
+    return statement_matrix(prefix, data).master_frame(prefix)
+
+
+def build_master_frame_from_frames(frames):
+    master_df = frames[0]
+    for df in frames[1:]:
+        master_df = master_df.join(df, how="outer")
+    return master_df
+
+
+def build_master_frame(statements, concepts=None):
+    """
+    {"IS": ..., "BS": ..., "CF": ...} statement dicts -> wide, numeric, year-indexed master frame.
+    concepts (concept_index resolutions, or a Year-indexed concept frame) add one stable
+    column per canonical concept.
+    """
+    frames = [statement_frame(statements[key], key) for key in ("IS", "BS", "CF")]
+    if concepts is not None:
+        frames.append(concepts if isinstance(concepts, pd.DataFrame) else concept_frame(concepts))
+    return build_master_frame_from_frames(frames)
+
+
+def extract_company(cik, headers=None, warehouse=None):
+    """
+    (statements, concepts, reporting currency) for one CIK from a single streamed decode of its
+    companyfacts document (amounts are in millions of that currency).
+    With a warehouse (warehouse.Warehouse) the selections and their provenance are stored there too.
+    """
+    wanted = statement_facts() | wanted_facts(concept_tags())
+    data = get_company_facts(cik, headers=headers or HEADERS, wanted=wanted)
+    if not data.get("facts"):
+        raise ValueError(f"No companyfacts available for CIK {cik}")
+    view = company_facts_view(data)
+    selected = select_statements(view, cik)
+    concepts = concepts_for_view(view, cik, headers)
+    if warehouse is not None:
+        with stage("store", cik) as s:
+            s["items"] = warehouse.store_company(cik, selected, concepts, view, name=data.get("entityName"))
+    return assemble_statements(selected), concepts, view.currency
+
+
+def extract_company_from_store(cik, root=FACT_STORE_DIR):
+    """
+    (statements, concept frame, reporting currency) for one CIK from its fact_store partition: the batched
+    selection rules run as filters and group-bys on the table, no companyfacts dicts are walked.
+    """
+    facts = read_fact_store(root, ciks=[cik])
+    if facts.empty:
+        raise ValueError(f"No facts for CIK {cik} in {root}")
+    currency = next(iter(reporting_currencies(facts).values()), CURRENCY_UNIT)
+    return extract_statements_from_facts(facts), concept_panel(facts).droplevel("CIK"), currency
+
+
+def run_master_analysis(cik=CIK, statements=None, concepts=None, headers=None, output_file=None, fact_store=None):
+    """
+    Extract (unless statements / concepts are given), build the master frame and add the
+    ratios (ratio_engine.RATIOS), all in memory. output_file is an optional CSV sink.
+    With fact_store (a fact_store.FACT_STORE_DIR) the company is read from its Parquet
+    partition (fact_store.ingest_cik) instead of the companyfacts document.
+    """
+    if statements is None or concepts is None:
+        extracted = extract_company_from_store(cik, fact_store) if fact_store else extract_company(cik, headers)
+        statements = extracted[0] if statements is None else statements
+        concepts = extracted[1] if concepts is None else concepts
+    with stage("frame", cik) as s:
+        master_df = build_master_frame(statements, concepts)
+        s["items"] = len(master_df)
+    with stage("ratio", cik) as s:
+        add_ratios(master_df)
+        s["items"] = len(master_df)
+    if output_file:
+        master_df.to_csv(output_file)
+        log.info("Master Analysis File saved as: %s", output_file)
+    return master_df
+
+
+if __name__ == "__main__":
+    configure_logging()
+    configure_profiling()
+    master_df = run_master_analysis(CIK, output_file=OUTPUT_FILE)
+    print(f"Success! Master Analysis built for {CIK}" + (f" and saved as: {OUTPUT_FILE}" if OUTPUT_FILE else ""))
+
+    # Print a preview
+    print(master_df[['Calc_Net_Margin', 'Calc_Quick_Ratio_Base', 'Calc_Stress_Quick_25pct']].tail())
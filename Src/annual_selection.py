@@ -0,0 +1,278 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from edgar_cache import CACHE_DIR
+from fact_store import flatten_company_facts
+from profiling import stage
+from settings import year_window
+from statement_engine import (STATEMENTS, assemble_statements, extract_all_statements,
+                              get_tag_index, load_statement_module, statement_records)
+from taxonomies import (VIEW_TAXONOMIES, company_facts_view, reporting_currencies, view_fact_rows, view_tags,
+                        with_currency)
+
+# ==========================================
+# VECTORIZED ANNUAL-FACT SELECTION
+# ==========================================
+# Batched versions of select_annual_entries from the three statement scripts.
+# They work on a fact table (see fact_store.flatten_company_facts) and apply the
+# same per-statement rules as whole-column operations:
+#   IS: is_annual_fact + fy/frame/end year, best score (FY, annual form, qtrs, duration)
+#   BS: annual form, fy/end year, qtrs == 4 if numeric, end year == fy, longest duration
+#   CF: annual form, fy/end year, qtrs == 4 if numeric else >= 300 days, end year == fy, longest duration
+# Ties keep the first fact in document order, like the per-entry loops.
+#
+# One known difference: the fact table types fy as an integer (as SEC publishes
+# it), so the income rule's "fy given as a 4-digit string" branch never fires.
+# On SEC documents that branch never fires in the scripts either.
+
+ANNUAL_FORMS = {"10-K", "10-K/A", "20-F", "20-F/A", "40-F", "40-F/A"}
+
+INT_PATTERN = r"[+-]?\d+"   # what int() accepts for a (stripped) qtrs string
+GROUP_KEYS = ["cik", "tag", "unit", "year"]
+INFO_COLUMNS = ["form", "start", "end", "frame", "qtrs", "duration_days"]
+
+
+def wanted_units(statement=None):
+    """{tag: {unit, ...}} for the tags some statement (or one statement) asks for."""
+    wanted = {}
+    for tag, targets in get_tag_index().items():
+        for key, _, unit, _ in targets:
+            if statement is None or key == statement:
+                wanted.setdefault(tag, set()).add(unit)
+    return wanted
+
+
+def tag_unit_mask(facts, wanted):
+    """Boolean mask of rows whose (tag, unit) is wanted, evaluated once per category pair."""
+    tags, units = facts["tag"].cat, facts["unit"].cat
+    unit_pos = {unit: j for j, unit in enumerate(units.categories)}
+    table = np.zeros((len(tags.categories) + 1, len(units.categories) + 1), dtype=bool)
+    for i, tag in enumerate(tags.categories):
+        for unit in wanted.get(tag, ()):
+            if unit in unit_pos:
+                table[i, unit_pos[unit]] = True
+    # code -1 (missing) lands on the all-False last row/column
+    return table[tags.codes.to_numpy(), units.codes.to_numpy()]
+
+
+def needed_facts(facts, statement=None):
+    """
+    Filter a fact table down to the (tag, unit) pairs some statement (or one statement) asks for,
+    reading ifrs-full / dei rows through the taxonomy view (labelled with the us-gaap tag they stand in for).
+    """
+    facts = view_fact_rows(facts)
+    return facts[tag_unit_mask(facts, wanted_units(statement))]
+
+
+def map_categories(series, func, missing):
+    """Apply func to each distinct category once and broadcast the results back by code."""
+    categories = series.cat.categories
+    lookup = np.array([func(c) for c in categories] + [missing], dtype=object)
+    return lookup[series.cat.codes.to_numpy()]
+
+
+def qtrs_as_int(value):
+    value = str(value).strip()
+    return int(value) if re.fullmatch(INT_PATTERN, value) else None
+
+
+def frame_as_year(value):
+    m = re.search(r"(CY|FY)(\d{4})", value)
+    return int(m.group(2)) if m else None
+
+
+def period_columns(facts):
+    """Per-fact fields every rule needs, computed once for the whole table."""
+    end_year = facts["end"].dt.year.astype("Int64")
+    qtrs_int = pd.array(map_categories(facts["qtrs"], qtrs_as_int, None), dtype="Int64")
+    return pd.DataFrame({
+        "cik": facts["cik"].astype("category"),
+        "tag": facts["tag"],
+        "unit": facts["unit"],
+        "val": facts["val"],
+        "form": facts["form"],
+        "fp": facts["fp"],
+        "frame": facts["frame"],
+        "qtrs": facts["qtrs"],
+        "fp_is_fy": map_categories(facts["fp"], lambda fp: fp.upper() == "FY", False).astype(bool),
+        "frame_year": pd.array(map_categories(facts["frame"], frame_as_year, None), dtype="Int64"),
+        "qtrs_valid": ~pd.isna(qtrs_int),
+        "qtrs_int": qtrs_int,
+        "start": facts["start"],
+        "end": facts["end"],
+        "end_year": end_year,
+        "fy_year": facts["fy"].fillna(end_year),
+        "duration_days": (facts["end"] - facts["start"]).dt.days.fillna(0).astype("int64"),
+        "annual_form": facts["form"].isin(ANNUAL_FORMS).to_numpy(dtype=bool),
+        "pos": np.arange(len(facts)),
+    }, index=facts.index)
+
+
+def best_per_year(p, score_columns):
+    """Keep the highest-scoring fact per (cik, tag, unit, year); earlier facts win ties."""
+    order = GROUP_KEYS + score_columns + ["pos"]
+    ascending = [True] * len(GROUP_KEYS) + [False] * len(score_columns) + [True]
+    return p.sort_values(order, ascending=ascending, kind="mergesort").drop_duplicates(GROUP_KEYS)
+
+
+def select_income(p):
+    annual = (
+        p["fp_is_fy"]
+        | (p["qtrs_int"] == 4).fillna(False)
+        | p["frame_year"].notna()
+        | (p["annual_form"] & (p["duration_days"] >= 300))
+    )
+    p = p.assign(year=p["frame_year"].fillna(p["end_year"]))
+    p = p[annual & p["year"].between(*year_window()).fillna(False)].copy()
+    p["year"] = p["year"].astype("int64")
+    p["value"] = np.where(p["unit"] == "USD", p["val"] / 1_000_000, p["val"])
+    p["score_fp"] = p["fp_is_fy"].astype("int64")
+    p["score_form"] = p["annual_form"].astype("int64")
+    p["score_qtrs"] = p["qtrs_int"].fillna(0).astype("int64")
+    return best_per_year(p, ["score_fp", "score_form", "score_qtrs", "duration_days"])
+
+
+def _fy_year_window(p):
+    in_window = p["fy_year"].between(*year_window()).fillna(False)
+    end_matches = (p["end_year"].isna() | (p["end_year"] == p["fy_year"])).fillna(False)
+    return p["annual_form"] & in_window & end_matches
+
+
+def select_balance_sheet(p):
+    qtrs_ok = ~p["qtrs_valid"] | (p["qtrs_int"] == 4).fillna(False)
+    p = p[_fy_year_window(p) & qtrs_ok].copy()
+    p["year"] = p["fy_year"].astype("int64")
+    p["value"] = np.where(p["unit"].isin(["USD", "shares"]), p["val"] / 1_000_000, p["val"])
+    return best_per_year(p, ["duration_days"])
+
+
+def select_cash_flow(p):
+    qtrs_ok = np.where(p["qtrs_valid"], (p["qtrs_int"] == 4).fillna(False), p["duration_days"] >= 300)
+    p = p[_fy_year_window(p) & qtrs_ok].copy()
+    p["year"] = p["fy_year"].astype("int64")
+    p["value"] = np.where(p["unit"] == "USD", p["val"] / 1_000_000, p["val"])
+    return best_per_year(p, ["duration_days"])
+
+
+RULES = {"IS": select_income, "BS": select_balance_sheet, "CF": select_cash_flow}
+
+
+def select_annual_facts(facts, statement, periods=None):
+    """
+    Best annual fact per (cik, tag, unit, year) for one statement's rules.
+    Returns one row per selection with value plus the provenance it was chosen on.
+    periods lets callers reuse period_columns across statements.
+    """
+    p = periods if periods is not None else period_columns(needed_facts(facts))
+    chosen = RULES[statement](p[tag_unit_mask(p, wanted_units(statement))])
+    return chosen.drop(columns=["pos"])
+
+
+def annual_by_year(chosen):
+    """
+    Selection rows -> {tag: {year: info}} in the shape select_annual_entries returns.
+    """
+    chosen = chosen.assign(
+        start=chosen["start"].dt.strftime("%Y-%m-%d"),
+        end=chosen["end"].dt.strftime("%Y-%m-%d"),
+    )
+    result = {}
+    columns = ["tag", "year", "value"] + INFO_COLUMNS
+    for record in chosen[columns].astype(object).where(chosen[columns].notna(), None).to_dict("records"):
+        tag = record.pop("tag")
+        year = int(record.pop("year"))
+        result.setdefault(tag, {})[year] = record
+    return result
+
+
+def extract_statements_from_facts(facts):
+    """
+    Three-statement extraction for one CIK's fact table, fully batched.
+    Returns the same {"IS": ..., "BS": ..., "CF": ...} structure as statement_engine.extract_all_statements.
+    """
+    with stage("select", str(facts["cik"].iloc[0]) if len(facts) else None) as s:
+        periods = period_columns(needed_facts(facts))
+        selected = {}
+        for key in STATEMENTS:
+            for tag, years in annual_by_year(select_annual_facts(facts, key, periods)).items():
+                selected[(key, tag)] = years
+        s["items"] = len(periods)
+    return assemble_statements(selected)
+
+
+def extract_statements_from_document(data, cik=None):
+    """Flatten only the tags the statements use, then run the batched selection."""
+    facts = flatten_company_facts(data, cik, taxonomies=VIEW_TAXONOMIES, tags=view_tags(get_tag_index()))
+    return extract_statements_from_facts(facts)
+
+
+def statement_panel(facts):
+    """
+    Long (cik, statement, item, year, value) frame for every CIK in a fact table,
+    ready to pivot into MasterAnalysisFinal-style IS_/BS_/CF_ columns.
+    """
+    rows = []
+    for cik, company in facts.groupby("cik", observed=True):
+        rows.extend(statement_records(cik, extract_statements_from_facts(company)))
+    return pd.DataFrame(rows, columns=["CIK", "Statement", "Category", "Item", "Year", "Value"])
+
+
+def master_panel(facts):
+    """
+    Wide (CIK, Year) x 'IS_Net Income (Loss)'-style frame for every CIK in a fact table,
+    with a leading Currency column (amounts are in millions of that reporting currency).
+    """
+    panel = statement_panel(facts)
+    panel["Column"] = panel["Statement"] + "_" + panel["Item"]
+    panel = panel.pivot_table(index=["CIK", "Year"], columns="Column", values="Value", aggfunc="last")
+    return with_currency(panel, reporting_currencies(facts))
+
+
+# ==========================================
+# PARITY CHECK
+# ==========================================
+
+def compare_with_reference(data):
+    """
+    Run both the per-entry rules (statement_engine) and the batched rules on one
+    companyfacts document. Returns a list of human-readable mismatches (empty = parity).
+    """
+    expected = extract_all_statements(company_facts_view(data))
+    actual = extract_statements_from_document(data)
+    mismatches = []
+    for key in STATEMENTS:
+        for category, items in expected[key].items():
+            got_items = actual[key].get(category, {})
+            for label in set(items) | set(got_items):
+                want, got = items.get(label, {}), got_items.get(label, {})
+                for year in set(want) | set(got):
+                    if want.get(year) != got.get(year):
+                        mismatches.append(f"{key} / {category} / {label} / {year}: "
+                                          f"expected {want.get(year)}, got {got.get(year)}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    import json
+    from synthetic_facts import make_company_facts
+
+    documents = [(f"synthetic seed {seed}", make_company_facts(cik=seed + 1, seed=seed)) for seed in range(20)]
+    if os.path.isdir(CACHE_DIR):
+        for name in sorted(os.listdir(CACHE_DIR)):
+            if name.endswith(".json") and not name.endswith(".meta.json"):
+                with open(os.path.join(CACHE_DIR, name), "rb") as f:
+                    documents.append((name, json.load(f)))
+
+    failures = 0
+    for name, data in documents:
+        mismatches = compare_with_reference(data)
+        if mismatches:
+            failures += 1
+            print(f"{name}: {len(mismatches)} mismatch(es)")
+            for line in mismatches[:10]:
+                print(f"  {line}")
+    print(f"Parity checked on {len(documents)} document(s): {failures} with mismatches")
+    raise SystemExit(1 if failures else 0)
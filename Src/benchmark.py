@@ -0,0 +1,310 @@
+import argparse
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import time
+import tracemalloc
+
+from diagnostics import get_counters, reset_counters
+from edgar_client import get_company_facts_path
+from edgar_cache import normalize_cik
+from facts_stream import stream_company_facts
+from lazy_statements import LazyStatements
+from MasterAnalysisFinal import build_master_frame
+from concept_index import resolve_concepts
+from ratio_engine import add_ratios
+from statement_engine import SRC_DIR, STATEMENTS, extract_all_statements, load_statement_module, statement_facts
+from synthetic_facts import make_company_facts
+from taxonomies import company_facts_view
+
+# ==========================================
+# BENCHMARK CONFIGURATION
+# ==========================================
+# Offline benchmark of the extraction and master-analysis stages, run on
+#   - the companyfacts fixtures committed under FIXTURE_DIR (every CIK##########.json;
+#     --record 1045810,320193 copies those CIKs from the companyfacts cache into it)
+#   - synthetic documents (synthetic_facts) at each scale in BENCH_SCALES; scale n has
+#     n times the facts per tag and n * 200 unused concepts
+#
+#   python src/benchmark.py               compare against BASELINE_FILE, exit 1 on a regression
+#                                         (exit 2 if there is no baseline to compare against)
+#   python src/benchmark.py --update      (re)write the baseline from this run
+#
+# Throughput is facts/second (fact entries the three statements scan in the case's
+# documents) and companies/minute; peak memory comes from a separate tracemalloc run.
+# Timings on a shared machine vary by up to ~40% between runs with no code change, so a
+# case that comes out slow is re-measured (CONFIRM_RUNS times at most) and only reported
+# if it stays below the baseline by more than SPEED_TOLERANCE; noise rarely repeats.
+# Baselines are machine-specific: the committed one names the machine it was recorded
+# on; point BENCH_BASELINE at your own file to track another machine.
+REPO_DIR = os.path.dirname(SRC_DIR)
+FIXTURE_DIR = os.environ.get("BENCH_FIXTURE_DIR", os.path.join(REPO_DIR, "fixtures", "companyfacts"))
+BASELINE_FILE = os.environ.get("BENCH_BASELINE", os.path.join(REPO_DIR, "fixtures", "benchmark_baseline.json"))
+SCALES = [int(s) for s in os.environ.get("BENCH_SCALES", "1,4").split(",")]   # x10 needs more than 6 GB
+COMPANIES = int(os.environ.get("BENCH_COMPANIES", "5"))   # synthetic companies per scale
+REPEAT = int(os.environ.get("BENCH_REPEAT", "3"))          # best of REPEAT timed runs
+MIN_RUN_SECONDS = 0.2     # a timed run loops a short case until it has taken at least this long
+SPEED_TOLERANCE = 0.5     # fail when throughput stays more than 50% below the baseline
+CONFIRM_RUNS = 2          # re-measurements of a case that came out slow before it counts
+MEMORY_TOLERANCE = 0.25   # fail when peak memory grows more than 25% above the baseline
+
+EXTRACTORS = {
+    "IS": "extract_income_data",
+    "BS": "extract_balance_sheet_data",
+    "CF": "extract_cash_flow_data",
+}
+
+
+# ==========================================
+# DOCUMENT SETS
+# ==========================================
+
+def record_fixtures(ciks, fixture_dir=FIXTURE_DIR, headers=None):
+    """Copy the cached companyfacts documents of these CIKs into the fixture directory (downloading if needed)."""
+    os.makedirs(fixture_dir, exist_ok=True)
+    recorded = []
+    for cik in ciks:
+        path = get_company_facts_path(cik, headers)
+        if path is not None:
+            recorded.append(shutil.copyfile(path, os.path.join(fixture_dir, f"CIK{normalize_cik(cik)}.json")))
+    return recorded
+
+
+def load_fixtures(fixture_dir=FIXTURE_DIR):
+    """[(name, raw bytes)] for every recorded fixture."""
+    if not os.path.isdir(fixture_dir):
+        return []
+    fixtures = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(fixture_dir, name), "rb") as f:
+                fixtures.append((name, f.read()))
+    return fixtures
+
+
+def synthetic_fixtures(scale, companies=COMPANIES):
+    """[(name, raw bytes)] of synthetic documents at one scale."""
+    return [
+        (f"synthetic-x{scale}-{i}",
+         json.dumps(make_company_facts(cik=i + 1, seed=i, facts_per_year=6 * scale, extra_tags=200 * scale)).encode())
+        for i in range(companies)
+    ]
+
+
+def document_sets(scales=SCALES, fixture_dir=FIXTURE_DIR):
+    """{set name: [(name, raw bytes)]}: one set for the recorded fixtures (if any) and one per synthetic scale."""
+    sets = {}
+    fixtures = load_fixtures(fixture_dir)
+    if fixtures:
+        sets["fixtures"] = fixtures
+    for scale in scales:
+        sets[f"synthetic-x{scale}"] = synthetic_fixtures(scale)
+    return sets
+
+
+# ==========================================
+# CASES
+# ==========================================
+
+def prepare(raws):
+    """Decode a document set once and run the stages the later cases start from."""
+    views = [company_facts_view(json.loads(raw)) for raw in raws]
+    reset_counters()
+    statements = [extract_all_statements(view) for view in views]
+    facts = {key: counts.get("facts_scanned", 0) for key, counts in get_counters().items()}
+    concepts = [resolve_concepts(view) for view in views]
+    frames = [build_master_frame(s, c) for s, c in zip(statements, concepts)]
+    return {"raws": raws, "views": views, "statements": statements, "concepts": concepts,
+            "frames": frames, "facts": facts}
+
+
+def _each(function, items):
+    """Run function over items without keeping the results (peak memory = one company at a time)."""
+    def run():
+        for item in items:
+            function(item)
+    return run
+
+
+def benchmark_cases(state):
+    """
+    {case name: (callable running that stage over every document of the set, facts it covers)}.
+    Extractor cases cover their own statement's facts, every other case all three statements'.
+    """
+    total = sum(state["facts"].values())
+    wanted = statement_facts()
+    cases = {
+        "decode_json": (_each(json.loads, state["raws"]), total),
+        "decode_stream": (_each(lambda raw: stream_company_facts(io.BytesIO(raw), wanted), state["raws"]), total),
+    }
+    for key, extractor in EXTRACTORS.items():
+        cases[extractor] = (_each(getattr(load_statement_module(key), extractor), state["views"]),
+                            state["facts"].get(key, 0))
+    cases["extract_all_statements"] = (_each(extract_all_statements, state["views"]), total)
+
+    def create_dataframes(statements):
+        for key in STATEMENTS:
+            load_statement_module(key).create_dataframe(statements[key])
+    cases["create_dataframe"] = (_each(create_dataframes, state["statements"]), total)
+    cases["master_merge"] = (_each(lambda sc: build_master_frame(*sc), list(zip(state["statements"], state["concepts"]))),
+                             total)
+    cases["master_ratios"] = (_each(add_ratios, state["frames"]), total)
+    cases["lazy_ratios"] = (_each(lambda view: LazyStatements(view).ratios(), state["views"]), total)
+    return cases
+
+
+def measure(run, facts, companies, repeat=REPEAT):
+    """Best-of-repeat wall time, throughput and (separate, traced run) peak memory of one case."""
+    loops = max(1, math.ceil(MIN_RUN_SECONDS / max(_timed(run), 1e-6)))
+    seconds = min(_timed(run, loops) for _ in range(repeat))
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - base
+    if not tracing:
+        tracemalloc.stop()
+    return {
+        "seconds": seconds,
+        "facts": facts,
+        "companies": companies,
+        "facts_per_second": facts / seconds if seconds else None,
+        "companies_per_minute": 60 * companies / seconds if seconds else None,
+        "peak_bytes": peak,
+    }
+
+
+def _timed(run, loops=1):
+    """Seconds per call of run, averaged over loops back-to-back calls."""
+    start = time.perf_counter()
+    for _ in range(loops):
+        run()
+    return (time.perf_counter() - start) / loops
+
+
+def run_benchmarks(sets=None, repeat=REPEAT, only=None):
+    """{set: {case: measurement}} for every document set and case (or only the {set: [case, ...]} given)."""
+    sets = document_sets() if sets is None else sets
+    results = {}
+    for set_name, fixtures in sets.items():
+        if only is not None and set_name not in only:
+            continue
+        state = prepare([raw for _, raw in fixtures])
+        results[set_name] = {
+            case: measure(run, facts, len(fixtures), repeat)
+            for case, (run, facts) in benchmark_cases(state).items()
+            if only is None or case in only[set_name]
+        }
+    return results
+
+
+# ==========================================
+# BASELINE
+# ==========================================
+
+def load_baseline(path=BASELINE_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                   "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=2)
+    return path
+
+
+def slow_cases(results, baseline, speed_tolerance=SPEED_TOLERANCE):
+    """{set: [case, ...]} whose throughput is below the baseline by more than the tolerance."""
+    slow = {}
+    for set_name, cases in results.items():
+        for case, now in cases.items():
+            then = baseline.get("results", {}).get(set_name, {}).get(case)
+            if then is not None and then.get("facts") == now["facts"] and \
+                    now["facts_per_second"] < then["facts_per_second"] * (1 - speed_tolerance):
+                slow.setdefault(set_name, []).append(case)
+    return slow
+
+
+def confirm_slow_cases(results, baseline, attempts=CONFIRM_RUNS, speed_tolerance=SPEED_TOLERANCE):
+    """Re-measure the cases that came out slow, keeping each case's fastest measurement."""
+    for _ in range(attempts):
+        slow = slow_cases(results, baseline, speed_tolerance)
+        if not slow:
+            break
+        for set_name, cases in run_benchmarks(only=slow).items():
+            for case, m in cases.items():
+                if m["facts_per_second"] > results[set_name][case]["facts_per_second"]:
+                    results[set_name][case] = m
+    return results
+
+
+def compare_with_baseline(results, baseline, speed_tolerance=SPEED_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Human-readable regressions against a baseline (empty = none). Cases missing from the baseline are skipped."""
+    regressions = []
+    for set_name, cases in results.items():
+        for case, now in cases.items():
+            then = baseline.get("results", {}).get(set_name, {}).get(case)
+            if then is None:
+                continue
+            if then.get("facts") != now["facts"]:
+                regressions.append(f"{set_name} / {case}: document set changed "
+                                   f"({then.get('facts')} -> {now['facts']} facts), re-record the baseline")
+                continue
+            if now["facts_per_second"] < then["facts_per_second"] * (1 - speed_tolerance):
+                regressions.append(f"{set_name} / {case}: {now['facts_per_second']:,.0f} facts/s "
+                                   f"vs baseline {then['facts_per_second']:,.0f}")
+            if now["peak_bytes"] > then["peak_bytes"] * (1 + memory_tolerance):
+                regressions.append(f"{set_name} / {case}: peak {now['peak_bytes'] / 1e6:.1f} MB "
+                                   f"vs baseline {then['peak_bytes'] / 1e6:.1f} MB")
+    return regressions
+
+
+def format_results(results):
+    lines = [f"{'set':<16} {'case':<28} {'seconds':>9} {'facts/s':>12} {'cos/min':>10} {'peak MB':>9}"]
+    for set_name, cases in results.items():
+        for case, m in cases.items():
+            lines.append(f"{set_name:<16} {case:<28} {m['seconds']:>9.4f} {m['facts_per_second']:>12,.0f} "
+                         f"{m['companies_per_minute']:>10,.0f} {m['peak_bytes'] / 1e6:>9.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline extraction / master-analysis benchmark.")
+    parser.add_argument("--update", action="store_true", help="write the baseline from this run instead of checking it")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON (default %(default)s)")
+    parser.add_argument("--record", metavar="CIKS", help="comma-separated CIKs to copy into the fixtures first")
+    args = parser.parse_args(argv)
+
+    baseline = None if args.update else load_baseline(args.baseline)
+    if not args.update and baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update to record one")
+        return 2
+    if args.record:
+        record_fixtures(args.record.split(","))
+    results = run_benchmarks()
+    if not args.update:
+        results = confirm_slow_cases(results, baseline)
+    print(format_results(results))
+
+    if args.update:
+        print(f"Baseline written to {save_baseline(results, args.baseline)}")
+        return 0
+    regressions = compare_with_baseline(results, baseline)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print(f"{sum(len(c) for c in results.values())} case(s) checked against {args.baseline}: "
+          f"{len(regressions)} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
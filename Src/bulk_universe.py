@@ -0,0 +1,133 @@
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from diagnostics import configure_logging, get_logger
+from edgar_cache import normalize_cik
+from profiling import add_records, configure_profiling, reset_records, stage, take_records
+from facts_stream import stream_company_facts
+from statement_engine import extract_all_statements, statement_facts, statement_records
+from taxonomies import company_facts_view
+
+log = get_logger("bulk_universe")
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# SEC bulk download: https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip
+ARCHIVE_PATH = "companyfacts.zip"
+CIKS = None                        # e.g. ["0001045810", "0000002488"]; None = every company in the archive
+OUTPUT_FILE = "UNIVERSE_STATEMENTS.csv"
+WORKERS = os.cpu_count() or 1
+
+MEMBER_PATTERN = re.compile(r"CIK(\d{10})\.json$")
+
+
+def list_archive_members(zip_path, ciks=None):
+    """
+    Return [(cik, member_name), ...] for the companies to process.
+    Only the zip directory is read here; no member is decompressed.
+    """
+    wanted = {normalize_cik(c) for c in ciks} if ciks else None
+    members = []
+    with zipfile.ZipFile(zip_path) as zf:
+        for name in zf.namelist():
+            m = MEMBER_PATTERN.search(name)
+            if not m:
+                continue
+            if wanted is not None and m.group(1) not in wanted:
+                continue
+            members.append((m.group(1), name))
+    if wanted is not None:
+        missing = wanted - {cik for cik, _ in members}
+        if missing:
+            log.warning("%d CIK(s) not found in %s: %s", len(missing), zip_path, sorted(missing)[:10])
+    return members
+
+
+_archives = {}
+
+
+def open_archive(zip_path):
+    """
+    Process-wide open ZipFile per archive, so the central directory (~18k entries for the
+    full companyfacts.zip) is read once per worker instead of once per member.
+    """
+    if zip_path not in _archives:
+        _archives[zip_path] = zipfile.ZipFile(zip_path)
+    return _archives[zip_path]
+
+
+def extract_member(zip_path, cik, member):
+    """Stream one company's JSON out of the archive and run the three-statement extraction on it."""
+    with stage("parse", cik) as s:
+        with open_archive(zip_path).open(member) as f:
+            data = stream_company_facts(f, statement_facts())
+        s["items"] = sum(len(tags) for tags in data.get("facts", {}).values())
+    return cik, extract_all_statements(company_facts_view(data), cik)
+
+
+def init_worker():
+    """Worker process setup: no inherited stage records or archive handles (fork would copy the parent's)."""
+    reset_records()
+    _archives.clear()
+
+
+def _extract_batch_safe(args):
+    """Worker entry point: ([(cik, statements or None), ...], stage records from this batch)."""
+    zip_path, members = args
+    results = []
+    for cik, member in members:
+        try:
+            results.append(extract_member(zip_path, cik, member))
+        except Exception as e:
+            log.error("%s (%s): %s", cik, member, e)
+            results.append((cik, None))
+    return results, take_records()
+
+
+def run_universe(zip_path, ciks=None, workers=WORKERS, output_file=OUTPUT_FILE):
+    """
+    Extract the three statements for every requested CIK in a local companyfacts.zip.
+    Companies are spread across a process pool in batches; every worker opens the archive
+    once and decompresses only the members it was given.
+    Writes one consolidated long-format file (.csv or .parquet) and returns it as a DataFrame.
+    """
+    members = list_archive_members(zip_path, ciks)
+    log.info("Processing %d companies from %s with %d worker(s)", len(members), zip_path, workers)
+
+    batch_size = max(1, len(members) // (max(workers, 1) * 4))
+    tasks = [(zip_path, members[i:i + batch_size]) for i in range(0, len(members), batch_size)]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            batches = list(pool.map(_extract_batch_safe, tasks))
+    else:
+        batches = [_extract_batch_safe(task) for task in tasks]
+
+    rows = []
+    failed = 0
+    for results, records in batches:
+        add_records(records)
+        for cik, statements in results:
+            if statements is None:
+                failed += 1
+                continue
+            rows.extend(statement_records(cik, statements))
+
+    df = pd.DataFrame(rows, columns=["CIK", "Statement", "Category", "Item", "Year", "Value"])
+    if output_file:
+        if output_file.endswith(".parquet"):
+            df.to_parquet(output_file, index=False)
+        else:
+            df.to_csv(output_file, index=False)
+        log.info("Data saved to %s (%d companies, %d failed)", output_file, len(members) - failed, failed)
+    return df
+
+
+if __name__ == "__main__":
+    configure_logging()
+    configure_profiling()
+    run_universe(ARCHIVE_PATH, CIKS)
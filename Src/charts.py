@@ -0,0 +1,280 @@
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")   # headless: no display, no GUI event loop in the workers
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.ticker import PercentFormatter
+
+from diagnostics import configure_logging, get_logger
+from edgar_cache import normalize_cik, write_atomic
+from profiling import add_records, configure_profiling, reset_records, stage, take_records
+from ratio_engine import (CAPEX, CASH, CURRENT_ASSETS, CURRENT_LIABILITIES, OPERATING_CASH_FLOW, RECEIVABLES,
+                          REVENUE, SECURITIES)
+from stress_scenarios import SHOCKS, scenario_grid, stress_test
+
+log = get_logger("charts")
+
+# ==========================================
+# CHART CONFIGURATION
+# ==========================================
+# The standard chart pack per company, drawn from its master frame (MasterAnalysisFinal /
+# the CLI's UNIVERSE_MASTER file) with matplotlib's Agg backend and no pyplot state:
+#   revenue_margin   revenue bars with net margin on a second axis
+#   stress_fan       base quick ratio inside bands of the stress-scenario grid
+#   fcf_trend        free cash flow bars, operating cash flow and capex lines
+#
+#   python src/charts.py output/UNIVERSE_MASTER.csv          every company in a universe file
+#   python src/charts.py output/UNIVERSE_MASTER.csv --force  redraw even unchanged charts
+#   python src/cli.py NVDA AMD --charts charts
+#
+# Companies render on a process pool. Each chart's input columns are hashed; a chart whose
+# hash matches {CIK}_CHARTS.json in CHART_DIR (and whose file exists) is not drawn again.
+# Bump CHART_VERSION when a chart's look changes so every chart is redrawn once.
+CHART_DIR = os.environ.get("CHART_DIR", "charts")
+CHART_VERSION = 1
+CHART_FORMAT = "png"
+FIGSIZE = (9, 5)
+DPI = 110
+MARGINS = {"left": 0.09, "right": 0.91, "bottom": 0.08, "top": 0.92}   # fixed, so no layout pass per chart
+PNG_COMPRESS_LEVEL = 1                     # zlib level: 1 writes ~3x faster than the default 6, files ~10% larger
+WORKERS = os.cpu_count() or 1
+NET_MARGIN = "Calc_Net_Margin"
+FCF = "Calc_FCF"
+FAN_SCENARIOS = scenario_grid()            # every shock combination of stress_scenarios.SCENARIO_GRID
+FAN_PERCENTILES = [(0, 100), (10, 90), (25, 75)]   # outer to inner bands
+FCF_TREND_YEARS = 3                        # rolling mean window of the FCF trend line
+
+
+# ==========================================
+# CHART PACK
+# ==========================================
+
+def _years(frame):
+    return frame.index.to_numpy(dtype="int64")
+
+
+def plot_revenue_margin(fig, frame, title):
+    ax = fig.subplots()
+    years = _years(frame)
+    bars = ax.bar(years, frame[REVENUE], color="#4c72b0", label="Revenue")
+    ax.set_ylabel("Revenue (millions)")
+    margin_ax = ax.twinx()
+    line, = margin_ax.plot(years, frame[NET_MARGIN] * 100, color="#dd8452", marker="o", label="Net margin")
+    margin_ax.axhline(0, color="#999999", linewidth=0.8)
+    margin_ax.yaxis.set_major_formatter(PercentFormatter())
+    margin_ax.set_ylabel("Net margin")
+    ax.set_xticks(years)
+    ax.set_title(f"{title}: revenue vs. net margin")
+    ax.legend(handles=[bars, line], loc="upper left")
+
+
+def plot_stress_fan(fig, frame, title):
+    ax = fig.subplots()
+    years = _years(frame)
+    cube = stress_test(frame, FAN_SCENARIOS)
+    quick = cube.values[cube.ratios.index("quick")]
+    reported = ~np.isnan(quick).all(axis=1)
+    for i, (low, high) in enumerate(FAN_PERCENTILES):
+        bands = np.full((2, len(years)), np.nan)
+        if reported.any():
+            bands[:, reported] = np.nanpercentile(quick[reported], [low, high], axis=1)
+        ax.fill_between(years, bands[0], bands[1], color="#c44e52", alpha=0.15 + 0.15 * i, linewidth=0,
+                        label=f"Scenarios p{low}-p{high}")
+    base = (FAN_SCENARIOS[SHOCKS] == 0).all(axis=1).to_numpy()
+    if base.any():
+        ax.plot(years, quick[:, base.argmax()], color="#222222", marker="o", label="Base quick ratio")
+    ax.axhline(1.0, color="#999999", linestyle="--", linewidth=0.8)
+    ax.set_ylabel("Quick ratio (x)")
+    ax.set_xticks(years)
+    ax.set_title(f"{title}: quick ratio under {len(FAN_SCENARIOS)} stress scenarios")
+    ax.legend(loc="upper left")
+
+
+def plot_fcf_trend(fig, frame, title):
+    ax = fig.subplots()
+    years = _years(frame)
+    fcf = frame[FCF]
+    ax.bar(years, fcf, color=np.where(fcf < 0, "#c44e52", "#55a868"), label="Free cash flow")
+    ax.plot(years, frame[OPERATING_CASH_FLOW], color="#4c72b0", marker="o", label="Operating cash flow")
+    ax.plot(years, frame[CAPEX], color="#8172b3", marker="s", label="Capital expenditure")
+    ax.plot(years, fcf.rolling(FCF_TREND_YEARS, min_periods=1).mean(), color="#222222", linestyle="--",
+            label=f"FCF {FCF_TREND_YEARS}-year mean")
+    ax.axhline(0, color="#999999", linewidth=0.8)
+    ax.set_ylabel("Millions")
+    ax.set_xticks(years)
+    ax.set_title(f"{title}: free cash flow")
+    ax.legend(loc="upper left")
+
+
+# chart name: (draw function, master-frame columns it reads)
+CHARTS = {
+    "revenue_margin": (plot_revenue_margin, [REVENUE, NET_MARGIN]),
+    "stress_fan": (plot_stress_fan, [CASH, RECEIVABLES, SECURITIES, CURRENT_ASSETS, CURRENT_LIABILITIES]),
+    "fcf_trend": (plot_fcf_trend, [FCF, OPERATING_CASH_FLOW, CAPEX]),
+}
+
+
+def chart_columns(charts=CHARTS):
+    """Every master-frame column some chart reads."""
+    return list(dict.fromkeys(column for _, columns in charts.values() for column in columns))
+
+
+# ==========================================
+# CHANGE DETECTION
+# ==========================================
+
+def chart_data(frame, chart):
+    """The year-indexed float64 slice of a master frame one chart is drawn from."""
+    data = frame.reindex(columns=CHARTS[chart][1]).astype("float64")
+    return data.sort_index()
+
+
+def chart_hash(cik, chart, data):
+    """Hash of everything a chart shows: its inputs, years, title and CHART_VERSION."""
+    h = hashlib.sha256(f"{CHART_VERSION}|{chart}|{cik}|{','.join(data.columns)}".encode("utf-8"))
+    h.update(np.ascontiguousarray(data.index.to_numpy(dtype="int64")).tobytes())
+    h.update(np.ascontiguousarray(data.to_numpy(dtype="float64")).tobytes())
+    return h.hexdigest()
+
+
+def chart_path(chart_dir, cik, chart):
+    return os.path.join(chart_dir, f"{cik}_{chart}.{CHART_FORMAT}")
+
+
+def manifest_path(chart_dir, cik):
+    return os.path.join(chart_dir, f"{cik}_CHARTS.json")
+
+
+def load_manifest(chart_dir, cik):
+    """{chart: data hash} of the charts last rendered for a company."""
+    try:
+        with open(manifest_path(chart_dir, cik), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def chart_hashes(cik, frame, charts=CHARTS):
+    """{chart: data hash} for the charts of a company that have any data (the others are not drawn)."""
+    hashes = {}
+    for chart in charts:
+        data = chart_data(frame, chart)
+        if not data.isna().all().all():
+            hashes[chart] = chart_hash(cik, chart, data)
+    return hashes
+
+
+def is_current(chart_dir, cik, chart, digest, manifest):
+    """True if the chart was last drawn from data with this hash and its file is still there."""
+    return manifest.get(chart) == digest and os.path.exists(chart_path(chart_dir, cik, chart))
+
+
+# ==========================================
+# RENDERING
+# ==========================================
+
+def render_chart(cik, frame, chart, chart_dir=CHART_DIR):
+    """Draw one chart of one company to chart_dir; returns its path."""
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    fig.subplots_adjust(**MARGINS)
+    CHARTS[chart][0](fig, chart_data(frame, chart), cik)
+    path = chart_path(chart_dir, cik, chart)
+    tmp_path = f"{path}.tmp{os.getpid()}.{CHART_FORMAT}"
+    fig.savefig(tmp_path, pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL})
+    os.replace(tmp_path, path)
+    return path
+
+
+def render_company(cik, frame, charts, chart_dir=CHART_DIR):
+    """Draw the given charts of one company; returns {chart: path}."""
+    with stage("chart", cik) as s:
+        paths = {chart: render_chart(cik, frame, chart, chart_dir) for chart in charts}
+        s["items"] = len(paths)
+    return paths
+
+
+def init_worker(log_level):
+    configure_logging(log_level)
+    reset_records()
+
+
+def _render_company_safe(args):
+    """Worker entry point: (cik, {chart: path} or None, stage records from this task)."""
+    cik, frame, charts, chart_dir = args
+    try:
+        return cik, render_company(cik, frame, charts, chart_dir), take_records()
+    except Exception as e:
+        log.error("%s: %s", cik, e)
+        return cik, None, take_records()
+
+
+def render_charts(frames, chart_dir=CHART_DIR, workers=WORKERS, force=False, log_level=None):
+    """
+    Render the chart pack for {cik: master frame} (ratios included) on a process pool,
+    skipping charts whose data hash is unchanged. Returns {cik: {chart: "rendered" |
+    "unchanged" | "failed"}}; charts without any data are not listed.
+    """
+    os.makedirs(chart_dir, exist_ok=True)
+    columns = chart_columns()
+    status, pending, tasks = {}, {}, []
+    for cik, frame in frames.items():
+        cik = normalize_cik(cik)
+        manifest = {} if force else load_manifest(chart_dir, cik)
+        status[cik] = {}
+        for chart, digest in chart_hashes(cik, frame).items():
+            if is_current(chart_dir, cik, chart, digest, manifest):
+                status[cik][chart] = "unchanged"
+            else:
+                pending.setdefault(cik, {})[chart] = digest
+        if cik in pending:
+            tasks.append((cik, frame.reindex(columns=columns), list(pending[cik]), chart_dir))
+    log.info("%d of %d companies have charts to render", len(tasks), len(frames))
+
+    workers = max(1, min(workers, len(tasks) or 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(log_level,)) as pool:
+            results = list(pool.map(_render_company_safe, tasks))
+    else:
+        results = [_render_company_safe(task) for task in tasks]
+
+    for cik, paths, records in results:
+        if workers > 1:
+            add_records(records)
+        if paths is None:
+            status[cik].update({chart: "failed" for chart in pending[cik]})
+            continue
+        manifest = load_manifest(chart_dir, cik)
+        manifest.update({chart: pending[cik][chart] for chart in paths})
+        write_atomic(manifest_path(chart_dir, cik), json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"))
+        status[cik].update({chart: "rendered" for chart in paths})
+    return status
+
+
+def universe_frames(universe):
+    """{cik: year-indexed master frame} from a (CIK, Year) universe frame."""
+    return {cik: frame.droplevel("CIK") for cik, frame in universe.groupby(level="CIK", sort=False)}
+
+
+def read_universe(path):
+    """A universe file written by cli.py (csv or parquet) as a (CIK, Year) frame."""
+    if path.endswith(".parquet"):
+        universe = pd.read_parquet(path)
+    else:
+        universe = pd.read_csv(path, dtype={"CIK": str}).set_index(["CIK", "Year"])
+    return universe
+
+
+if __name__ == "__main__":
+    configure_logging()
+    configure_profiling()
+    args = [arg for arg in sys.argv[1:] if arg != "--force"]
+    path = args[0] if args else os.path.join("output", "UNIVERSE_MASTER.csv")
+    status = render_charts(universe_frames(read_universe(path)), force="--force" in sys.argv)
+    counts = pd.Series([s for charts in status.values() for s in charts.values()]).value_counts()
+    print(f"Charts for {len(status)} companies in {CHART_DIR}: " + ", ".join(f"{n} {s}" for s, n in counts.items()))
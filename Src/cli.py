@@ -0,0 +1,221 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import edgar_client
+import settings
+from charts import render_charts
+from diagnostics import configure_logging, get_logger
+from MasterAnalysisFinal import extract_company, run_master_analysis
+from profiling import add_records, configure_profiling, reset_records, take_records
+from statement_engine import STATEMENTS, create_dataframes
+from taxonomies import with_currency
+from ticker_index import resolve_many
+from warehouse import get_warehouse
+
+log = get_logger("cli")
+
+# ==========================================
+# CLI CONFIGURATION
+# ==========================================
+# One entry point for the whole extract -> consolidate -> ratio pipeline, per company,
+# across companies in parallel:
+#
+#   python src/cli.py 1045810 320193 --years 2016-2025 --workers 4
+#   python src/cli.py NVDA AMD "apple inc" --workers 2
+#   python src/cli.py --cik-file ciks.txt --statements IS,CF --format parquet
+#   python src/cli.py --ticker-file tickers.txt --user-agent "Jane Doe jane@example.com"
+#   python src/cli.py NVDA AMD --charts charts
+#
+# Per company it writes the selected statements ({CIK}_Income_Statement.csv, ...) and the
+# master analysis ({CIK}_MASTER_ANALYSIS.csv); across companies UNIVERSE_MASTER.csv with a
+# (CIK, Year) index. With --charts, the chart pack (charts.py) of every company whose
+# chart data changed. Exit status is 1 if any company failed.
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "json": ".json"}
+MASTER_SUFFIX = "MASTER_ANALYSIS"
+UNIVERSE_FILE = "UNIVERSE_MASTER"
+DEFAULT_WORKERS = 4
+DEFAULT_OUTPUT_DIR = "output"
+
+
+# ==========================================
+# INPUTS
+# ==========================================
+
+def read_list_file(path):
+    """Non-empty, non-comment lines of a text file (first whitespace-separated field of each)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.split()[0] for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def parse_years(text):
+    """'2014-2025' -> (2014, 2025); '2024' -> (2024, 2024)."""
+    first, _, last = text.partition("-")
+    try:
+        return int(first), int(last or first)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YEAR or FIRST-LAST, got {text!r}")
+
+
+def parse_statements(text):
+    keys = [key.strip().upper() for key in text.split(",") if key.strip()]
+    unknown = set(keys) - set(STATEMENTS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown statement(s) {sorted(unknown)} (expected {list(STATEMENTS)})")
+    return keys
+
+
+def collect_ciks(args):
+    """
+    CIKs from the positional list, --cik-file and --ticker-file, de-duplicated in order.
+    Tickers and names go through the cached ticker index (ticker_index); unknown ones are logged and left out.
+    """
+    identifiers = list(args.ciks)
+    if args.cik_file:
+        identifiers += read_list_file(args.cik_file)
+    if args.ticker_file:
+        identifiers += read_list_file(args.ticker_file)
+    return list(dict.fromkeys(resolve_many(identifiers).values()))
+
+
+# ==========================================
+# PIPELINE
+# ==========================================
+
+def write_frame(df, path, fmt, index=True):
+    """Write a frame as csv / parquet / json (table schema, so a (CIK, Year) index round-trips)."""
+    if fmt == "csv":
+        df.to_csv(path, index=index)
+        return path
+    df = df.copy()
+    df.columns = [str(column) for column in df.columns]
+    if fmt == "parquet":
+        df.to_parquet(path, index=index)
+    else:
+        df.to_json(path, orient="table", index=index)
+    return path
+
+
+def output_path(output_dir, cik, suffix, fmt):
+    return os.path.join(output_dir, f"{cik}_{suffix}{FORMATS[fmt]}")
+
+
+def run_company(cik, statements=tuple(STATEMENTS), fmt="csv", output_dir=DEFAULT_OUTPUT_DIR, master=True,
+                warehouse=None):
+    """
+    Extract, consolidate and ratio one company and write its outputs
+    (and its selected facts to the warehouse file, if given).
+    Returns (master frame or None with master=False, reporting currency).
+    """
+    extracted, concepts, currency = extract_company(cik, warehouse=get_warehouse(warehouse) if warehouse else None)
+    for key, df in create_dataframes({key: extracted[key] for key in statements}, cik).items():
+        write_frame(df, output_path(output_dir, cik, STATEMENTS[key][3], fmt), fmt, index=False)
+    if not master:
+        return None, currency
+    master_df = run_master_analysis(cik, extracted, concepts)
+    write_frame(master_df, output_path(output_dir, cik, MASTER_SUFFIX, fmt), fmt)
+    return master_df, currency
+
+
+def init_worker(first_year, last_year, user_agent, rate, log_level):
+    """Worker process setup: the parent's settings, an even share of the SEC rate limit, no inherited records."""
+    settings.set_year_window(first_year, last_year)
+    settings.set_user_agent(user_agent)
+    edgar_client.MAX_REQUESTS_PER_SECOND = rate
+    configure_logging(log_level)
+    reset_records()
+
+
+def _run_company_safe(args):
+    """Worker entry point: (cik, run_company result or None, error or None, stage records from this task)."""
+    cik, options = args
+    try:
+        return cik, run_company(cik, **options), None, take_records()
+    except Exception as e:
+        log.error("%s: %s", cik, e)
+        return cik, None, repr(e), take_records()
+
+
+def run_pipeline(ciks, statements=tuple(STATEMENTS), fmt="csv", output_dir=DEFAULT_OUTPUT_DIR,
+                 workers=DEFAULT_WORKERS, master=True, log_level=None, warehouse=None, charts=None):
+    """
+    Run every company through the pipeline on a process pool (in-process with workers=1),
+    then render the chart pack into the charts directory, if given.
+    Returns (universe frame indexed by (CIK, Year) with each company's reporting Currency, {cik: error}).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    options = {"statements": tuple(statements), "fmt": fmt, "output_dir": output_dir, "master": master,
+               "warehouse": warehouse}
+    tasks = [(cik, options) for cik in ciks]
+    workers = max(1, min(workers, len(ciks) or 1))
+    if workers == 1:
+        results = [_run_company_safe(task) for task in tasks]
+    else:
+        initargs = (*settings.year_window(), settings.USER_AGENT,
+                    edgar_client.MAX_REQUESTS_PER_SECOND / workers, log_level)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+            results = list(pool.map(_run_company_safe, tasks))
+
+    frames, currencies, errors = {}, {}, {}
+    for cik, result, error, records in results:
+        if workers > 1:
+            add_records(records)
+        if error is not None:
+            errors[cik] = error
+        elif result[0] is not None:
+            frames[cik], currencies[cik] = result
+    universe = with_currency(pd.concat(frames, names=["CIK"]), currencies) if frames else pd.DataFrame()
+    if master and not universe.empty:
+        write_frame(universe, os.path.join(output_dir, UNIVERSE_FILE + FORMATS[fmt]), fmt)
+    if charts and frames:
+        render_charts(frames, charts, workers, log_level=log_level)
+    return universe, errors
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extract SEC EDGAR statements, build master analyses and ratios.")
+    parser.add_argument("ciks", nargs="*", help="CIKs (leading zeros and a CIK prefix are optional), tickers or company names")
+    parser.add_argument("--cik-file", help="text file with one CIK per line (# comments allowed)")
+    parser.add_argument("--ticker-file", help="text file with one ticker per line, resolved to CIKs")
+    parser.add_argument("--years", type=parse_years, default=settings.year_window(),
+                        help="fiscal years FIRST-LAST or a single YEAR (default %(default)s)")
+    parser.add_argument("--statements", type=parse_statements, default=list(STATEMENTS),
+                        help="statements to write, e.g. IS,BS,CF (default: all)")
+    parser.add_argument("--no-master", dest="master", action="store_false",
+                        help="write the statements only, no master analysis or universe file")
+    parser.add_argument("--format", choices=list(FORMATS), default="csv", help="output format (default csv)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="worker processes (default %(default)s)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="output directory (default %(default)s)")
+    parser.add_argument("--charts", metavar="DIR",
+                        help="render the chart pack (revenue vs. margin, stress fan, FCF) into DIR")
+    parser.add_argument("--warehouse", help="also upsert the selected facts and provenance into this SQLite file")
+    parser.add_argument("--user-agent", default=settings.USER_AGENT,
+                        help="User-Agent sent to SEC, with a contact address (default: $SEC_USER_AGENT)")
+    parser.add_argument("--log-level", default=None, help="DEBUG, INFO, WARNING, ... (default: $LOG_LEVEL)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    configure_logging(args.log_level)
+    configure_profiling()
+    settings.set_year_window(*args.years)
+    settings.set_user_agent(args.user_agent)
+
+    ciks = collect_ciks(args)
+    if not ciks:
+        build_parser().error("no companies given (CIKs, --cik-file or --ticker-file)")
+    universe, errors = run_pipeline(ciks, args.statements, args.format, args.output_dir,
+                                    args.workers, args.master, args.log_level, args.warehouse,
+                                    args.charts)
+    done = len(ciks) - len(errors)
+    print(f"{done}/{len(ciks)} companies processed for {args.years[0]}-{args.years[1]} into {args.output_dir}")
+    for cik, error in errors.items():
+        print(f"  {cik}: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from annual_selection import RULES, master_panel, period_columns, tag_unit_mask
+from diagnostics import get_logger
+from edgar_cache import CACHE_DIR, get_cache, normalize_cik, write_atomic
+from edgar_client import get_company_facts_path, load_company_facts
+from facts_stream import wanted_facts
+from settings import year_window
+from statement_engine import load_statement_module
+from taxonomies import TAXONOMY_ALIASES, company_facts_view, reporting_currencies, view_fact_rows, with_currency
+
+log = get_logger("concept_index")
+
+# ==========================================
+# CONCEPT REGISTRY
+# ==========================================
+# One canonical line item per concept, resolved through an ordered fallback chain
+# of XBRL tags: for every year the first tag in the chain with an annual value wins.
+# The statement key picks the annual-selection rules (IS/CF = duration facts, BS = instants).
+# Tags are us-gaap names; IFRS filers and dei cover facts are read through taxonomies.TaxonomyView.
+#   concept: (statement, unit, [tags in precedence order])
+TAXONOMY = "us-gaap"
+
+CONCEPTS = {
+    # Income statement
+    "Revenue": ("IS", "USD", ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax", "SalesRevenueNet"]),
+    "CostOfRevenue": ("IS", "USD", ["CostOfRevenue", "CostOfGoodsAndServicesSold"]),
+    "OperatingExpenses": ("IS", "USD", ["OperatingExpenses", "CostsAndExpenses"]),
+    "OperatingIncome": ("IS", "USD", ["OperatingIncomeLoss"]),
+    "InterestExpense": ("IS", "USD", ["InterestExpense", "InterestExpenseDebt", "InterestExpenseBorrowings"]),
+    "PretaxIncome": ("IS", "USD", [
+        "IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest",
+        "IncomeLossFromContinuingOperationsBeforeIncomeTaxesMinorityInterestAndIncomeLossFromEquityMethodInvestments",
+    ]),
+    "IncomeTax": ("IS", "USD", ["IncomeTaxExpenseBenefit"]),
+    "NetIncome": ("IS", "USD", ["NetIncomeLoss", "ProfitLoss", "NetIncomeLossAvailableToCommonStockholdersBasic"]),
+    "EPSBasic": ("IS", "USD/shares", ["EarningsPerShareBasic"]),
+    "EPSDiluted": ("IS", "USD/shares", ["EarningsPerShareDiluted"]),
+    "SharesDiluted": ("IS", "shares", ["WeightedAverageNumberOfDilutedSharesOutstanding"]),
+    "SharesOutstanding": ("BS", "shares", ["CommonStockSharesOutstanding"]),
+
+    # Balance sheet
+    "Cash": ("BS", "USD", ["CashAndCashEquivalentsAtCarryingValue", "CashAndDueFromBanks"]),
+    "MarketableSecurities": ("BS", "USD", [
+        "MarketableSecuritiesCurrent", "AvailableForSaleSecuritiesDebtSecuritiesCurrent", "ShortTermInvestments",
+    ]),
+    "Receivables": ("BS", "USD", ["AccountsReceivableNetCurrent", "ReceivablesNetCurrent"]),
+    "Inventory": ("BS", "USD", ["InventoryNet"]),
+    "CurrentAssets": ("BS", "USD", ["AssetsCurrent"]),
+    "TotalAssets": ("BS", "USD", ["Assets"]),
+    "CurrentLiabilities": ("BS", "USD", ["LiabilitiesCurrent"]),
+    "TotalLiabilities": ("BS", "USD", ["Liabilities"]),
+    "LongTermDebt": ("BS", "USD", ["LongTermDebtNoncurrent", "LongTermDebt"]),
+    "StockholdersEquity": ("BS", "USD", [
+        "StockholdersEquity", "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest",
+    ]),
+
+    # Cash flow
+    "OperatingCashFlow": ("CF", "USD", [
+        "NetCashProvidedByUsedInOperatingActivities", "NetCashProvidedByUsedInOperatingActivitiesContinuingOperations",
+    ]),
+    "CapitalExpenditure": ("CF", "USD", [
+        "PaymentsToAcquirePropertyPlantAndEquipment", "PaymentsToAcquireProductiveAssets", "CapitalExpenditures",
+    ]),
+    "InvestingCashFlow": ("CF", "USD", ["NetCashProvidedByUsedInInvestingActivities"]),
+    "FinancingCashFlow": ("CF", "USD", ["NetCashProvidedByUsedInFinancingActivities"]),
+    "ShareBasedCompensation": ("CF", "USD", ["ShareBasedCompensation", "AllocatedShareBasedCompensationExpense"]),
+    "DepreciationAndAmortization": ("CF", "USD", [
+        "DepreciationDepletionAndAmortization", "DepreciationAmortizationAndAccretionNet", "DepreciationAndAmortization",
+    ]),
+}
+
+CONCEPT_CACHE_DIR = os.environ.get("CONCEPT_CACHE_DIR", os.path.join(os.path.dirname(CACHE_DIR), "concepts"))
+RESOLUTION_FORMAT = 2   # bump when the cached per-year info changes shape (2: selection provenance kept)
+
+
+def registry_version(concepts=CONCEPTS):
+    """Short hash of the registry, taxonomy aliases and resolution format; cached resolutions from another one are ignored."""
+    payload = json.dumps([concepts, TAXONOMY_ALIASES, RESOLUTION_FORMAT], sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def concept_tags(concepts=CONCEPTS):
+    """{tag: {unit, ...}} for every tag some chain can fall back to."""
+    wanted = {}
+    for _, unit, chain in concepts.values():
+        for tag in chain:
+            wanted.setdefault(tag, set()).add(unit)
+    return wanted
+
+
+# ==========================================
+# RESOLUTION
+# ==========================================
+
+def resolve_concepts(xbrl_data, concepts=CONCEPTS):
+    """
+    Resolve every concept for every year in one pass over its chain.
+    Returns {concept: {year: {"value": ..., "tag": ..., <provenance>}}}; a year takes the first tag
+    in the chain that has an annual value for it, with the form/period details it was selected on.
+    """
+    selections = {}
+    resolved = {}
+    for concept, (statement, unit, chain) in concepts.items():
+        years = {}
+        for tag in chain:
+            entries = xbrl_data.get(tag, {}).get("units", {}).get(unit)
+            if not entries:
+                continue
+            key = (statement, tag, unit)
+            if key not in selections:
+                selections[key] = load_statement_module(statement).select_annual_entries(entries, unit)
+            for year, info in selections[key].items():
+                years.setdefault(year, dict(info, tag=tag))
+        resolved[concept] = dict(sorted(years.items()))
+    return resolved
+
+
+def document_version(meta):
+    """Version of a cached companyfacts document, from its cache metadata (changes whenever SEC's copy does)."""
+    if not meta:
+        return None
+    return meta.get("etag") or meta.get("last_modified") or f"{meta.get('size')}@{meta.get('fetched_at')}"
+
+
+def _from_json(info):
+    """Cached per-year info as resolve_concepts returns it (JSON turns the score tuple into a list)."""
+    if isinstance(info.get("score"), list):
+        info["score"] = tuple(info["score"])
+    return info
+
+
+class ConceptIndex:
+    """
+    Memoized concept resolutions, keyed by CIK and taxonomy and stamped with the
+    document version, registry hash and fiscal-year window they were computed from.
+    Kept in memory and as one small JSON file per CIK/taxonomy under cache_dir.
+    """
+
+    def __init__(self, concepts=CONCEPTS, taxonomy=TAXONOMY, cache_dir=CONCEPT_CACHE_DIR):
+        self.concepts = concepts
+        self.taxonomy = taxonomy
+        self.cache_dir = cache_dir
+        self.registry = registry_version(concepts)
+        self.memory = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, cik):
+        return os.path.join(self.cache_dir, f"CIK{normalize_cik(cik)}.{self.taxonomy}.json")
+
+    def lookup(self, cik, version):
+        """Cached resolution for this CIK at this document version and the current year window, or None."""
+        if version is None:
+            return None
+        cik = normalize_cik(cik)
+        entry = self.memory.get(cik)
+        if entry is None:
+            try:
+                with open(self.path(cik), "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (FileNotFoundError, ValueError):
+                return None
+            entry["concepts"] = {
+                concept: {int(year): _from_json(info) for year, info in years.items()}
+                for concept, years in entry["concepts"].items()
+            }
+            self.memory[cik] = entry
+        if (entry.get("version") != version or entry.get("registry") != self.registry
+                or entry.get("years") != list(year_window())):
+            return None
+        return entry["concepts"]
+
+    def store(self, cik, version, resolved):
+        cik = normalize_cik(cik)
+        entry = {"cik": cik, "taxonomy": self.taxonomy, "version": version,
+                 "registry": self.registry, "years": list(year_window()), "concepts": resolved}
+        self.memory[cik] = entry
+        if version is not None:
+            write_atomic(self.path(cik), json.dumps(entry).encode("utf-8"))
+
+    def resolve(self, xbrl_data, cik=None, version=None):
+        """Resolve one company's facts for this index's taxonomy, through the cache when cik/version are known."""
+        if cik is not None:
+            cached = self.lookup(cik, version)
+            if cached is not None:
+                return cached
+        resolved = resolve_concepts(xbrl_data, self.concepts)
+        if cik is not None:
+            self.store(cik, version, resolved)
+        return resolved
+
+
+_default_index = None
+
+
+def get_concept_index():
+    global _default_index
+    if _default_index is None:
+        _default_index = ConceptIndex()
+    return _default_index
+
+
+def concepts_for_view(view, cik, headers=None, index=None):
+    """
+    Concept resolution for a company already decoded from the companyfacts cache,
+    through the index at the cached document's version.
+    """
+    version = document_version(get_cache(headers).load_meta(cik))
+    return (index or get_concept_index()).resolve(view, cik, version)
+
+
+def concepts_for_cik(cik, headers=None, index=None):
+    """
+    Concept resolution for one CIK. When the cached companyfacts document has not
+    changed since the last resolution, the document is not even decoded.
+    """
+    index = index or get_concept_index()
+    path = get_company_facts_path(cik, headers)
+    if path is None:
+        return {concept: {} for concept in index.concepts}
+    version = document_version(get_cache(headers).load_meta(cik))
+    cached = index.lookup(cik, version)
+    if cached is not None:
+        log.debug("Concept index hit for %s (%s)", normalize_cik(cik), version)
+        return cached
+    data = load_company_facts(path, cik, wanted_facts(concept_tags(index.concepts)))
+    return index.resolve(company_facts_view(data), cik, version)
+
+
+def concept_frame(resolved):
+    """{concept: {year: {"value", "tag"}}} -> float64 frame indexed by Year, one column per concept."""
+    df = pd.DataFrame.from_dict(
+        {concept: {year: info["value"] for year, info in years.items()} for concept, years in resolved.items()},
+        orient="columns", dtype="float64",
+    )
+    df.index = df.index.astype("int64")
+    df.index.name = "Year"
+    return df.sort_index()
+
+
+# ==========================================
+# FACT-TABLE (VECTORIZED) RESOLUTION
+# ==========================================
+
+def concept_panel(facts, concepts=CONCEPTS):
+    """
+    (CIK, Year) x concept frame for every company in a fact table, using the batched
+    annual-selection rules and the same chain precedence as resolve_concepts.
+    """
+    facts = view_fact_rows(facts)
+    p = period_columns(facts[tag_unit_mask(facts, concept_tags(concepts))])
+    chosen = []
+    for statement, rule in RULES.items():
+        wanted = {}
+        for _, (stmt, unit, chain) in concepts.items():
+            if stmt == statement:
+                for tag in chain:
+                    wanted.setdefault(tag, set()).add(unit)
+        if wanted:
+            chosen.append(rule(p[tag_unit_mask(p, wanted)]).assign(statement=statement))
+    columns = ["cik", "tag", "unit", "year", "value", "statement"]
+    chosen = pd.concat([c[columns] for c in chosen], ignore_index=True) if chosen else pd.DataFrame(columns=columns)
+    chosen = chosen.assign(cik=chosen["cik"].astype(str), tag=chosen["tag"].astype(str), unit=chosen["unit"].astype(str))
+
+    chains = pd.DataFrame(
+        [(concept, statement, unit, tag, rank)
+         for concept, (statement, unit, chain) in concepts.items() for rank, tag in enumerate(chain)],
+        columns=["concept", "statement", "unit", "tag", "rank"],
+    )
+    rows = chosen.merge(chains, on=["statement", "tag", "unit"])
+    rows = rows.sort_values(["cik", "concept", "year", "rank"], kind="mergesort")
+    rows = rows.drop_duplicates(["cik", "concept", "year"])
+    panel = rows.pivot_table(index=["cik", "year"], columns="concept", values="value", aggfunc="first")
+    panel.index = panel.index.set_names(["CIK", "Year"])
+    panel.columns.name = None
+    return panel.reindex(columns=list(concepts)).astype("float64")
+
+
+def universe_master_panel(facts, concepts=CONCEPTS):
+    """annual_selection.master_panel plus one column per concept."""
+    panel = master_panel(facts)
+    return with_currency(panel.join(concept_panel(facts, concepts), how="outer"), reporting_currencies(facts))
@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter
+
+# ==========================================
+# LOGGING, STAGE COUNTERS, SELECTION TRACE
+# ==========================================
+# Everything logs under the "financial_analysis" logger, which has a NullHandler and
+# so stays silent until configure_logging() (or the host application) attaches a handler.
+#
+#   LOG_LEVEL=DEBUG  python "src/Income statement.py"       # per-tag detail
+#   SELECTION_TRACE=trace.jsonl python src/statement_engine.py
+#
+# Per-stage counters (tags_found, tags_missing, units_missing, facts_scanned,
+# facts_kept) are always collected; they are plain integer adds. The selection
+# trace writes one JSON line per chosen (tag, year) with the provenance it was
+# chosen on, and costs nothing while no sink is open.
+
+LOGGER_NAME = "financial_analysis"
+LOG_LEVEL_ENV = "LOG_LEVEL"
+TRACE_ENV = "SELECTION_TRACE"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+_counters = {}
+_counters_lock = threading.Lock()
+_trace_file = None
+_trace_lock = threading.Lock()
+
+
+def get_logger(name):
+    """Child logger, e.g. get_logger("income_statement") -> financial_analysis.income_statement."""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def configure_logging(level=None, trace_path=None):
+    """
+    Attach a stderr handler at `level` (default: $LOG_LEVEL, else WARNING) and open the
+    JSON-lines selection trace at `trace_path` (default: $SELECTION_TRACE, else none).
+    """
+    level = level or os.environ.get(LOG_LEVEL_ENV, "WARNING")
+    root = logging.getLogger(LOGGER_NAME)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    if not any(isinstance(h, logging.StreamHandler) and not isinstance(h, logging.NullHandler)
+               for h in root.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+    trace_path = trace_path or os.environ.get(TRACE_ENV)
+    if trace_path:
+        open_trace(trace_path)
+
+
+# ---------- stage counters ----------
+
+def count(stage, name, n=1):
+    """Add n to one counter of one stage (e.g. count("IS", "facts_scanned", 120))."""
+    with _counters_lock:
+        _counters.setdefault(stage, Counter())[name] += n
+
+
+def get_counters():
+    """{stage: {counter: total}} snapshot."""
+    with _counters_lock:
+        return {stage: dict(counts) for stage, counts in _counters.items()}
+
+
+def reset_counters():
+    with _counters_lock:
+        _counters.clear()
+
+
+def log_counters(logger=None, level=logging.INFO):
+    logger = logger or logging.getLogger(LOGGER_NAME)
+    for stage, counts in sorted(get_counters().items()):
+        logger.log(level, "%s: %s", stage, ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+
+
+# ---------- selection trace ----------
+
+def open_trace(path):
+    """Start appending selection-trace records to a JSON-lines file."""
+    global _trace_file
+    close_trace()
+    _trace_file = open(path, "a", encoding="utf-8")
+
+
+def close_trace():
+    global _trace_file
+    if _trace_file is not None:
+        _trace_file.close()
+        _trace_file = None
+
+
+def tracing():
+    """True while a trace sink is open; check before building trace records in hot loops."""
+    return _trace_file is not None
+
+
+def trace(record):
+    """Write one record to the trace sink (no-op when none is open)."""
+    if _trace_file is None:
+        return
+    line = json.dumps(record, default=str)
+    with _trace_lock:
+        _trace_file.write(line + "\n")
+
+
+def trace_selection(stage, tag, label, category, annual_by_year, cik=None):
+    """One trace line per selected year of a tag, carrying the info the selection was made on."""
+    if _trace_file is None:
+        return
+    for year, info in sorted(annual_by_year.items()):
+        trace({"stage": stage, "cik": cik, "tag": tag, "label": label, "category": category,
+               "year": year, **info})
@@ -0,0 +1,230 @@
+import json
+import os
+import tempfile
+import time
+
+import requests
+
+from diagnostics import get_logger
+from settings import HEADERS
+
+log = get_logger("edgar_cache")
+
+BASE_URL = "https://data.sec.gov"
+
+# ==========================================
+# CACHE CONFIGURATION
+# ==========================================
+CACHE_DIR = os.environ.get(
+    "EDGAR_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "financial-analysis-engine", "companyfacts"),
+)
+CACHE_TTL_SECONDS = 24 * 60 * 60          # re-use a download for one day without asking SEC
+CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2 GB, least recently used files are evicted first
+
+
+def normalize_cik(cik):
+    """Return the 10-digit zero-padded CIK used by the SEC API ('1045810' -> '0001045810')."""
+    return str(int(str(cik).strip().upper().replace("CIK", ""))).zfill(10)
+
+
+class CompanyFactsCache:
+    """
+    Persistent companyfacts cache keyed by CIK.
+
+    Each CIK is stored as two files in cache_dir:
+    - CIK##########.json       raw response body
+    - CIK##########.meta.json  etag, last_modified, fetched_at, last_access, size
+
+    Entries younger than ttl are served straight from disk. Older entries are
+    revalidated with If-None-Match / If-Modified-Since, so an unchanged
+    document costs a 304 instead of a full download.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, ttl=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES,
+                 headers=None, base_url=BASE_URL, session=None):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.headers = headers or HEADERS
+        self.base_url = base_url
+        self.session = session or requests.Session()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def url(self, cik):
+        return f"{self.base_url}/api/xbrl/companyfacts/CIK{normalize_cik(cik)}.json"
+
+    def data_path(self, cik):
+        return os.path.join(self.cache_dir, f"CIK{normalize_cik(cik)}.json")
+
+    def meta_path(self, cik):
+        return os.path.join(self.cache_dir, f"CIK{normalize_cik(cik)}.meta.json")
+
+    def load_meta(self, cik):
+        try:
+            with open(self.meta_path(cik), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save_meta(self, cik, meta):
+        write_atomic(self.meta_path(cik), json.dumps(meta).encode("utf-8"))
+
+    def is_fresh(self, meta):
+        return meta is not None and (time.time() - meta.get("fetched_at", 0)) < self.ttl
+
+    def get_path(self, cik):
+        """
+        Make sure an up-to-date copy of the document is on disk and return its path.
+        Returns None if the document is neither cached nor downloadable.
+        """
+        path, headers = self.lookup(cik)
+        if path is not None:
+            return path
+        response = self.session.get(self.url(cik), headers=headers)
+        return self.resolve(cik, response.status_code, response.content, response.headers)
+
+    def lookup(self, cik, revalidate=False):
+        """
+        Check the cache before going to the network.
+        Returns (path, None) for a fresh hit, otherwise (None, request_headers) where
+        the headers carry If-None-Match / If-Modified-Since when a stale copy exists.
+        revalidate=True skips the TTL shortcut and always asks SEC (a 304 is cheap).
+        """
+        meta = self.load_meta(cik)
+        if meta is not None and os.path.exists(self.data_path(cik)):
+            if self.is_fresh(meta) and not revalidate:
+                self.touch(cik, meta)
+                return self.data_path(cik), None
+            headers = dict(self.headers)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+            return None, headers
+        return None, dict(self.headers)
+
+    def resolve(self, cik, status_code, body, response_headers):
+        """Apply an HTTP response to the cache and return the path to serve (None if nothing usable)."""
+        meta = self.load_meta(cik)
+        cached = meta is not None and os.path.exists(self.data_path(cik))
+
+        if status_code == 304 and cached:
+            meta["fetched_at"] = time.time()
+            self.touch(cik, meta)
+            return self.data_path(cik)
+
+        if status_code == 200:
+            self.store(cik, body, response_headers)
+            return self.data_path(cik)
+
+        log.warning("companyfacts request for %s failed with status %s", normalize_cik(cik), status_code)
+        if cached:
+            # Serve the stale copy rather than nothing
+            self.touch(cik, meta)
+            return self.data_path(cik)
+        return None
+
+    def get(self, cik):
+        """Return the full companyfacts document for a CIK as a dict ({} if unavailable)."""
+        path = self.get_path(cik)
+        if path is None:
+            return {}
+        with open(path, "rb") as f:
+            return json.load(f)
+
+    def store(self, cik, body, response_headers=None):
+        """Write a downloaded body (bytes) into the cache and enforce the size cap."""
+        write_atomic(self.data_path(cik), body)
+        self.stored(cik, len(body), response_headers)
+
+    def temp_path(self, cik):
+        """
+        New scratch file a streamed download is written to before commit(); unique per call,
+        so concurrent downloads of one CIK (in one process or several) never share it.
+        """
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, prefix=f"{os.path.basename(self.data_path(cik))}.",
+                                         suffix=".tmp", delete=False) as f:
+            return f.name
+
+    def commit(self, cik, tmp_path, response_headers=None):
+        """Move a fully streamed download into place (same bookkeeping as store())."""
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, self.data_path(cik))
+        self.stored(cik, size, response_headers)
+        return self.data_path(cik)
+
+    def stored(self, cik, size, response_headers=None):
+        response_headers = response_headers or {}
+        now = time.time()
+        self.save_meta(cik, {
+            "cik": normalize_cik(cik),
+            "etag": response_headers.get("ETag"),
+            "last_modified": response_headers.get("Last-Modified"),
+            "fetched_at": now,
+            "last_access": now,
+            "size": size,
+        })
+        self.evict()
+
+    def touch(self, cik, meta):
+        meta["last_access"] = time.time()
+        self.save_meta(cik, meta)
+
+    def entries(self):
+        """List the metadata of every cached CIK."""
+        result = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".meta.json"):
+                try:
+                    with open(os.path.join(self.cache_dir, name), "r", encoding="utf-8") as f:
+                        result.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return result
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self.entries(), key=lambda m: m.get("last_access", 0))
+        total = sum(m.get("size", 0) for m in entries)
+        # Always keep the most recently used entry, even if it alone exceeds the cap
+        while total > self.max_bytes and len(entries) > 1:
+            oldest = entries.pop(0)
+            self.remove(oldest["cik"])
+            total -= oldest.get("size", 0)
+
+    def remove(self, cik):
+        for path in (self.data_path(cik), self.meta_path(cik)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def write_atomic(path, data):
+    """Write bytes to a unique scratch file next to path, then move it into place."""
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=f"{os.path.basename(path)}.",
+                                     suffix=".tmp", delete=False) as f:
+        f.write(data)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+_default_caches = {}
+
+
+def get_cache(headers=None):
+    """Return a process-wide cache instance (one per User-Agent)."""
+    headers = headers or HEADERS
+    key = headers.get("User-Agent")
+    if key not in _default_caches:
+        _default_caches[key] = CompanyFactsCache(headers=headers)
+    return _default_caches[key]
+
+
+def get_company_facts(cik, headers=None):
+    """Fetch the companyfacts document for a CIK through the shared on-disk cache."""
+    return get_cache(headers).get(cik)
@@ -0,0 +1,282 @@
+import asyncio
+import atexit
+import json
+import os
+import random
+import threading
+import time
+
+import aiohttp
+
+from diagnostics import get_logger
+from facts_stream import read_company_facts, stream_company_facts_async
+from profiling import stage
+from edgar_cache import BASE_URL, HEADERS, CompanyFactsCache, get_cache, normalize_cik
+
+# ==========================================
+# CLIENT CONFIGURATION
+# ==========================================
+MAX_REQUESTS_PER_SECOND = 10    # SEC fair-access limit per User-Agent (split it across worker processes)
+MAX_CONNECTIONS = 10            # pooled connections shared by all requests
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+REQUEST_TIMEOUT_SECONDS = 60
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+log = get_logger("edgar_client")
+
+
+class TokenBucket:
+    """Async token bucket: at most `rate` acquisitions per second, bursts up to `capacity`."""
+
+    def __init__(self, rate=None, capacity=None):
+        self.rate = rate or MAX_REQUESTS_PER_SECOND
+        self.capacity = capacity or self.rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Full-jitter exponential backoff; a Retry-After header (seconds) is honoured as a floor."""
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+    if retry_after:
+        try:
+            delay = max(delay, float(retry_after))
+        except ValueError:
+            pass
+    return delay
+
+
+class AsyncEdgarClient:
+    """
+    asyncio client for data.sec.gov.
+
+    - one pooled aiohttp session for every request
+    - token bucket throttling (10 requests/second by default; pass bucket to share one)
+    - retries 429/5xx and connection errors with jittered exponential backoff
+    - companyfacts responses go through the on-disk CompanyFactsCache
+
+    Use as `async with AsyncEdgarClient(headers=HEADERS) as client: ...`
+    """
+
+    def __init__(self, headers=None, base_url=BASE_URL, cache=None,
+                 rate=None, max_connections=MAX_CONNECTIONS,
+                 max_retries=MAX_RETRIES, timeout=REQUEST_TIMEOUT_SECONDS, bucket=None):
+        self.headers = headers or HEADERS
+        self.base_url = base_url
+        self.cache = cache or CompanyFactsCache(headers=self.headers, base_url=base_url)
+        self.bucket = bucket or TokenBucket(rate)
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+    async def request(self, url, headers=None, consume=None):
+        """
+        GET a URL with throttling and retries.
+        Returns (status, body_bytes, response_headers); status is None if every attempt failed to connect.
+        With consume, a 200 response is handed to `await consume(response)` while it streams in
+        and its result takes the place of body_bytes (a dropped connection retries the whole call).
+        """
+        headers = headers or self.headers
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    if consume is not None and response.status == 200:
+                        return response.status, await consume(response), response.headers
+                    body = await response.read()
+                    if response.status not in RETRY_STATUSES or attempt == self.max_retries:
+                        return response.status, body, response.headers
+                    retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    log.warning("Giving up on %s: %r", url, e)
+                    return None, b"", {}
+                retry_after = None
+            await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+    async def get_company_facts_path(self, cik, revalidate=False):
+        """Refresh one CIK in the on-disk cache and return the file path (None if unavailable)."""
+        path, headers = self.cache.lookup(cik, revalidate=revalidate)
+        if path is not None:
+            return path
+        status, body, response_headers = await self.request(self.cache.url(cik), headers)
+        return self.cache.resolve(cik, status, body, response_headers)
+
+    async def get_company_facts(self, cik, revalidate=False, wanted=None):
+        """
+        Return the companyfacts document for a CIK as a dict ({} if unavailable).
+        wanted ({(taxonomy, tag)}, see facts_stream.wanted_facts) decodes only those facts:
+        a download is parsed as it streams in (and written to the cache on the way),
+        a cached copy is streamed from disk.
+        """
+        if wanted is None:
+            path = await self.get_company_facts_path(cik, revalidate=revalidate)
+            return {} if path is None else load_company_facts(path, cik)
+
+        path, headers = self.cache.lookup(cik, revalidate=revalidate)
+        if path is None:
+            tmp_path = self.cache.temp_path(cik)
+
+            async def consume(response):
+                with open(tmp_path, "wb") as sink:
+                    return await stream_company_facts_async(response.content, wanted, sink)
+
+            try:
+                status, data, response_headers = await self.request(self.cache.url(cik), headers, consume)
+                if status == 200:
+                    self.cache.commit(cik, tmp_path, response_headers)
+                    return data
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            path = self.cache.resolve(cik, status, b"", response_headers)
+        return {} if path is None else load_company_facts(path, cik, wanted)
+
+    async def get_submissions(self, cik):
+        """
+        Return the submissions index for a CIK (filing history: accession numbers,
+        forms, filing dates). Not cached: it is small and its whole point is freshness.
+        """
+        status, body, _ = await self.request(f"{self.base_url}/submissions/CIK{normalize_cik(cik)}.json")
+        if status != 200:
+            log.warning("submissions request for %s failed with status %s", normalize_cik(cik), status)
+            return {}
+        return json.loads(body)
+
+    async def fetch_many(self, ciks, decode=True, wanted=None):
+        """
+        Fetch many CIKs concurrently (throttled by the token bucket).
+        Returns {cik: document} or, with decode=False, {cik: cached file path} so large
+        batches can warm the cache without holding every document in memory.
+        wanted restricts decoded documents to those facts (see get_company_facts).
+        A CIK listed twice is fetched once.
+        """
+        ciks = list(dict.fromkeys(ciks))
+        if decode:
+            results = await asyncio.gather(*(self.get_company_facts(cik, wanted=wanted) for cik in ciks))
+        else:
+            results = await asyncio.gather(*(self.get_company_facts_path(cik) for cik in ciks))
+        return dict(zip(ciks, results))
+
+
+async def fetch_company_facts_many(ciks, headers=None, decode=True, wanted=None, **client_options):
+    async with AsyncEdgarClient(headers=headers, **client_options) as client:
+        return await client.fetch_many(ciks, decode=decode, wanted=wanted)
+
+
+def load_company_facts(path, cik=None, wanted=None):
+    """Decode a cached companyfacts file (timed as the "parse" stage); wanted streams only those facts."""
+    with stage("parse", normalize_cik(cik) if cik is not None else None) as s:
+        with open(path, "rb") as f:
+            data = json.load(f) if wanted is None else read_company_facts(f, wanted, os.path.getsize(path))
+        s["items"] = sum(len(tags) for tags in data.get("facts", {}).values())
+    return data
+
+
+# ==========================================
+# SYNCHRONOUS WRAPPERS
+# ==========================================
+# The extractor scripts, concept index and warehouse fetch one CIK at a time. Their calls all
+# run on one process-wide event loop with one client per User-Agent (a pooled session kept
+# open between calls) and one token bucket, so back-to-back calls reuse connections and stay
+# under MAX_REQUESTS_PER_SECOND together. A forked worker starts over with its own.
+_sync_loop = None
+_sync_bucket = None
+_sync_clients = {}     # User-Agent -> open AsyncEdgarClient
+_sync_lock = threading.Lock()
+
+
+def run_sync(call, headers=None):
+    """`await call(client)` on the process-wide loop, with the shared client for these headers."""
+    global _sync_loop, _sync_bucket
+    with _sync_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            _sync_bucket = TokenBucket()
+        cache = get_cache(headers)
+        key = (headers or HEADERS).get("User-Agent")
+        client = _sync_clients.get(key)
+        if client is not None and client.cache is not cache:
+            _sync_loop.run_until_complete(client.__aexit__(None, None, None))
+            client = None
+        if client is None:
+            client = AsyncEdgarClient(headers=headers, cache=cache, bucket=_sync_bucket)
+            _sync_loop.run_until_complete(client.__aenter__())
+            _sync_clients[key] = client
+        return _sync_loop.run_until_complete(call(client))
+
+
+def close_sync_clients():
+    """Close the shared sessions and loop (at exit; the next synchronous call opens new ones)."""
+    global _sync_loop, _sync_bucket
+    with _sync_lock:
+        if _sync_loop is None:
+            return
+        for client in _sync_clients.values():
+            _sync_loop.run_until_complete(client.__aexit__(None, None, None))
+        _sync_loop.run_until_complete(asyncio.sleep(0))   # let the connector close its sockets
+        _sync_loop.close()
+        _sync_loop, _sync_bucket = None, None
+        _sync_clients.clear()
+
+
+def _forget_sync_clients():
+    """In a forked child: drop the parent's loop and sessions without touching their sockets."""
+    global _sync_loop, _sync_bucket, _sync_lock
+    _sync_loop, _sync_bucket, _sync_lock = None, None, threading.Lock()
+    _sync_clients.clear()
+
+
+atexit.register(close_sync_clients)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_sync_clients)
+
+
+def get_company_facts_path(cik, headers=None):
+    """Synchronous cache refresh for one CIK; returns the cached file path (None if unavailable)."""
+    with stage("fetch", normalize_cik(cik)) as s:
+        path = run_sync(lambda client: client.get_company_facts_path(cik), headers)
+        s["items"] = 0 if path is None else 1
+    return path
+
+
+def get_company_facts(cik, headers=None, wanted=None):
+    """
+    Drop-in for edgar_cache.get_company_facts: same cache, but with timeouts,
+    retries and rate limiting. For use from the (synchronous) extractor scripts.
+    wanted decodes only those facts, streaming straight from the response or the cached file.
+    """
+    if wanted is None:
+        path = get_company_facts_path(cik, headers)
+        return {} if path is None else load_company_facts(path, cik)
+
+    with stage("fetch", normalize_cik(cik)) as s:
+        data = run_sync(lambda client: client.get_company_facts(cik, wanted=wanted), headers)
+        s["items"] = 1 if data else 0
+    return data
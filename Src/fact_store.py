@@ -0,0 +1,120 @@
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from edgar_cache import normalize_cik
+from edgar_client import get_company_facts
+from settings import HEADERS
+from ticker_index import resolve_many
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+#   python src/fact_store.py NVDA AMD     (tickers, CIKs or company names)
+FACT_STORE_DIR = "fact_store"  # one Parquet partition per CIK: fact_store/cik=0001045810/facts.parquet
+
+# Fields copied from each companyfacts entry. qtrs is not part of the SEC payload
+# today, but the selection rules read it, so it is carried through when present.
+ENTRY_FIELDS = ["val", "start", "end", "fy", "fp", "form", "frame", "filed", "accn", "qtrs"]
+FACT_COLUMNS = ["cik", "taxonomy", "tag", "unit"] + ENTRY_FIELDS
+
+# frame and qtrs repeat heavily (CY2024, CY2024Q4I, ...), so they are stored as categories too
+CATEGORY_COLUMNS = ["taxonomy", "tag", "unit", "fp", "form", "frame", "qtrs"]
+STRING_COLUMNS = ["cik", "accn"]
+DATE_COLUMNS = ["start", "end", "filed"]
+
+
+def flatten_company_facts(data, cik=None, taxonomies=None, tags=None):
+    """
+    Flatten one companyfacts document into a typed, one-row-per-fact table:
+    cik, taxonomy, tag, unit, val, start, end, fy, fp, form, frame, filed, accn, qtrs
+    taxonomies / tags restrict the flattening to the concepts a caller needs.
+    """
+    cik = normalize_cik(cik if cik is not None else data.get("cik", 0))
+    names = {"taxonomy": {}, "tag": {}, "unit": {}}     # value -> category code
+    blocks = {"taxonomy": [], "tag": [], "unit": []}    # one code per (taxonomy, tag, unit) block
+    counts = []
+    fields = {field: [] for field in ENTRY_FIELDS}
+
+    for taxonomy, concepts in data.get("facts", {}).items():
+        if taxonomies is not None and taxonomy not in taxonomies:
+            continue
+        for tag, concept in concepts.items():
+            if tags is not None and tag not in tags:
+                continue
+            for unit, entries in concept.get("units", {}).items():
+                for col, value in (("taxonomy", taxonomy), ("tag", tag), ("unit", unit)):
+                    blocks[col].append(names[col].setdefault(value, len(names[col])))
+                counts.append(len(entries))
+                for field in ENTRY_FIELDS:
+                    fields[field].extend([entry.get(field) for entry in entries])
+
+    df = pd.DataFrame({"cik": pd.array([cik] * sum(counts), dtype="string")})
+    for col in ("taxonomy", "tag", "unit"):
+        # Block-level codes repeated per fact: no per-fact string objects for these columns
+        codes = np.repeat(np.array(blocks[col], dtype=np.int32), counts)
+        df[col] = pd.Categorical.from_codes(codes, categories=list(names[col]))
+    for field in ENTRY_FIELDS:
+        df[field] = convert_fact_column(field, fields[field])
+    return df[FACT_COLUMNS]
+
+
+def convert_fact_column(field, values):
+    if field == "val":
+        return np.array(values, dtype="float64")
+    if field == "fy":
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").astype("Int64")
+    if field in DATE_COLUMNS:
+        return pd.to_datetime(pd.Series(values, dtype=object), format="%Y-%m-%d", errors="coerce")
+    series = pd.Series(values, dtype=object).astype("string")
+    return series.astype("category") if field in CATEGORY_COLUMNS else series
+
+
+def partition_path(root, cik):
+    return os.path.join(root, f"cik={normalize_cik(cik)}")
+
+
+def write_fact_store(df, root=FACT_STORE_DIR):
+    """Persist a fact table as Parquet, one partition per CIK (an existing partition is replaced)."""
+    for cik, part in df.groupby("cik", observed=True):
+        path = partition_path(root, cik)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+        part.drop(columns=["cik"]).to_parquet(os.path.join(path, "facts.parquet"), index=False)
+
+
+def read_fact_store(root=FACT_STORE_DIR, ciks=None, tags=None, taxonomy=None, columns=None):
+    """
+    Load facts for some or all CIKs. Filters are pushed down to the Parquet reader,
+    so a cross-company query on a handful of tags never materializes the rest.
+    """
+    filters = []
+    if ciks:
+        filters.append(("cik", "in", [normalize_cik(c) for c in ciks]))
+    if tags:
+        filters.append(("tag", "in", list(tags)))
+    if taxonomy:
+        filters.append(("taxonomy", "==", taxonomy))
+    df = pd.read_parquet(root, columns=columns, filters=filters or None)
+    if "cik" in df.columns:
+        # Partition values are inferred as integers on read; restore the zero-padded CIK
+        df["cik"] = df["cik"].astype(str).str.zfill(10).astype("string")
+    return df
+
+
+def ingest_cik(cik, root=FACT_STORE_DIR, headers=None):
+    """Fetch one company (through the cache), flatten it and write its partition."""
+    df = flatten_company_facts(get_company_facts(cik, headers=headers or HEADERS), cik)
+    write_fact_store(df, root)
+    return df
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        raise SystemExit("usage: python src/fact_store.py <ticker, CIK or company name> ...")
+    for cik in resolve_many(sys.argv[1:]).values():
+        facts = ingest_cik(cik)
+        print(f"{len(facts)} facts for CIK {cik} written to {partition_path(FACT_STORE_DIR, cik)}")
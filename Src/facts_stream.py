@@ -0,0 +1,187 @@
+import json
+from collections import Counter
+from operator import itemgetter
+
+try:
+    import ijson
+except ImportError:  # optional: without it documents are decoded whole and then pruned
+    ijson = None
+
+from taxonomies import CURRENCY_TAXONOMIES, PRIMARY_TAXONOMY, TAXONOMY_ALIASES, currency_from_counts, split_tag
+
+# ==========================================
+# STREAMING CONFIGURATION
+# ==========================================
+# A companyfacts document holds thousands of concepts, but the statements read 40-60 of them.
+# The streaming parser walks the JSON token stream (ijson, C backend when available)
+# and only builds Python objects for the wanted facts -> taxonomy -> tag -> units subtrees;
+# everything else is skipped as it goes by, so peak memory is the wanted facts plus one chunk.
+# Works on any byte source: cached files, the bulk archive and the HTTP response body.
+#
+# A streamed document has the usual shape, restricted to the wanted tags (units only, no labels):
+#   {"cik", "entityName", "facts": {taxonomy: {tag: {"units": {unit: [entries]}}}},
+#    "reportingCurrency"}   <- counted over every fact, so TaxonomyView still sees the whole filing
+CHUNK_SIZE = 64 * 1024
+WHOLE_DECODE_MAX_BYTES = 8 * 1024 * 1024   # cached files up to this size: json.load + prune (faster, memory is no issue)
+TOP_LEVEL_FIELDS = ("cik", "entityName")
+
+
+def wanted_facts(tags, aliases=TAXONOMY_ALIASES, primary=PRIMARY_TAXONOMY):
+    """{(taxonomy, tag)} to decode for these tag names (unqualified = primary, plus their taxonomy aliases)."""
+    wanted = set()
+    for name in tags:
+        taxonomy, tag = split_tag(name, primary)
+        wanted.add((taxonomy, tag))
+        if taxonomy == primary:
+            wanted.update(aliases.get(tag, ()))
+    return wanted
+
+
+def prune_company_facts(data, wanted):
+    """A decoded document cut down to what the streaming parser would have kept."""
+    counts = Counter()
+    facts = {}
+    for taxonomy, concepts in data.get("facts", {}).items():
+        for tag, concept in concepts.items():
+            units = concept.get("units", {})
+            if taxonomy in CURRENCY_TAXONOMIES:
+                for unit, entries in units.items():
+                    counts[unit] += len(entries)
+            if (taxonomy, tag) in wanted:
+                facts.setdefault(taxonomy, {})[tag] = {"units": units}
+    pruned = {field: data[field] for field in TOP_LEVEL_FIELDS if field in data}
+    pruned["facts"] = facts
+    pruned["reportingCurrency"] = currency_from_counts(counts)
+    return pruned
+
+
+class CompanyFactsStream:
+    """
+    Push parser: feed() raw chunks as they arrive, close() returns the pruned document.
+    Used the same way for files, archive members and HTTP bodies.
+
+    Outside arrays the key path is tracked token by token (a handful of tokens per unit);
+    a units array - where nearly all tokens are - is skipped or handed to an ObjectBuilder
+    in whole slices, counting its entries with list operations rather than a Python loop.
+    """
+
+    def __init__(self, wanted):
+        self.pairs = set(wanted)
+        self.document = {"facts": {}}
+        self.counts = Counter()
+        self.path = []           # map keys from the document root down to the current value
+        self.array = None        # (taxonomy, tag, unit) of the units array being read
+        self.depth = 0           # array nesting inside it
+        self.entries = 0         # entries seen in it
+        self.builder = None      # ObjectBuilder while that array is wanted
+        if ijson is None:
+            self.chunks = []
+        else:
+            self.events = ijson.sendable_list()
+            self.parser = ijson.basic_parse_coro(self.events, use_float=True)
+
+    def feed(self, chunk):
+        if ijson is None:
+            self.chunks.append(chunk)
+            return
+        self.parser.send(chunk)
+        self._consume(self.events)
+        del self.events[:]
+
+    def close(self):
+        if ijson is None:
+            data = json.loads(b"".join(self.chunks)) if self.chunks else {}
+            return prune_company_facts(data, self.pairs)
+        self.parser.close()
+        self._consume(self.events)
+        self.document["reportingCurrency"] = currency_from_counts(self.counts)
+        return self.document
+
+    def _consume(self, events):
+        kinds = list(map(itemgetter(0), events))
+        pos, n = 0, len(events)
+        while pos < n:
+            if self.array is not None:
+                pos = self._skip_array(events, kinds, pos)
+                continue
+            event, value = events[pos]
+            path = self.path
+            if event == "map_key":
+                path[-1] = value
+            elif event == "start_map":
+                path.append(None)
+            elif event == "end_map":
+                path.pop()
+            elif event == "start_array":
+                # facts.<taxonomy>.<tag>.units.<unit>: the only arrays in a companyfacts document
+                key = tuple(path[1:3]) if len(path) == 5 and path[0] == "facts" and path[3] == "units" else None
+                self.array, self.depth, self.entries = (key, path[4] if key else None), 1, 0
+                if key in self.pairs:
+                    self.builder = ijson.ObjectBuilder()
+                    self.builder.event(event, value)
+            elif len(path) == 1 and path[0] in TOP_LEVEL_FIELDS:
+                self.document[path[0]] = value
+            pos += 1
+
+    def _skip_array(self, events, kinds, pos):
+        """Consume the open array's tokens from pos up to its end (or the end of this chunk)."""
+        try:
+            end = kinds.index("end_array", pos)
+        except ValueError:
+            end = len(kinds)
+        span = kinds[pos:end]
+        self.entries += span.count("start_map")
+        self.depth += span.count("start_array")
+        if end < len(kinds):
+            self.depth -= 1
+            end += 1
+        if self.builder is not None:
+            for event, value in events[pos:end]:
+                self.builder.event(event, value)
+        if self.depth == 0:
+            self._end_array()
+        return end
+
+    def _end_array(self):
+        (key, unit), self.array = self.array, None
+        if key is not None:
+            taxonomy, tag = key
+            if taxonomy in CURRENCY_TAXONOMIES:
+                self.counts[unit] += self.entries
+            if self.builder is not None:
+                concept = self.document["facts"].setdefault(taxonomy, {}).setdefault(tag, {"units": {}})
+                concept["units"][unit] = self.builder.value
+        self.builder = None
+
+
+def read_company_facts(f, wanted, size=None):
+    """Decode a binary file object of known size: whole and pruned when small, streamed otherwise."""
+    if size is not None and size <= WHOLE_DECODE_MAX_BYTES:
+        return prune_company_facts(json.load(f), wanted)
+    return stream_company_facts(f, wanted)
+
+
+def stream_company_facts(f, wanted, sink=None):
+    """Stream-decode a binary file object; every chunk is also written to sink (e.g. a cache file) if given."""
+    stream = CompanyFactsStream(wanted)
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if sink is not None:
+            sink.write(chunk)
+        stream.feed(chunk)
+    return stream.close()
+
+
+async def stream_company_facts_async(reader, wanted, sink=None):
+    """Same as stream_company_facts for an async reader (aiohttp's response.content)."""
+    stream = CompanyFactsStream(wanted)
+    while True:
+        chunk = await reader.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        if sink is not None:
+            sink.write(chunk)
+        stream.feed(chunk)
+    return stream.close()
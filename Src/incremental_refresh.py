@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import re
+
+import pandas as pd
+
+from diagnostics import configure_logging, get_logger
+from edgar_client import AsyncEdgarClient
+from profiling import configure_profiling
+from statement_engine import (HEADERS, create_dataframes, extract_all_statements, get_tag_index,
+                              records_to_statements, statement_facts, statement_filename, statement_records)
+from taxonomies import company_facts_view
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+CIKS = ["0001045810"]  # coverage universe for the nightly refresh
+OUTPUT_DIR = "."
+
+ANNUAL_FORMS = {"10-K", "10-K/A", "20-F", "20-F/A", "40-F", "40-F/A"}
+RECORD_COLUMNS = ["CIK", "Statement", "Category", "Item", "Year", "Value"]
+
+log = get_logger("incremental_refresh")
+
+# Every produced dataset keeps a watermark next to it:
+#   {CIK}_STATEMENTS.csv    long-format statements (CIK, Statement, Category, Item, Year, Value)
+#   {CIK}_watermark.json    {"last_filed": "YYYY-MM-DD", "accessions": [...annual accessions seen...],
+#                            "pending": [...annual accessions indexed without facts yet...]}
+# A refresh reads the submissions index first and only downloads companyfacts when
+# an annual filing appeared that the watermark has not seen. The watermark only takes
+# filings whose facts are already in companyfacts: SEC publishes the submissions index
+# first, and a failed fetch serves the cached (older) document. A new filing without
+# facts is kept in "pending" and stays new until a later run finds its facts, even
+# when a later filing is loaded first and moves last_filed past it.
+
+
+def dataset_path(output_dir, cik):
+    return os.path.join(output_dir, f"{cik}_STATEMENTS.csv")
+
+
+def watermark_path(output_dir, cik):
+    return os.path.join(output_dir, f"{cik}_watermark.json")
+
+
+def load_watermark(output_dir, cik):
+    try:
+        with open(watermark_path(output_dir, cik), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_watermark(output_dir, cik, filings, previous=None, pending=()):
+    """Record the filings whose facts were loaded; `pending` are new filings still without facts."""
+    accessions = set(previous["accessions"]) if previous else set()
+    accessions.update(accn for accn, _, _ in filings)
+    filed = [filed for _, filed, _ in filings]
+    if previous and previous.get("last_filed"):
+        filed.append(previous["last_filed"])
+    waiting = set(previous.get("pending", [])) if previous else set()
+    waiting = (waiting | set(pending)) - accessions
+    watermark = {"cik": cik, "last_filed": max(filed) if filed else None, "accessions": sorted(accessions),
+                 "pending": sorted(waiting)}
+    with open(watermark_path(output_dir, cik), "w", encoding="utf-8") as f:
+        json.dump(watermark, f, indent=2)
+    return watermark
+
+
+def annual_filings(submissions):
+    """[(accession, filing_date, form), ...] for the annual filings in a submissions index."""
+    recent = submissions.get("filings", {}).get("recent", {})
+    rows = zip(recent.get("accessionNumber", []), recent.get("filingDate", []), recent.get("form", []))
+    return [(accn, filed, form) for accn, filed, form in rows if form in ANNUAL_FORMS]
+
+
+def new_annual_filings(filings, watermark):
+    """
+    Annual filings the watermark has not seen: filed on or after its last_filed date, or
+    still pending (indexed earlier without facts).
+    """
+    if watermark is None:
+        return filings
+    seen = set(watermark.get("accessions", []))
+    pending = set(watermark.get("pending", []))
+    last_filed = watermark.get("last_filed") or ""
+    return [f for f in filings if f[0] not in seen and (f[1] >= last_filed or f[0] in pending)]
+
+
+def fact_years(entry):
+    """Every year a fact can be scored under (fy, end-date year, CY/FY frame year)."""
+    years = set()
+    fy = entry.get("fy")
+    if fy is not None:
+        try:
+            years.add(int(fy))
+        except ValueError:
+            pass
+    end = entry.get("end")
+    if end and end[:4].isdigit():
+        years.add(int(end[:4]))
+    m = re.search(r"(CY|FY)(\d{4})", entry.get("frame") or "")
+    if m:
+        years.add(int(m.group(2)))
+    return years
+
+
+def found_accessions(xbrl_data, accessions):
+    """The accession numbers (of `accessions`) that have facts under the tags the statements use."""
+    found = set()
+    for tag in get_tag_index():
+        for entries in xbrl_data.get(tag, {}).get("units", {}).values():
+            found.update(entry.get("accn") for entry in entries if entry.get("accn") in accessions)
+    return found
+
+
+def touched_years(xbrl_data, accessions):
+    """Years that facts from the given accession numbers can land in, over the tags the statements use."""
+    years = set()
+    for tag in get_tag_index():
+        for entries in xbrl_data.get(tag, {}).get("units", {}).values():
+            for entry in entries:
+                if entry.get("accn") in accessions:
+                    years |= fact_years(entry)
+    return years
+
+
+def restrict_to_years(xbrl_data, years):
+    """Copy of the statement facts keeping only entries that could score for one of `years`."""
+    restricted = {}
+    for tag in get_tag_index():
+        if tag not in xbrl_data:
+            continue
+        units = {
+            unit: [entry for entry in entries if fact_years(entry) & years]
+            for unit, entries in xbrl_data[tag]["units"].items()
+        }
+        restricted[tag] = {"units": units}
+    return restricted
+
+
+def merge_years(stored, fresh, years):
+    """Replace the given years in stored statements with freshly scored values."""
+    for categories in stored.values():
+        for items in categories.values():
+            for values in items.values():
+                for year in years:
+                    values.pop(year, None)
+    for key, categories in fresh.items():
+        for category, items in categories.items():
+            for label, values in items.items():
+                target = stored[key].setdefault(category, {}).setdefault(label, {})
+                target.update({year: value for year, value in values.items() if year in years})
+    for categories in stored.values():
+        for category, items in categories.items():
+            categories[category] = {label: values for label, values in items.items() if values}
+    return stored
+
+
+def write_dataset(output_dir, cik, statements):
+    records = pd.DataFrame(statement_records(cik, statements), columns=RECORD_COLUMNS)
+    records.to_csv(dataset_path(output_dir, cik), index=False)
+    # Keep the presentation CSVs MasterAnalysisFinal.py reads in step
+    for key, df in create_dataframes(statements, cik).items():
+        df.to_csv(os.path.join(output_dir, statement_filename(cik, key)), index=False)
+
+
+async def refresh_company(client, cik, output_dir=OUTPUT_DIR):
+    """
+    Bring one company's dataset up to date.
+    Returns "skipped" (no new annual filings), "pending" (new filings whose facts are not
+    in companyfacts yet), "full" (first run) or "incremental".
+    """
+    watermark = load_watermark(output_dir, cik)
+    has_dataset = os.path.exists(dataset_path(output_dir, cik))
+    filings = annual_filings(await client.get_submissions(cik))
+    new = new_annual_filings(filings, watermark if has_dataset else None)
+
+    if watermark is not None and has_dataset and not new:
+        return "skipped"
+
+    data = await client.get_company_facts(cik, revalidate=True, wanted=statement_facts())
+    if not data.get("facts"):
+        raise ValueError(f"No companyfacts available for CIK {cik}")
+    xbrl_data = company_facts_view(data)
+    found = found_accessions(xbrl_data, {accn for accn, _, _ in filings})
+
+    loaded = [f for f in filings if f[0] in found]
+    if watermark is None or not has_dataset:
+        statements = extract_all_statements(xbrl_data, cik)
+        status = "full"
+        # Older annual filings without facts predate XBRL; only ones after the newest loaded filing wait
+        newest = max((filed for _, filed, _ in loaded), default="")
+        pending = [accn for accn, filed, _ in filings if accn not in found and filed >= newest]
+    else:
+        years = touched_years(xbrl_data, {accn for accn, _, _ in new} & found)
+        if not years:
+            log.info("%s: %d new annual filing(s) not in companyfacts yet", cik, len(new))
+            return "pending"
+        stored = records_to_statements(pd.read_csv(dataset_path(output_dir, cik)))
+        fresh = extract_all_statements(restrict_to_years(xbrl_data, years), cik)
+        statements = merge_years(stored, fresh, years)
+        status = "incremental"
+        pending = [accn for accn, _, _ in new if accn not in found]
+
+    write_dataset(output_dir, cik, statements)
+    save_watermark(output_dir, cik, loaded, watermark if has_dataset else None, pending)
+    return status
+
+
+async def refresh_many(ciks, output_dir=OUTPUT_DIR, headers=None, **client_options):
+    """Refresh a coverage universe concurrently. Returns {cik: status}."""
+    async with AsyncEdgarClient(headers=headers or HEADERS, **client_options) as client:
+        async def refresh(cik):
+            try:
+                return await refresh_company(client, cik, output_dir)
+            except Exception as e:
+                log.error("%s: %s", cik, e)
+                return "failed"
+        statuses = await asyncio.gather(*(refresh(cik) for cik in ciks))
+    return dict(zip(ciks, statuses))
+
+
+if __name__ == "__main__":
+    configure_logging()
+    configure_profiling()
+    statuses = asyncio.run(refresh_many(CIKS))
+    for status in ("full", "incremental", "skipped", "pending", "failed"):
+        print(f"{status}: {sum(1 for s in statuses.values() if s == status)}")
@@ -0,0 +1,146 @@
+import sys
+
+import pandas as pd
+
+from concept_index import CONCEPTS
+from diagnostics import configure_logging, count, get_counters, reset_counters
+from edgar_client import get_company_facts
+from facts_stream import wanted_facts
+from ratio_engine import RATIOS, add_ratios, ratio_inputs
+from settings import HEADERS
+from statement_engine import assemble_statements, load_statement_module, master_columns
+from taxonomies import company_facts_view
+
+# ==========================================
+# LAZY STATEMENT VIEWS
+# ==========================================
+# extract_all_statements runs the annual selection for every tag of all three statements,
+# but the ratios read about ten concepts. LazyStatements resolves a master column
+# ("IS_Total Net Revenues", "BS_Total assets", ...) or concept ("Revenue", "NetIncome", ...) only when
+# it is asked for, and memoizes both the column and each (statement, tag, unit) selection
+# (shared by concepts whose chains overlap). Combined with a facts filter for just those
+# columns (column_facts), a ratio-only job decodes and selects a fraction of the facts.
+#
+#   lazy = load_lazy_statements("0001045810", columns=ratio_inputs())
+#   lazy.ratios()                   # only the ratio inputs are ever resolved
+#   lazy["BS_Total assets"]         # {year: value}, resolved on first access
+#   lazy.statements()               # full materialization, same as extract_all_statements
+
+
+def column_tags(columns, concepts=CONCEPTS):
+    """{tag} a set of master columns / concepts can read."""
+    items = master_columns()
+    tags = set()
+    for column in columns:
+        if column in concepts:
+            tags.update(concepts[column][2])
+        else:
+            tags.update(tag for tag, _ in items[column][3])
+    return tags
+
+
+def column_facts(columns, concepts=CONCEPTS):
+    """{(taxonomy, tag)} to decode for these columns (IFRS/dei fallbacks included)."""
+    return wanted_facts(column_tags(columns, concepts))
+
+
+class LazyStatements:
+    """
+    On-demand statement line items and concepts over one company's facts (a us-gaap
+    {tag: fact} dict or a TaxonomyView). Every resolution is memoized; nothing is
+    selected until a column is read. Values match extract_all_statements and
+    resolve_concepts for the columns that are read.
+    """
+
+    def __init__(self, xbrl_data, concepts=CONCEPTS, cik=None):
+        self.facts = xbrl_data
+        self.concepts = concepts
+        self.cik = cik
+        self._selections = {}   # (statement, tag, unit) -> {year: info}
+        self._columns = {}      # column -> {year: info}
+
+    def selection(self, statement, tag, unit):
+        """select_annual_entries of one statement over one tag/unit, run once."""
+        key = (statement, tag, unit)
+        if key not in self._selections:
+            fact = self.facts.get(tag)
+            entries = fact["units"].get(unit) if fact is not None else None
+            if entries:
+                count(statement, "facts_scanned", len(entries))
+                self._selections[key] = load_statement_module(statement).select_annual_entries(entries, unit)
+            else:
+                self._selections[key] = {}
+        return self._selections[key]
+
+    def resolve(self, column):
+        """{year: info} of one master column or concept (info as select_annual_entries returns it)."""
+        if column not in self._columns:
+            if column in self.concepts:
+                statement, unit, chain = self.concepts[column]
+                years = {}
+                for tag in chain:
+                    for year, info in self.selection(statement, tag, unit).items():
+                        years.setdefault(year, dict(info, tag=tag))
+            elif column in master_columns():
+                statement, _, _, tags = master_columns()[column]
+                years = {}
+                for tag, unit in tags:
+                    years.update(self.selection(statement, tag, unit))
+            else:
+                raise KeyError(column)
+            self._columns[column] = dict(sorted(years.items()))
+        return self._columns[column]
+
+    def __getitem__(self, column):
+        return {year: info["value"] for year, info in self.resolve(column).items()}
+
+    def __contains__(self, column):
+        return column in self.concepts or column in master_columns()
+
+    def resolved(self):
+        """Columns resolved so far."""
+        return list(self._columns)
+
+    def frame(self, columns):
+        """Float64 frame indexed by Year with just these columns."""
+        df = pd.DataFrame.from_dict({column: self[column] for column in columns}, orient="columns", dtype="float64")
+        df = df.reindex(columns=list(columns))
+        df.index = df.index.astype("int64")
+        df.index.name = "Year"
+        return df.sort_index()
+
+    def ratios(self, ratios=RATIOS):
+        """The ratio inputs and ratios (ratio_engine.RATIOS) by year, resolving only those inputs."""
+        return add_ratios(self.frame(ratio_inputs(ratios)), ratios)
+
+    def statements(self):
+        """Every line item, as {"IS": ..., "BS": ..., "CF": ...} StatementMatrix objects (for exports)."""
+        return assemble_statements({
+            (key, tag): self.selection(key, tag, unit)
+            for key, _, _, tags in master_columns().values() for tag, unit in tags
+        })
+
+    def concept_values(self):
+        """Every concept, as resolve_concepts returns them."""
+        return {concept: self.resolve(concept) for concept in self.concepts}
+
+
+def load_lazy_statements(cik, columns=None, headers=None, concepts=CONCEPTS):
+    """
+    LazyStatements for one CIK. With columns, only the facts those columns can read are
+    decoded (reading any other column then finds no facts); without, every statement and concept tag.
+    """
+    if columns is None:
+        columns = list(master_columns()) + list(concepts)
+    data = get_company_facts(cik, headers=headers or HEADERS, wanted=column_facts(columns, concepts))
+    return LazyStatements(company_facts_view(data), concepts, cik)
+
+
+if __name__ == "__main__":
+    configure_logging()
+    cik = sys.argv[1] if len(sys.argv) > 1 else "0001045810"
+    reset_counters()
+    lazy = load_lazy_statements(cik, columns=ratio_inputs())
+    print(lazy.ratios()[list(RATIOS)].tail())
+    scanned = sum(counts.get("facts_scanned", 0) for counts in get_counters().values())
+    print(f"{len(lazy.resolved())} column(s) resolved, {scanned} fact(s) scanned")
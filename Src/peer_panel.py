@@ -0,0 +1,181 @@
+import asyncio
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import settings
+from concept_index import concept_tags, concepts_for_view
+from diagnostics import configure_logging, get_logger
+from edgar_client import fetch_company_facts_many, load_company_facts
+from facts_stream import wanted_facts
+from MasterAnalysisFinal import build_master_frame
+from profiling import add_records, configure_profiling, reset_records, stage, take_records
+from ratio_engine import RATIOS, add_ratios
+from statement_engine import assemble_statements, select_statements, statement_facts
+from taxonomies import CURRENCY_COLUMN, company_facts_view
+from ticker_index import resolve_many
+
+log = get_logger("peer_panel")
+
+# ==========================================
+# PEER PANEL CONFIGURATION
+# ==========================================
+# One (CIK, CalendarYear) panel for a peer group: master columns, concepts and ratios
+# for every member, with fiscal years moved onto a common calendar axis, plus the
+# percentile rank of each ratio within its calendar year. Every row carries its reporting
+# Currency; money-valued ratios (no denominator, e.g. Calc_FCF) are only ranked among
+# members reporting in the same currency.
+#
+#   python src/peer_panel.py semiconductors          a group from PEER_GROUPS
+#   python src/peer_panel.py NVDA AMD INTC 0000050863
+#
+# Documents are fetched concurrently (one rate-limited client) and extracted on a
+# process pool; ratios are computed once over the whole panel.
+#
+# Calendar alignment follows the usual convention: a fiscal year ending January-May
+# belongs to the previous calendar year (NVIDIA's FY2025, ending January 2025, is
+# calendar 2024), one ending June-December to its own.
+PEER_GROUPS = {
+    "semiconductors": ["NVDA", "AMD", "INTC", "AVGO", "QCOM", "TXN", "MU", "ADI"],
+    "megacap_tech": ["AAPL", "MSFT", "GOOGL", "AMZN", "META", "NVDA"],
+}
+WORKERS = os.cpu_count() or 1
+CALENDAR_CUTOFF_MONTH = 5     # fiscal years ending in this month or earlier shift back one calendar year
+PANEL_FILE = "PEER_PANEL.csv"
+RANKS_FILE = "PEER_RANKS.csv"
+
+
+# ==========================================
+# FISCAL -> CALENDAR YEARS
+# ==========================================
+
+def fiscal_year_ends(selected):
+    """{fiscal year: period end date} from statement selections (the most common end among a year's facts)."""
+    ends = {}
+    for annual_by_year in selected.values():
+        for year, info in annual_by_year.items():
+            if info.get("end"):
+                ends.setdefault(year, Counter())[info["end"]] += 1
+    return {year: pd.Timestamp(max(counts, key=lambda end: (counts[end], end))) for year, counts in ends.items()}
+
+
+def calendar_year(fiscal_year, year_end=None, cutoff_month=CALENDAR_CUTOFF_MONTH):
+    """Calendar year a fiscal year is compared under (the fiscal year itself when its end is unknown)."""
+    if year_end is None or pd.isna(year_end):
+        return fiscal_year
+    return year_end.year - 1 if year_end.month <= cutoff_month else year_end.year
+
+
+# ==========================================
+# EXTRACTION
+# ==========================================
+
+def company_frame(cik, path):
+    """One member's master frame (no ratios yet) with Currency, FiscalYearEnd and CalendarYear columns."""
+    data = load_company_facts(path, cik, statement_facts() | wanted_facts(concept_tags()))
+    view = company_facts_view(data)
+    selected = select_statements(view, cik)
+    with stage("frame", cik) as s:
+        frame = build_master_frame(assemble_statements(selected), concepts_for_view(view, cik))
+        ends = fiscal_year_ends(selected)
+        frame.insert(0, "FiscalYearEnd", [ends.get(year) for year in frame.index])
+        frame.insert(0, "CalendarYear", [calendar_year(year, ends.get(year)) for year in frame.index])
+        frame.insert(0, CURRENCY_COLUMN, view.currency)
+        s["items"] = len(frame)
+    return frame
+
+
+def init_worker(first_year, last_year, log_level):
+    settings.set_year_window(first_year, last_year)
+    configure_logging(log_level)
+    reset_records()
+
+
+def _company_frame_safe(args):
+    """Worker entry point: (cik, frame or None, stage records from this task)."""
+    cik, path = args
+    try:
+        return cik, company_frame(cik, path), take_records()
+    except Exception as e:
+        log.error("%s: %s", cik, e)
+        return cik, None, take_records()
+
+
+def align(frames):
+    """
+    {cik: company frame} -> one frame indexed by (CIK, CalendarYear).
+    If a changed fiscal year end maps two fiscal years onto one calendar year, the later one is kept.
+    """
+    aligned = []
+    for cik, frame in frames.items():
+        frame = frame.rename_axis("FiscalYear").reset_index()
+        frame = frame.sort_values("FiscalYear").drop_duplicates("CalendarYear", keep="last")
+        aligned.append(frame.assign(CIK=cik))
+    if not aligned:
+        return pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=["CIK", "CalendarYear"]))
+    panel = pd.concat(aligned, ignore_index=True).set_index(["CIK", "CalendarYear"]).sort_index()
+    return panel
+
+
+def percentile_ranks(panel, ratios=RATIOS):
+    """
+    Percentile rank (0-1, higher value = higher rank) of each ratio among the members reporting it
+    that calendar year (and, for a ratio without a denominator, in the same currency).
+    """
+    columns = [name for name in ratios if name in panel.columns]
+    ranks = panel[columns].groupby(level="CalendarYear").rank(pct=True)
+    amounts = [name for name in columns if ratios[name][1] is None]
+    if amounts and CURRENCY_COLUMN in panel.columns:
+        by = [panel.index.get_level_values("CalendarYear"), panel[CURRENCY_COLUMN]]
+        ranks[amounts] = panel[amounts].groupby(by).rank(pct=True)
+    return ranks
+
+
+def build_peer_panel(members, workers=WORKERS, headers=None, log_level=None):
+    """
+    Aligned (CIK, CalendarYear) panel and its percentile ranks for a peer group
+    (CIKs, tickers or names, or the name of a PEER_GROUPS entry).
+    Returns (panel, ranks); members that cannot be resolved or extracted are logged and left out.
+    """
+    if isinstance(members, str):
+        members = PEER_GROUPS[members]
+    ciks = list(dict.fromkeys(resolve_many(members).values()))
+    paths = asyncio.run(fetch_company_facts_many(ciks, headers=headers, decode=False))
+    tasks = [(cik, path) for cik, path in paths.items() if path is not None]
+    for cik in set(ciks) - {cik for cik, _ in tasks}:
+        log.warning("No companyfacts for %s", cik)
+
+    workers = max(1, min(workers, len(tasks) or 1))
+    if workers > 1:
+        initargs = (*settings.year_window(), log_level)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+            results = list(pool.map(_company_frame_safe, tasks))
+    else:
+        results = [_company_frame_safe(task) for task in tasks]
+
+    frames = {}
+    for cik, frame, records in results:
+        if workers > 1:
+            add_records(records)
+        if frame is not None:
+            frames[cik] = frame
+    panel = align(frames)
+    with stage("ratio") as s:
+        add_ratios(panel)
+        s["items"] = len(panel)
+    return panel, percentile_ranks(panel)
+
+
+if __name__ == "__main__":
+    configure_logging()
+    configure_profiling()
+    args = sys.argv[1:] or ["semiconductors"]
+    group = args[0] if len(args) == 1 and args[0] in PEER_GROUPS else args
+    panel, ranks = build_peer_panel(group)
+    panel.to_csv(PANEL_FILE)
+    ranks.to_csv(RANKS_FILE)
+    companies = panel.index.get_level_values("CIK").nunique()
+    print(f"Peer panel for {companies} companies saved to {PANEL_FILE}, ratio percentile ranks to {RANKS_FILE}")
@@ -0,0 +1,179 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# ==========================================
+# STAGE INSTRUMENTATION
+# ==========================================
+# Pipeline stages wrap themselves in `with stage("select", cik) as s: ... s["items"] = n`.
+# Every stage records wall time, CPU time (process-wide, so concurrent stages overlap)
+# and an item count; peak memory is recorded while tracemalloc is tracing.
+#
+#   PROFILE_REPORT=stages.json       write every record plus per-stage totals at exit
+#   PROFILE_MEMORY=1                 trace allocations for peak memory per stage
+#   PROFILE_DUMP=cprofile            also profile each stage (cprofile -> .prof, pyinstrument -> .txt)
+#   PROFILE_DIR=profiles             where dumps go
+#   PROFILE_STAGES=select,frame      restrict dumps to these stages
+#
+# Stage names used across the pipeline: fetch, parse, select, frame, ratio, store, chart.
+
+REPORT_ENV = "PROFILE_REPORT"
+MEMORY_ENV = "PROFILE_MEMORY"
+DUMP_ENV = "PROFILE_DUMP"
+DIR_ENV = "PROFILE_DIR"
+STAGES_ENV = "PROFILE_STAGES"
+
+_records = []
+_lock = threading.Lock()
+_local = threading.local()   # per-thread stack of open stages (peak memory bookkeeping)
+_dump = {"profiler": None, "dir": "profiles", "stages": None, "active": False}
+
+
+def configure_profiling(report_path=None, memory=None, profiler=None, profile_dir=None, stages=None):
+    """Set up stage instrumentation from arguments, falling back to the PROFILE_* environment variables."""
+    report_path = report_path or os.environ.get(REPORT_ENV)
+    memory = memory if memory is not None else os.environ.get(MEMORY_ENV, "") not in ("", "0")
+    profiler = profiler or os.environ.get(DUMP_ENV) or None
+    stages = stages or os.environ.get(STAGES_ENV)
+
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if profiler not in (None, "cprofile", "pyinstrument"):
+        raise ValueError(f"Unknown profiler {profiler!r} (expected 'cprofile' or 'pyinstrument')")
+    _dump["profiler"] = profiler
+    _dump["dir"] = profile_dir or os.environ.get(DIR_ENV, "profiles")
+    _dump["stages"] = set(stages.split(",")) if isinstance(stages, str) else (set(stages) if stages else None)
+    if report_path:
+        atexit.register(write_report, report_path)
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _start_profiler(name, cik):
+    """Start a per-stage profiler if dumps are on for this stage (one at a time; nested stages are skipped)."""
+    profiler = _dump["profiler"]
+    if profiler is None or _dump["active"] or (_dump["stages"] and name not in _dump["stages"]):
+        return None
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError("PROFILE_DUMP=pyinstrument needs `pip install pyinstrument`")
+        p = Profiler()
+        p.start()
+    else:
+        import cProfile
+        p = cProfile.Profile()
+        p.enable()
+    _dump["active"] = True
+    return p
+
+
+def _stop_profiler(p, name, cik):
+    os.makedirs(_dump["dir"], exist_ok=True)
+    stem = re.sub(r"[^\w.-]", "_", f"{name}-{cik or 'all'}-{time.strftime('%Y%m%dT%H%M%S')}-{id(p):x}")
+    if _dump["profiler"] == "pyinstrument":
+        p.stop()
+        with open(os.path.join(_dump["dir"], stem + ".txt"), "w", encoding="utf-8") as f:
+            f.write(p.output_text())
+    else:
+        p.disable()
+        p.dump_stats(os.path.join(_dump["dir"], stem + ".prof"))
+    _dump["active"] = False
+
+
+@contextmanager
+def stage(name, cik=None, items=None):
+    """
+    Time one pipeline stage. Yields the record dict so the caller can set
+    record["items"] once the count is known.
+    """
+    record = {"stage": name, "cik": cik, "items": items}
+    tracing = tracemalloc.is_tracing()
+    frame = {"record": record, "child_peak": 0}
+    if tracing:
+        # The tracemalloc peak is global: remember the enclosing stage's peak before resetting it
+        current, peak = tracemalloc.get_traced_memory()
+        stack = _stack()
+        if stack:
+            stack[-1]["child_peak"] = max(stack[-1]["child_peak"], peak - stack[-1]["base"])
+        frame["base"] = current
+        tracemalloc.reset_peak()
+        stack.append(frame)
+    profiler = _start_profiler(name, cik)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record["wall_seconds"] = time.perf_counter() - wall
+        record["cpu_seconds"] = time.process_time() - cpu
+        if profiler is not None:
+            _stop_profiler(profiler, name, cik)
+        if tracing:
+            _, peak = tracemalloc.get_traced_memory()
+            stack = _stack()
+            stack.pop()
+            record["peak_bytes"] = max(peak - frame["base"], frame["child_peak"])
+            if stack:
+                stack[-1]["child_peak"] = max(stack[-1]["child_peak"], record["peak_bytes"] + frame["base"] - stack[-1]["base"])
+        with _lock:
+            _records.append(record)
+
+
+def get_records():
+    with _lock:
+        return list(_records)
+
+
+def reset_records():
+    with _lock:
+        _records.clear()
+
+
+def take_records():
+    """Return and clear this process's records (worker processes hand them back to the parent)."""
+    with _lock:
+        records = list(_records)
+        _records.clear()
+    return records
+
+
+def add_records(records):
+    with _lock:
+        _records.extend(records)
+
+
+def summarize(records=None):
+    """Per-stage totals: calls, items, wall/CPU seconds, max peak memory."""
+    summary = {}
+    for r in records if records is not None else get_records():
+        s = summary.setdefault(r["stage"], {"calls": 0, "items": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                                            "peak_bytes": None, "ciks": set()})
+        s["calls"] += 1
+        s["items"] += r.get("items") or 0
+        s["wall_seconds"] += r["wall_seconds"]
+        s["cpu_seconds"] += r["cpu_seconds"]
+        if r.get("peak_bytes") is not None:
+            s["peak_bytes"] = max(s["peak_bytes"] or 0, r["peak_bytes"])
+        if r.get("cik"):
+            s["ciks"].add(r["cik"])
+    for s in summary.values():
+        s["ciks"] = len(s["ciks"])
+    return summary
+
+
+def write_report(path):
+    """Write {"records": [...], "summary": {...}} as JSON."""
+    records = get_records()
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"records": records, "summary": summarize(records)}, f, indent=2, default=str)
+    return path
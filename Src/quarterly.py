@@ -0,0 +1,201 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from annual_selection import needed_facts
+from fact_store import flatten_company_facts
+from statement_engine import STATEMENTS, get_tag_index, load_statement_module
+from edgar_client import get_company_facts
+from settings import HEADERS, year_window
+from taxonomies import VIEW_TAXONOMIES, view_tags
+from ticker_index import resolve_cik
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+#   python src/quarterly.py NVDA          (a ticker, CIK or company name)
+QUARTER_DAYS = 91.3       # average fiscal quarter length
+SPAN_TOLERANCE_DAYS = 15  # 52/53-week calendars and odd quarter ends
+START_TOLERANCE_DAYS = 7  # a YTD fact "starts at" the fiscal-year start if within this many days
+FLOW_STATEMENTS = ("IS", "CF")
+ADDITIVE_UNITS = {"USD"}  # only additive units get derived quarters and TTM sums
+
+# ==========================================
+# QUARTERLY + TTM EXTRACTION
+# ==========================================
+# One pass over a fact table (fact_store.flatten_company_facts):
+#  1. keep the latest-filed value per (tag, unit, start, end)
+#  2. build each company's fiscal calendar from its annual periods
+#  3. place every duration fact on that calendar: fiscal year, quarter, and whether
+#     it is a discrete quarter or a fiscal-year-to-date (YTD) figure
+#  4. discrete quarters come straight from 3-month facts, else from YTD
+#     differences (Q2 = H1 - Q1, Q3 = 9M - H1); a missing Q4 is FY - (Q1 + Q2 + Q3)
+#  5. trailing-twelve-month = sum of four consecutive discrete quarters (IS and CF)
+# Balance sheet (instant) facts are placed on the same calendar by their date.
+
+
+def period_facts(facts):
+    """Latest-filed value per period for the (tag, unit) pairs the statements use, with span in quarters."""
+    f = needed_facts(facts)
+    df = pd.DataFrame({
+        "cik": f["cik"].astype(str),
+        "tag": f["tag"].astype(str),
+        "unit": f["unit"].astype(str),
+        "val": f["val"],
+        "start": f["start"],
+        "end": f["end"],
+        "filed": f["filed"],
+    })
+    df = df.sort_values("filed", kind="mergesort").drop_duplicates(
+        ["cik", "tag", "unit", "start", "end"], keep="last")
+    days = (df["end"] - df["start"]).dt.days
+    span = (days / QUARTER_DAYS).round()
+    close = (days - span * QUARTER_DAYS).abs() <= SPAN_TOLERANCE_DAYS
+    df["span"] = span.where(close & span.between(1, 4))  # NaN for instants and odd durations
+    return df
+
+
+def fiscal_calendar(df):
+    """
+    Fiscal-year start dates per CIK: starts of annual periods plus the day after each
+    annual period ends (so the year in progress is covered before its 10-K exists).
+    """
+    annual = df[df["span"] == 4]
+    starts = pd.concat([
+        annual[["cik", "start"]],
+        pd.DataFrame({"cik": annual["cik"], "start": annual["end"] + pd.Timedelta(days=1)}),
+    ]).dropna().drop_duplicates().sort_values(["cik", "start"])
+    # 52/53-week years produce starts a few days apart for the same fiscal year: keep the first
+    gap = starts.groupby("cik")["start"].diff().dt.days
+    starts = starts[gap.isna() | (gap > START_TOLERANCE_DAYS)]
+    starts = starts.rename(columns={"start": "fiscal_start"})
+    starts["fiscal_year"] = (starts["fiscal_start"] + pd.Timedelta(days=364)).dt.year
+    return starts.reset_index(drop=True)
+
+
+def place_on_calendar(df, calendar, date_column, slack_days):
+    """
+    Attach fiscal_start / fiscal_year to each row: the latest fiscal start at or before
+    date_column + slack_days (positive for period starts, negative for period ends).
+    """
+    df = df.dropna(subset=[date_column]).copy()
+    df["_key"] = df[date_column] + pd.Timedelta(days=slack_days)
+    df = pd.merge_asof(
+        df.sort_values("_key"), calendar.sort_values("fiscal_start"),
+        left_on="_key", right_on="fiscal_start", by="cik", direction="backward",
+    ).drop(columns="_key")
+    return df.dropna(subset=["fiscal_start"])
+
+
+def discrete_quarters(df, calendar):
+    """Discrete quarterly values for duration facts: direct, YTD differences, then Q4 = FY - Q1..Q3."""
+    durations = place_on_calendar(df[df["span"].notna()], calendar, "start", START_TOLERANCE_DAYS)
+    quarter = ((durations["end"] - durations["fiscal_start"]).dt.days / QUARTER_DAYS).round()
+    durations = durations[quarter.between(1, 4)].assign(quarter=quarter.astype("int64"))
+    starts_at_fy = (durations["start"] - durations["fiscal_start"]).dt.days.abs() <= START_TOLERANCE_DAYS
+
+    keys = ["cik", "tag", "unit", "fiscal_year"]
+    cumulative = durations[starts_at_fy & (durations["span"] == durations["quarter"])]
+    direct = durations[durations["span"] == 1]
+    ytd = cumulative.pivot_table(index=keys, columns="quarter", values="val", aggfunc="last")
+    quarters = direct.pivot_table(index=keys, columns="quarter", values="val", aggfunc="last")
+
+    axis = pd.Index([1, 2, 3, 4], name="quarter")
+    index = ytd.index.union(quarters.index)
+    c = ytd.reindex(index=index, columns=axis).to_numpy(dtype=float)
+    q = quarters.reindex(index=index, columns=axis).to_numpy(dtype=float, copy=True)
+    additive = np.isin(index.get_level_values("unit"), list(ADDITIVE_UNITS))
+
+    q[:, 0] = np.where(np.isnan(q[:, 0]), c[:, 0], q[:, 0])
+    for k in (1, 2):  # Q2, Q3 from YTD differences
+        derived = np.where(additive, c[:, k] - c[:, k - 1], np.nan)
+        q[:, k] = np.where(np.isnan(q[:, k]), derived, q[:, k])
+    q4 = np.where(additive, c[:, 3] - (q[:, 0] + q[:, 1] + q[:, 2]), np.nan)
+    q[:, 3] = np.where(np.isnan(q[:, 3]), q4, q[:, 3])
+
+    result = pd.DataFrame(q, index=index, columns=axis).stack().rename("value").reset_index()
+    period_ends = durations.groupby(keys + ["quarter"])["end"].max().rename("period_end").reset_index()
+    return result.merge(period_ends, on=keys + ["quarter"], how="left")
+
+
+def instant_quarters(df, calendar):
+    """Balance-sheet style (instant) facts placed on the fiscal calendar by their date."""
+    instants = df[df["start"].isna()]
+    placed = place_on_calendar(instants, calendar, "end", -START_TOLERANCE_DAYS)
+    placed["quarter"] = ((placed["end"] - placed["fiscal_start"]).dt.days / QUARTER_DAYS).round().clip(1, 4).astype(int)
+    placed = placed.sort_values("end").drop_duplicates(["cik", "tag", "unit", "fiscal_year", "quarter"], keep="last")
+    return placed.rename(columns={"val": "value", "end": "period_end"})[
+        ["cik", "tag", "unit", "fiscal_year", "quarter", "value", "period_end"]]
+
+
+def add_ttm(quarters):
+    """Trailing-twelve-month sum over four consecutive fiscal quarters (NaN when a quarter is missing)."""
+    quarters = quarters.sort_values(["cik", "tag", "unit", "fiscal_year", "quarter"]).copy()
+    n = quarters["fiscal_year"] * 4 + quarters["quarter"]
+    group = quarters.groupby(["cik", "tag", "unit"], sort=False)
+    total = quarters["value"].copy()
+    consecutive = pd.Series(True, index=quarters.index)
+    for lag in (1, 2, 3):
+        total = total + group["value"].shift(lag)
+        consecutive &= (n - group["fiscal_year"].shift(lag) * 4 - group["quarter"].shift(lag)) == lag
+    additive = quarters["unit"].isin(ADDITIVE_UNITS)
+    quarters["ttm"] = total.where(consecutive & additive)
+    return quarters
+
+
+def label_rows(values, statements):
+    """Expand (tag, unit) rows to every statement line item that uses them, scaled like the annual extractors."""
+    targets = pd.DataFrame(
+        [(tag, unit, key, label, category, order)
+         for order, (tag, entries) in enumerate(get_tag_index().items())
+         for key, label, unit, category in entries if key in statements],
+        columns=["tag", "unit", "Statement", "Item", "Category", "order"],
+    )
+    rows = values.merge(targets, on=["tag", "unit"])
+    scaled = (rows["unit"] == "USD") | ((rows["Statement"] == "BS") & (rows["unit"] == "shares"))
+    for col in ("value", "ttm"):
+        if col in rows:
+            rows[col] = np.where(scaled, rows[col] / 1_000_000, rows[col])
+    # Same label from two tags: the later tag wins, as in the annual extractors
+    keys = ["cik", "Statement", "Category", "Item", "fiscal_year", "quarter"]
+    return rows.sort_values("order").drop_duplicates(keys, keep="last")
+
+
+def extract_quarterly(facts):
+    """
+    Quarterly values (and TTM for income and cash flow items) for every CIK in a fact table.
+    Returns long rows: CIK, Statement, Category, Item, FiscalYear, Quarter, Period, PeriodEnd, Value, TTM
+    """
+    df = period_facts(facts)
+    calendar = fiscal_calendar(df)
+    flows = label_rows(add_ttm(discrete_quarters(df, calendar)), FLOW_STATEMENTS)
+    instants = label_rows(instant_quarters(df, calendar), ("BS",))
+    rows = pd.concat([flows, instants], ignore_index=True)
+    rows = rows[rows["fiscal_year"].between(*year_window()) & rows["value"].notna()]
+    rows = rows.assign(Period=rows["fiscal_year"].astype(str) + "Q" + rows["quarter"].astype(str))
+    rows = rows.rename(columns={"cik": "CIK", "fiscal_year": "FiscalYear", "quarter": "Quarter",
+                                "period_end": "PeriodEnd", "value": "Value", "ttm": "TTM"})
+    columns = ["CIK", "Statement", "Category", "Item", "FiscalYear", "Quarter", "Period", "PeriodEnd", "Value", "TTM"]
+    return rows[columns].sort_values(["CIK", "Statement", "Category", "Item", "FiscalYear", "Quarter"]).reset_index(drop=True)
+
+
+def quarterly_frame(rows, statement, value="Value"):
+    """Presentation-style frame for one statement: Category / Item rows, one column per fiscal quarter."""
+    categories = getattr(load_statement_module(statement), STATEMENTS[statement][2])
+    subset = rows[rows["Statement"] == statement]
+    wide = subset.pivot_table(index=["Category", "Item"], columns="Period", values=value, aggfunc="last")
+    order = {category: i for i, category in enumerate(categories)}
+    wide = wide.sort_index(key=lambda idx: idx.map(order) if idx.name == "Category" else idx)
+    return wide.reset_index()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit("usage: python src/quarterly.py <ticker, CIK or company name>")
+    cik = resolve_cik(sys.argv[1])
+    facts = flatten_company_facts(get_company_facts(cik, headers=HEADERS), cik,
+                                  taxonomies=VIEW_TAXONOMIES, tags=view_tags(get_tag_index()))
+    rows = extract_quarterly(facts)
+    rows.to_csv(f"{cik}_Quarterly.csv", index=False)
+    print(f"Data saved to {cik}_Quarterly.csv ({len(rows)} rows)")
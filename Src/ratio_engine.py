@@ -0,0 +1,239 @@
+import numpy as np
+import pandas as pd
+
+from concept_index import universe_master_panel
+from fact_store import FACT_STORE_DIR, read_fact_store
+from profiling import stage
+from taxonomies import CURRENCY_COLUMN
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+OUTPUT_FILE = "UNIVERSE_RATIOS.csv"
+
+# Master-frame columns the ratios read: canonical concepts from concept_index.CONCEPTS,
+# each resolved through its tag fallback chain, so they exist for every filer
+NET_INCOME = "NetIncome"
+REVENUE = "Revenue"
+EQUITY = "StockholdersEquity"
+CURRENT_ASSETS = "CurrentAssets"
+CURRENT_LIABILITIES = "CurrentLiabilities"
+CASH = "Cash"
+RECEIVABLES = "Receivables"
+SECURITIES = "MarketableSecurities"
+OPERATING_CASH_FLOW = "OperatingCashFlow"
+CAPEX = "CapitalExpenditure"
+
+# ==========================================
+# RATIO REGISTRY
+# ==========================================
+# name: (numerator {column: weight}, denominator {column: weight} or None)
+# Each side is a weighted sum of master-frame columns. A ratio is NaN for a
+# (cik, year) when any input it uses is missing or its denominator is zero.
+RATIOS = {
+    # --- Profitability Ratios ---
+    "Calc_Net_Margin": ({NET_INCOME: 1}, {REVENUE: 1}),
+    "Calc_ROE": ({NET_INCOME: 1}, {EQUITY: 1}),
+
+    # --- Liquidity Ratios ---
+    "Calc_Current_Ratio": ({CURRENT_ASSETS: 1}, {CURRENT_LIABILITIES: 1}),
+    "Calc_Quick_Ratio_Base": ({CASH: 1, RECEIVABLES: 1, SECURITIES: 1}, {CURRENT_LIABILITIES: 1}),
+    "Calc_Stress_Quick_10pct": ({CASH: 1, RECEIVABLES: 1, SECURITIES: 0.90}, {CURRENT_LIABILITIES: 1}),
+    "Calc_Stress_Quick_15pct": ({CASH: 1, RECEIVABLES: 1, SECURITIES: 0.85}, {CURRENT_LIABILITIES: 1}),
+    "Calc_Stress_Quick_25pct": ({CASH: 1, RECEIVABLES: 1, SECURITIES: 0.75}, {CURRENT_LIABILITIES: 1}),
+
+    # --- Cash Flow Ratios ---
+    "Calc_FCF": ({OPERATING_CASH_FLOW: 1, CAPEX: -1}, None),
+}
+
+
+def ratio_inputs(ratios=RATIOS):
+    """Every master-frame column some ratio reads, in first-use order."""
+    columns = {}
+    for numerator, denominator in ratios.values():
+        for side in (numerator, denominator or {}):
+            columns.update(dict.fromkeys(side))
+    return list(columns)
+
+
+# ==========================================
+# RATIO GRAPH
+# ==========================================
+# The registry compiles into a dependency graph: input columns -> weighted sums -> ratios.
+# A sum node is keyed by its (column, weight) terms, so a side shared by several ratios
+# (CurrentLiabilities in five of them) is one node, and the weight-1 part of a side is a node
+# of its own: the three stress numerators share Cash + Receivables and each only adds its
+# scaled Securities term. Every node is computed once per panel and memoized; adding a
+# ratio to a graph and evaluating it again on the same memo computes only the new nodes.
+#
+#   graph = RatioGraph()
+#   memo = {}
+#   graph.evaluate(panel, memo=memo)
+#   graph.add("Calc_ROA", {NET_INCOME: 1}, {"TotalAssets": 1})
+#   graph.evaluate(panel, ["Calc_ROA"], memo)     # NetIncome is reused, one sum + one division run
+
+
+class RatioGraph:
+    """
+    Ratio definitions (numerator {column: weight}, denominator {column: weight} or None)
+    compiled into memoized nodes:
+      ("col", column)              an input column (all NaN if the panel lacks it)
+      ("scale", column, weight)    weight * column
+      ("sum", terms)               sum of sub-nodes; NaN where any is missing
+      ("ratio", name, sides)       numerator / denominator; NaN for a zero denominator. Keyed by its
+                                   (numerator, denominator) nodes, so a redefined ratio is a new node
+    """
+
+    def __init__(self, ratios=RATIOS):
+        self.nodes = {}     # node -> child nodes
+        self.ratios = {}    # ratio name -> its node
+        for name, (numerator, denominator) in ratios.items():
+            self.add(name, numerator, denominator)
+
+    def add(self, name, numerator, denominator=None):
+        """
+        Register (or redefine) a ratio; shared sub-sums are reused. A memo filled before a
+        redefinition never answers for the new definition (its node differs).
+        """
+        sides = (self._side(numerator), self._side(denominator) if denominator else None)
+        node = ("ratio", name, sides)
+        previous = self.ratios.get(name)
+        if previous is not None and previous != node:
+            del self.nodes[previous]
+        self.nodes[node] = sides
+        self.ratios[name] = node
+        return node
+
+    def _side(self, weights):
+        terms = tuple(sorted((column, float(weight)) for column, weight in weights.items() if weight != 0))
+        if not terms:
+            raise ValueError("A ratio side needs at least one non-zero weight")
+        if all(weight == 1 for _, weight in terms):
+            return self._column(terms[0][0]) if len(terms) == 1 else self._sum(terms)
+        if len(terms) == 1:
+            return self._scale(*terms[0])
+        node = ("sum", terms)
+        if node not in self.nodes:
+            base = tuple(term for term in terms if term[1] == 1)
+            children = []
+            if base:
+                children.append(self._column(base[0][0]) if len(base) == 1 else self._sum(base))
+            children += [self._scale(column, weight) for column, weight in terms if weight != 1]
+            self.nodes[node] = tuple(children)
+        return node
+
+    def _scale(self, column, weight):
+        node = ("scale", column, weight)
+        self.nodes.setdefault(node, (self._column(column),))
+        return node
+
+    def _sum(self, terms):
+        node = ("sum", terms)
+        self.nodes.setdefault(node, tuple(self._column(column) for column, _ in terms))
+        return node
+
+    def _column(self, column):
+        node = ("col", column)
+        self.nodes.setdefault(node, ())
+        return node
+
+    def inputs(self, names=None):
+        """Input columns the given ratios (default: all) depend on, in first-use order."""
+        columns = {}
+        for node in self._order(names):
+            if node[0] == "col":
+                columns[node[1]] = None
+        return list(columns)
+
+    def _order(self, names=None):
+        """Nodes the given ratios need, dependencies first."""
+        order, seen = [], set()
+
+        def visit(node):
+            if node is None or node in seen:
+                return
+            seen.add(node)
+            for child in self.nodes[node]:
+                visit(child)
+            order.append(node)
+        for name in (self.ratios if names is None else names):
+            visit(self.ratios[name])
+        return order
+
+    def evaluate(self, panel, names=None, memo=None):
+        """
+        The given ratios (default: all) for every row of a master frame or (cik, year) panel.
+        memo ({node: array}) carries computed nodes between calls on the same panel.
+        """
+        memo = {} if memo is None else memo
+        order = [node for node in self._order(names) if node not in memo]
+        columns = [node[1] for node in order if node[0] == "col"]
+        if columns:
+            data = panel.reindex(columns=columns).to_numpy(dtype="float64")
+            for i, column in enumerate(columns):
+                memo[("col", column)] = data[:, i]
+        for node in order:
+            kind = node[0]
+            if kind == "scale":
+                memo[node] = node[2] * memo[("col", node[1])]
+            elif kind == "sum":
+                total = memo[self.nodes[node][0]].copy()
+                for child in self.nodes[node][1:]:
+                    total += memo[child]
+                memo[node] = total
+            elif kind == "ratio":
+                numerator, denominator = self.nodes[node]
+                if denominator is None:
+                    memo[node] = memo[numerator]
+                else:
+                    bottom = memo[denominator]
+                    memo[node] = memo[numerator] / np.where(bottom == 0, np.nan, bottom)
+        names = list(self.ratios) if names is None else list(names)
+        return pd.DataFrame({name: memo[self.ratios[name]] for name in names}, index=panel.index, columns=names)
+
+
+_default_graph = None
+
+
+def get_ratio_graph():
+    """The compiled RATIOS registry (built once per process)."""
+    global _default_graph
+    if _default_graph is None:
+        _default_graph = RatioGraph(RATIOS)
+    return _default_graph
+
+
+def compute_ratios(panel, ratios=RATIOS):
+    """
+    Every registered ratio for every row of a master frame or (cik, year) panel,
+    evaluated over the ratio graph (each shared input and sub-sum once). Returns a frame
+    with the panel's index and one column per ratio.
+    """
+    graph = get_ratio_graph() if ratios is RATIOS else RatioGraph(ratios)
+    return graph.evaluate(panel)
+
+
+def add_ratios(panel, ratios=RATIOS):
+    """Set the ratio columns on a master frame / panel (in place) and return it."""
+    result = compute_ratios(panel, ratios)
+    for name in result.columns:
+        panel[name] = result[name]
+    return panel
+
+
+def universe_ratios(facts, ratios=RATIOS):
+    """
+    (CIK, Year) panel of master and concept columns plus ratios for every company in a fact table.
+    Amounts (and money-valued ratios such as Calc_FCF) are in each row's Currency.
+    """
+    panel = universe_master_panel(facts)
+    with stage("ratio") as s:
+        add_ratios(panel, ratios)
+        s["items"] = len(panel)
+    return panel
+
+
+if __name__ == "__main__":
+    panel = universe_ratios(read_fact_store(FACT_STORE_DIR))
+    panel[[CURRENCY_COLUMN] + list(RATIOS)].to_csv(OUTPUT_FILE)
+    print(f"Ratios for {panel.index.get_level_values('CIK').nunique()} companies saved to {OUTPUT_FILE}")
@@ -0,0 +1,34 @@
+import os
+
+# ==========================================
+# RUN SETTINGS
+# ==========================================
+# Shared by every script instead of being edited into each of them. Defaults come from the
+# environment; the CLI (cli.py) sets them per run and hands them to its worker processes.
+#   SEC_USER_AGENT="Jane Doe jane@example.com"   SEC requires a contact in the User-Agent
+#   FIRST_YEAR=2014 LAST_YEAR=2025               fiscal years kept by the annual selection
+USER_AGENT = os.environ.get("SEC_USER_AGENT", "your-email@example.com")
+FIRST_YEAR = int(os.environ.get("FIRST_YEAR", "2014"))
+LAST_YEAR = int(os.environ.get("LAST_YEAR", "2025"))
+
+
+def year_window():
+    """(first, last) fiscal year, inclusive."""
+    return FIRST_YEAR, LAST_YEAR
+
+
+def set_year_window(first, last):
+    global FIRST_YEAR, LAST_YEAR
+    if first > last:
+        raise ValueError(f"Empty year window {first}-{last}")
+    FIRST_YEAR, LAST_YEAR = int(first), int(last)
+
+
+def set_user_agent(user_agent):
+    """Change the User-Agent every default HEADERS dict sends (they all share this one dict)."""
+    global USER_AGENT
+    USER_AGENT = user_agent
+    HEADERS["User-Agent"] = user_agent
+
+
+HEADERS = {"User-Agent": USER_AGENT}
@@ -0,0 +1,222 @@
+import importlib.util
+import os
+import sys
+
+from diagnostics import configure_logging, count, get_logger, trace_selection
+from edgar_client import get_company_facts
+from facts_stream import wanted_facts
+from profiling import configure_profiling, stage
+from settings import HEADERS, year_window
+from statement_matrix import StatementBuilder, StatementMatrix
+from taxonomies import company_facts_view
+from ticker_index import resolve_cik
+
+log = get_logger("statement_engine")
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+#   python src/statement_engine.py NVDA   (a ticker, CIK or company name)
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Statement key -> (script, tag dict, category order, CSV name suffix)
+# Keys match the prefixes used by MasterAnalysisFinal.py
+STATEMENTS = {
+    "IS": ("Income statement.py", "INCOME_TAGS", "INCOME_CATEGORIES", "Income_Statement"),
+    "BS": ("Balance Sheet.py", "BALANCE_SHEET_TAGS", "BALANCE_SHEET_CATEGORIES", "balance_sheet"),
+    "CF": ("Cash Flow.py", "CASH_FLOW_TAGS", "CASH_FLOW_CATEGORIES", "Cashflow_statement"),
+}
+
+_modules = {}
+_tag_index = None
+_master_columns = None
+
+
+def load_statement_module(key):
+    """Import one of the statement scripts (their file names contain spaces, so no plain import)."""
+    if key not in _modules:
+        filename = STATEMENTS[key][0]
+        name = os.path.splitext(filename)[0].lower().replace(" ", "_")
+        spec = importlib.util.spec_from_file_location(name, os.path.join(SRC_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[key] = module
+    return _modules[key]
+
+
+def get_tag_index():
+    """
+    Map every XBRL tag used by any statement to the statements that want it:
+    {tag: [(statement_key, label, unit, category), ...]}
+    Built once per process.
+    """
+    global _tag_index
+    if _tag_index is None:
+        index = {}
+        for key, (_, tags_attr, _, _) in STATEMENTS.items():
+            tags = getattr(load_statement_module(key), tags_attr)
+            for tag, (label, unit, category) in tags.items():
+                index.setdefault(tag, []).append((key, label, unit, category))
+        _tag_index = index
+    return _tag_index
+
+
+def master_columns():
+    """
+    {master column: (statement_key, category, label, [(tag, unit), ...])} for every line item,
+    tags in registry order (a later tag's years overwrite an earlier one's, as in assemble_statements).
+    Columns are "{key}_{label}"; a label repeated in a later category is "{key}_{label} ({category})".
+    """
+    global _master_columns
+    if _master_columns is None:
+        columns = {}
+        for key, (_, tags_attr, categories_attr, _) in STATEMENTS.items():
+            module = load_statement_module(key)
+            items = {}
+            for tag, (label, unit, category) in getattr(module, tags_attr).items():
+                items.setdefault((category, label), []).append((tag, unit))
+            for category in getattr(module, categories_attr):
+                for label in sorted(label for item_category, label in items if item_category == category):
+                    column = f"{key}_{label}"
+                    if column in columns:
+                        column = f"{column} ({category})"
+                    columns[column] = (key, category, label, items[(category, label)])
+        _master_columns = columns
+    return _master_columns
+
+
+def statement_facts():
+    """{(taxonomy, tag)} the three statements can read, IFRS/dei fallbacks included (streaming parse filter)."""
+    return wanted_facts(get_tag_index())
+
+
+def extract_all_statements(xbrl_data, cik=None):
+    """
+    Resolve every tag of all three statements in one pass over the facts
+    (a plain us-gaap {tag: fact} dict or a taxonomies.TaxonomyView).
+
+    Each statement keeps its own annual-selection rules (select_annual_entries in
+    its script), so the output is identical to running extract_income_data,
+    extract_balance_sheet_data and extract_cash_flow_data separately.
+    Returns {"IS": income_data, "BS": balance_data, "CF": cash_flow_data}.
+    Updates the per-statement diagnostics counters; cik only labels trace records.
+    """
+    return assemble_statements(select_statements(xbrl_data, cik))
+
+
+def select_statements(xbrl_data, cik=None):
+    """
+    {(statement_key, tag): {year: info}} for every tag of the three statements, with the
+    provenance select_annual_entries chose each value on (form, fp, frame, qtrs, start, end, ...).
+    """
+    with stage("select", cik) as s:
+        selected = _select_all(xbrl_data, cik)
+        s["items"] = len(selected)
+    return selected
+
+
+def _select_all(xbrl_data, cik):
+    selected = {}
+    for tag, targets in get_tag_index().items():
+        fact = xbrl_data.get(tag)
+        if fact is None:
+            for key, _, _, _ in targets:
+                count(key, "tags_missing")
+            continue
+        units = fact["units"]
+        for key, label, unit, category in targets:
+            count(key, "tags_found")
+            if unit not in units:
+                count(key, "units_missing")
+                log.debug("Tag %s does not have expected unit '%s'. Available units: %s", tag, unit, list(units))
+                continue
+            entries = units[unit]
+            annual_by_year = load_statement_module(key).select_annual_entries(entries, unit)
+            count(key, "facts_scanned", len(entries))
+            count(key, "facts_kept", len(annual_by_year))
+            trace_selection(key, tag, label, category, annual_by_year, cik)
+            selected[(key, tag)] = annual_by_year
+    return selected
+
+
+def assemble_statements(selected):
+    """
+    Build the per-statement StatementMatrix objects (read as {category: {label: {year: value}}})
+    from {(statement_key, tag): annual_by_year} selections.
+    Assembled in each statement's own tag order so duplicate labels resolve the same way.
+    """
+    first_year, last_year = year_window()
+    statements = {}
+    for key, (_, tags_attr, categories_attr, _) in STATEMENTS.items():
+        module = load_statement_module(key)
+        builder = StatementBuilder(module.ITEMS, range(first_year, last_year + 1), getattr(module, categories_attr), key)
+        for tag, (label, unit, category) in getattr(module, tags_attr).items():
+            for year, info in (selected.get((key, tag)) or {}).items():
+                builder.set(category, label, year, info["value"])
+        statements[key] = builder.build()
+    return statements
+
+
+def statement_matrix(key, data):
+    """One statement as a StatementMatrix, converting a plain {category: {label: {year: value}}} dict."""
+    module = load_statement_module(key)
+    return StatementMatrix.coerce(data, module.ITEMS, getattr(module, STATEMENTS[key][2]), key)
+
+
+def statement_records(cik, statements):
+    """Flatten {statement: StatementMatrix or {category: {label: {year: value}}}} into long-format rows."""
+    rows = []
+    for key, data in statements.items():
+        if isinstance(data, StatementMatrix):
+            rows.extend(data.records(cik, key))
+            continue
+        for category, items in data.items():
+            for label, years in items.items():
+                for year, value in years.items():
+                    rows.append((cik, key, category, label, year, value))
+    return rows
+
+
+def records_to_statements(records):
+    """Inverse of statement_records: long rows (or a DataFrame of them) back to statement dicts."""
+    if hasattr(records, "itertuples"):
+        records = records.itertuples(index=False)
+    statements = {
+        key: {category: {} for category in getattr(load_statement_module(key), STATEMENTS[key][2])}
+        for key in STATEMENTS
+    }
+    for _, key, category, label, year, value in records:
+        statements[key].setdefault(category, {}).setdefault(label, {})[int(year)] = value
+    return statements
+
+
+def extract_statements_for_cik(cik, headers=None):
+    """Fetch (through the shared cache) and stream-decode the facts the statements use, then extract all statements."""
+    data = get_company_facts(cik, headers=headers or HEADERS, wanted=statement_facts())
+    return extract_all_statements(company_facts_view(data), cik)
+
+
+def create_dataframes(statements, cik=None):
+    """Run each statement's create_dataframe on its extracted data."""
+    frames = {}
+    for key, data in statements.items():
+        with stage("frame", cik) as s:
+            frames[key] = load_statement_module(key).create_dataframe(data)
+            s["items"] = len(frames[key])
+    return frames
+
+
+def statement_filename(cik, key):
+    return f"{cik}_{STATEMENTS[key][3]}.csv"
+
+
+if __name__ == "__main__":
+    configure_logging()
+    configure_profiling()
+    if len(sys.argv) != 2:
+        raise SystemExit("usage: python src/statement_engine.py <ticker, CIK or company name>")
+    cik = resolve_cik(sys.argv[1])
+    statements = extract_statements_for_cik(cik)
+    for key, df in create_dataframes(statements, cik).items():
+        df.to_csv(statement_filename(cik, key), index=False)
+        log.info("Data saved to %s", statement_filename(cik, key))
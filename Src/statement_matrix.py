@@ -0,0 +1,183 @@
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# STATEMENT MATRIX
+# ==========================================
+# One extracted statement as arrays instead of {category: {label: {year: value}}} dicts:
+# a fixed line-item axis ((category, label) pairs: categories in statement order, labels
+# sorted within each, the row order create_dataframe always printed), a year axis and a
+# float64 value matrix with a missing mask. The extractors fill it through a
+# StatementBuilder; frames are built from the matrix in one step instead of one
+# sub-frame per category.
+#
+#   matrix = extract_income_data(xbrl_data)
+#   matrix.to_frame()            # (Category, Item) x Year, a view of matrix.values
+#   matrix.master_frame()        # Year x "IS_{label}" columns, as statement_frame returns
+#   matrix["Revenues"]           # {label: {year: value}}, so dict readers keep working
+
+
+def item_axis(tags, categories):
+    """((category, label), ...) for a statement's tag registry: categories in order, labels sorted within each."""
+    labels = {(category, label) for label, _, category in tags.values()}
+    return tuple((category, label) for category in categories
+                 for label in sorted(label for item_category, label in labels if item_category == category))
+
+
+class StatementBuilder:
+    """
+    Fills a statement's value matrix one (line item, year) cell at a time. Cells start
+    missing; setting one twice keeps the last value (a later tag overwrites an earlier one
+    with the same label, as the dict assembly did).
+    """
+
+    def __init__(self, axis, years, categories=None, key=None):
+        self.axis = tuple(axis)
+        self.years = np.asarray(list(years), dtype="int64")
+        self.categories = list(categories) if categories is not None else list(dict.fromkeys(c for c, _ in self.axis))
+        self.key = key
+        self.rows = {item: i for i, item in enumerate(self.axis)}
+        self.columns = {int(year): j for j, year in enumerate(self.years)}
+        self.values = np.full((len(self.axis), len(self.years)), np.nan)
+        self.missing = np.ones(self.values.shape, dtype=bool)
+
+    def set(self, category, label, year, value):
+        i, j = self.rows[(category, label)], self.columns[year]
+        self.values[i, j] = value
+        self.missing[i, j] = False
+
+    def set_years(self, category, label, values):
+        """{year: value} into one line item."""
+        for year, value in values.items():
+            self.set(category, label, year, value)
+
+    def build(self):
+        """The StatementMatrix, its year axis trimmed to the years with at least one value."""
+        keep = ~self.missing.all(axis=0)
+        return StatementMatrix(self.axis, self.years[keep], self.values[:, keep], self.missing[:, keep],
+                               self.categories, self.key)
+
+
+class StatementMatrix(Mapping):
+    """
+    One statement as axis (line items), years (int64) and values (float64, NaN where
+    missing) plus the missing mask. Read as a mapping it is the old
+    {category: {label: {year: value}}} dict: every category, the line items with data.
+    """
+
+    def __init__(self, axis, years, values, missing=None, categories=None, key=None):
+        self.axis = tuple(axis)
+        self.years = np.asarray(years, dtype="int64")
+        self.values = np.asarray(values, dtype="float64")
+        self.missing = np.isnan(self.values) if missing is None else missing
+        self.categories = list(categories) if categories is not None else list(dict.fromkeys(c for c, _ in self.axis))
+        self.key = key
+
+    @classmethod
+    def from_dict(cls, data, axis, categories, key=None):
+        """
+        Matrix of a {category: {label: {year: value}}} dict (records_to_statements, merge_years, ...).
+        Line items missing from axis and unknown categories are added in the same order rules.
+        """
+        categories = list(categories) + [c for c in data if c not in categories]
+        items = set(axis) | {(category, label) for category, labels in data.items() for label in labels}
+        axis = tuple((category, label) for category in categories
+                     for label in sorted(label for item_category, label in items if item_category == category))
+        years = sorted({int(year) for labels in data.values() for values in labels.values() for year in values})
+        builder = StatementBuilder(axis, years, categories, key)
+        for category, labels in data.items():
+            for label, values in labels.items():
+                builder.set_years(category, label, {int(year): value for year, value in values.items()})
+        return builder.build()
+
+    @classmethod
+    def coerce(cls, data, axis, categories, key=None):
+        return data if isinstance(data, cls) else cls.from_dict(data, axis, categories, key)
+
+    # ----- mapping view -----
+
+    def __getitem__(self, category):
+        if category not in self.categories:
+            raise KeyError(category)
+        years = self.years.tolist()
+        items = {}
+        for i in self._rows(category):
+            present = ~self.missing[i]
+            if present.any():
+                row = self.values[i].tolist()
+                items[self.axis[i][1]] = {year: row[j] for j, year in enumerate(years) if present[j]}
+        return items
+
+    def __iter__(self):
+        return iter(self.categories)
+
+    def __len__(self):
+        return len(self.categories)
+
+    def _rows(self, category):
+        return [i for i, (item_category, _) in enumerate(self.axis) if item_category == category]
+
+    # ----- frames -----
+
+    def present(self):
+        """Boolean per line item: has at least one value."""
+        return ~self.missing.all(axis=1)
+
+    def to_frame(self):
+        """(Category, Item) x Year float64 frame over the full axis; shares memory with values."""
+        index = pd.MultiIndex.from_tuples(self.axis, names=["Category", "Item"]) if self.axis else \
+            pd.MultiIndex.from_arrays([[], []], names=["Category", "Item"])
+        return pd.DataFrame(self.values, index=index, columns=pd.Index(self.years, name="Year"), copy=False)
+
+    def master_frame(self, prefix=None):
+        """
+        Year-indexed float64 frame with a "{prefix}_{label}" column per line item with data
+        (a label repeated in a later category is "{prefix}_{label} ({category})"), as statement_frame returns.
+        """
+        prefix = prefix or self.key
+        present = self.present()
+        columns = []
+        for category, label in (item for item, p in zip(self.axis, present) if p):
+            column = f"{prefix}_{label}"
+            columns.append(f"{column} ({category})" if column in columns else column)
+        values = self.values if present.all() else self.values[present]
+        return pd.DataFrame(values.T, index=pd.Index(self.years, name="Year"), columns=columns, copy=False)
+
+    def presentation_frame(self):
+        """
+        create_dataframe's layout: a "**category**" header row before each category with data,
+        then its line items; columns Category, Item and one per year.
+        """
+        present = self.present()
+        category_column, item_column, rows = [], [], []
+        for category in self.categories:
+            items = [i for i in self._rows(category) if present[i]]
+            if not items:
+                continue
+            category_column.append(f"**{category}**")
+            item_column.append("")
+            rows.append(-1)   # header row, no values
+            for i in items:
+                category_column.append(np.nan)
+                item_column.append(self.axis[i][1])
+                rows.append(i)
+        rows = np.asarray(rows, dtype="int64")
+        values = np.full((len(rows), len(self.years)), np.nan)
+        values[rows >= 0] = self.values[rows[rows >= 0]]
+        columns = {"Category": np.asarray(category_column, dtype=object), "Item": np.asarray(item_column, dtype=object)}
+        columns.update({year: values[:, j] for j, year in enumerate(self.years.tolist())})
+        return pd.DataFrame(columns)
+
+    def records(self, cik, key=None):
+        """Long rows (cik, statement, category, label, year, value) of every present cell."""
+        key = key or self.key
+        rows, columns = np.nonzero(~self.missing)
+        years = self.years.tolist()
+        values = self.values[rows, columns].tolist()
+        return [(cik, key, *self.axis[i], years[j], value) for i, j, value in zip(rows.tolist(), columns.tolist(), values)]
+
+    def __repr__(self):
+        return (f"StatementMatrix({self.key!r}, {int(self.present().sum())}/{len(self.axis)} items, "
+                f"years {self.years.tolist()})")
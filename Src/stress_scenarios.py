@@ -0,0 +1,139 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from concept_index import universe_master_panel
+from fact_store import FACT_STORE_DIR, read_fact_store
+from ratio_engine import CASH, CURRENT_ASSETS, CURRENT_LIABILITIES, RECEIVABLES, SECURITIES
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+OUTPUT_FILE = "STRESS_CUBE.npz"
+
+
+# ==========================================
+# SCENARIO GRID
+# ==========================================
+# Each shock axis is a list of fractions; the grid is every combination of them.
+#   securities_haircut      marketable securities lose this share of their value
+#   receivables_writedown   receivables lose this share of their value
+#   liability_increase      current liabilities grow by this share
+# The old Calc_Stress_Quick_10pct/15pct/25pct columns are the points
+# (0.10|0.15|0.25, 0, 0) of this grid.
+SCENARIO_GRID = {
+    "securities_haircut": [0.0, 0.10, 0.15, 0.25, 0.50],
+    "receivables_writedown": [0.0, 0.05, 0.10, 0.25],
+    "liability_increase": [0.0, 0.10, 0.25],
+}
+SHOCKS = list(SCENARIO_GRID)
+STRESS_RATIOS = ["quick", "current"]
+
+
+def scenario_grid(**axes):
+    """
+    Cartesian product of shock axes as a frame, one row per scenario.
+    Axes not given fall back to SCENARIO_GRID; pass e.g. liability_increase=[0.0] to pin one.
+    """
+    unknown = set(axes) - set(SHOCKS)
+    if unknown:
+        raise ValueError(f"Unknown shock axis: {sorted(unknown)} (expected {SHOCKS})")
+    values = [axes.get(shock, SCENARIO_GRID[shock]) for shock in SHOCKS]
+    scenarios = pd.DataFrame(list(itertools.product(*values)), columns=SHOCKS, dtype="float64")
+    scenarios.index.name = "scenario"
+    return scenarios
+
+
+class StressCube:
+    """
+    Stressed ratios as one array: values[ratio, row, scenario].
+    rows follow `index` (the panel's (CIK, Year) or Year index), scenarios follow
+    the rows of `scenarios`, ratios follow STRESS_RATIOS.
+    """
+
+    def __init__(self, values, index, scenarios, ratios=STRESS_RATIOS):
+        self.values = values
+        self.index = index
+        self.scenarios = scenarios
+        self.ratios = list(ratios)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def scenario_position(self, **shocks):
+        """Position of the scenario with exactly these shock values (unspecified shocks = 0)."""
+        target = np.array([shocks.get(shock, 0.0) for shock in SHOCKS])
+        matches = np.flatnonzero(np.isclose(self.scenarios[SHOCKS].to_numpy(), target).all(axis=1))
+        if not len(matches):
+            raise KeyError(f"No scenario {dict(zip(SHOCKS, target))} in the grid")
+        return int(matches[0])
+
+    def sel(self, ratio, **shocks):
+        """One ratio under one scenario as a Series over the rows."""
+        values = self.values[self.ratios.index(ratio), :, self.scenario_position(**shocks)]
+        return pd.Series(values, index=self.index, name=ratio)
+
+    def to_frame(self, ratio):
+        """One ratio as a rows x scenarios frame."""
+        return pd.DataFrame(self.values[self.ratios.index(ratio)], index=self.index, columns=self.scenarios.index)
+
+    def to_long(self):
+        """Long frame (index levels..., scenario shocks..., ratio, value), e.g. for storage."""
+        n_rows, n_scenarios = self.values.shape[1:]
+        rows = self.index.to_frame(index=False).iloc[np.tile(np.arange(n_rows), n_scenarios * len(self.ratios))]
+        shocks = self.scenarios.iloc[np.tile(np.repeat(np.arange(n_scenarios), n_rows), len(self.ratios))]
+        long = pd.concat([rows.reset_index(drop=True), shocks.reset_index(drop=True)], axis=1)
+        long["ratio"] = np.repeat(self.ratios, n_rows * n_scenarios)
+        long["value"] = self.values.transpose(0, 2, 1).reshape(-1)
+        return long
+
+    def save(self, path):
+        """Write the cube as one compressed .npz (values, index levels, scenario grid, ratio names)."""
+        index = self.index.to_frame(index=False)
+        np.savez_compressed(
+            path, values=self.values, ratios=np.array(self.ratios), shocks=self.scenarios[SHOCKS].to_numpy(),
+            index_names=np.array(index.columns, dtype=str),
+            **{f"index_{i}": index[name].to_numpy() for i, name in enumerate(index.columns)},
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=True) as f:
+            names = list(f["index_names"])
+            levels = [f[f"index_{i}"] for i in range(len(names))]
+            index = (pd.MultiIndex.from_arrays(levels, names=names) if len(names) > 1
+                     else pd.Index(levels[0], name=names[0]))
+            scenarios = pd.DataFrame(f["shocks"], columns=SHOCKS)
+            scenarios.index.name = "scenario"
+            return cls(f["values"], index, scenarios, list(f["ratios"]))
+
+
+def stress_test(panel, scenarios=None, dtype="float64"):
+    """
+    Quick and current ratios for every row of a master frame / (CIK, Year) panel under
+    every scenario, as one broadcast computation.
+      quick   = (cash + receivables * (1 - writedown) + securities * (1 - haircut)) / (liabilities * (1 + increase))
+      current = (current assets - receivables * writedown - securities * haircut) / (liabilities * (1 + increase))
+    Missing inputs and zero liabilities give NaN, as in ratio_engine (for the current ratio a
+    missing receivables/securities line is simply not shocked).
+    """
+    scenarios = scenario_grid() if scenarios is None else scenarios
+    data = panel.reindex(columns=[CASH, RECEIVABLES, SECURITIES, CURRENT_ASSETS, CURRENT_LIABILITIES])
+    cash, receivables, securities, assets, liabilities = (data.to_numpy(dtype="float64").T[:, :, None])
+    haircut, writedown, increase = (scenarios[SHOCKS].to_numpy(dtype="float64").T[:, None, :])
+
+    stressed_liabilities = liabilities * (1 + increase)
+    stressed_liabilities = np.where(stressed_liabilities == 0, np.nan, stressed_liabilities)
+    values = np.empty((len(STRESS_RATIOS), len(data), len(scenarios)), dtype=dtype)
+    values[0] = (cash + receivables * (1 - writedown) + securities * (1 - haircut)) / stressed_liabilities
+    # Receivables/securities are already inside current assets: a missing one just has nothing to shock
+    values[1] = (assets - np.nan_to_num(receivables) * writedown - np.nan_to_num(securities) * haircut) / stressed_liabilities
+    return StressCube(values, panel.index, scenarios)
+
+
+if __name__ == "__main__":
+    cube = stress_test(universe_master_panel(read_fact_store(FACT_STORE_DIR)))
+    cube.save(OUTPUT_FILE)
+    print(f"Stress cube {cube.shape} (ratio, company-year, scenario) saved to {OUTPUT_FILE}")
@@ -0,0 +1,89 @@
+import random
+
+from statement_engine import get_tag_index
+
+# ==========================================
+# SYNTHETIC COMPANYFACTS DOCUMENTS
+# ==========================================
+# Offline stand-ins for /api/xbrl/companyfacts/CIK##########.json. Entries mix the
+# shapes the selection rules have to tell apart: FY and quarterly facts, amended
+# forms, 10-Q/8-K noise, prior-year comparatives re-reported under a later fy,
+# missing fy/start/frame, and the odd qtrs value.
+
+FORMS = ["10-K", "10-K/A", "10-Q", "8-K", "20-F", "40-F"]
+FRAME_CHOICES = [None, "", "CY{y}", "CY{y}Q4I", "FY{y}", "CY{y}Q1"]
+QTRS_CHOICES = [1, 4, "4", "x", None]
+
+
+def make_entry(rnd, year, kind):
+    fiscal_start = f"{year - 1}-02-01"
+    fiscal_end = f"{year}-01-31"
+    if kind == "annual":
+        start, end, fp, form, fy = fiscal_start, fiscal_end, "FY", rnd.choice(["10-K", "10-K", "10-K/A"]), year
+    elif kind == "comparative":
+        # prior-year figure repeated in the next 10-K
+        start, end, fp, form, fy = fiscal_start, fiscal_end, "FY", "10-K", year + 1
+    elif kind == "noise":
+        start, end, fp, form, fy = fiscal_start, fiscal_end, rnd.choice(["FY", "Q4", None]), rnd.choice(FORMS), year
+    else:
+        quarter = int(kind[1])
+        start = fiscal_start if rnd.random() < 0.5 else f"{year - 1}-{2 + 3 * (quarter - 1):02d}-01"
+        end = f"{year - 1}-{1 + 3 * quarter:02d}-28"
+        fp, form, fy = kind, "10-Q", year
+
+    entry = {
+        "start": start,
+        "end": end,
+        "val": rnd.randint(-10 ** 9, 10 ** 10),
+        "accn": f"0000000000-{year % 100:02d}-{rnd.randint(0, 999999):06d}",
+        "fy": fy,
+        "fp": fp,
+        "form": form,
+        "filed": f"{year}-03-{rnd.randint(1, 28):02d}",
+    }
+    frame = rnd.choice(FRAME_CHOICES)
+    if frame is not None:
+        entry["frame"] = frame.format(y=year)
+    if rnd.random() < 0.05:
+        entry["fy"] = None
+    if rnd.random() < 0.1:
+        del entry["start"]
+    if rnd.random() < 0.2:
+        entry["qtrs"] = rnd.choice(QTRS_CHOICES)
+    return entry
+
+
+def make_company_facts(cik=1, seed=0, years=range(2010, 2027), facts_per_year=6, tags=None, extra_tags=0):
+    """
+    Build one synthetic companyfacts document.
+    tags defaults to every tag the three statements use; extra_tags adds unused
+    concepts so the document is closer to a real filer's size.
+    """
+    rnd = random.Random(seed)
+    index = get_tag_index()
+    tags = list(tags or index)
+    kinds = ["annual", "comparative", "Q1", "Q2", "Q3", "noise"]
+
+    gaap = {}
+    for n, tag in enumerate(tags + [f"SyntheticUnusedConcept{i}" for i in range(extra_tags)]):
+        unit = index[tag][0][2] if tag in index else "USD"
+        entries = [make_entry(rnd, year, kinds[i % len(kinds)])
+                   for year in years for i in range(facts_per_year)]
+        units = {unit: entries}
+        if n % 7 == 0:
+            units["EUR"] = entries[:3]
+        gaap[tag] = {"label": tag, "description": "", "units": units}
+
+    return {
+        "cik": int(cik),
+        "entityName": f"Synthetic Company {cik}",
+        "facts": {
+            "dei": {
+                "EntityCommonStockSharesOutstanding": {
+                    "label": "Entity Common Stock, Shares Outstanding",
+                    "units": {"shares": [make_entry(rnd, year, "annual") for year in years]},
+                }
+            },
+            "us-gaap": gaap,
+        },
+    }
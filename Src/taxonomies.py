@@ -0,0 +1,287 @@
+from collections import Counter
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# TAXONOMY CONFIGURATION
+# ==========================================
+# A companyfacts document is already indexed as facts -> taxonomy -> tag. The statement
+# scripts and the concept registry are written against us-gaap tag names; every other
+# taxonomy is reached through the view below, from the same decoded document:
+#   - a us-gaap tag the filer does not use falls back to its TAXONOMY_ALIASES in order
+#     (ifrs-full for foreign private issuers filing 20-F/40-F, dei for cover-page share counts)
+#   - any taxonomy can be read directly with a qualified name, e.g. view["dei:EntityPublicFloat"]
+#   - monetary units are read in the filer's reporting currency: the "USD" and "USD/shares"
+#     slots of a fact hold its reporting-currency entries (EUR, JPY, ...) when that is not USD,
+#     so values stay in millions of the currency the filer reports in. Cross-company
+#     frames carry a CURRENCY_COLUMN with each company's reporting currency (with_currency),
+#     so levels in different currencies are never compared unlabelled.
+PRIMARY_TAXONOMY = "us-gaap"
+VIEW_TAXONOMIES = {"us-gaap", "ifrs-full", "dei"}   # what the statements can read (flattening filter)
+CURRENCY_UNIT = "USD"                               # the money unit name used by the tag dicts
+CURRENCY_TAXONOMIES = (PRIMARY_TAXONOMY, "ifrs-full")  # whose units decide the reporting currency
+CURRENCY_COLUMN = "Currency"                        # reporting-currency column of (CIK, ...) panels
+
+# us-gaap tag: [(taxonomy, tag), ...] fallbacks in precedence order.
+# Only same-sign equivalents: IFRS "DecreaseIncrease" working-capital lines are left out.
+TAXONOMY_ALIASES = {
+    # Income statement
+    "Revenues": [("ifrs-full", "Revenue")],
+    "RevenueFromContractWithCustomerExcludingAssessedTax": [("ifrs-full", "RevenueFromContractsWithCustomers")],
+    "CostOfRevenue": [("ifrs-full", "CostOfSales")],
+    "CostOfGoodsAndServicesSold": [("ifrs-full", "CostOfSales")],
+    "ResearchAndDevelopmentExpense": [("ifrs-full", "ResearchAndDevelopmentExpense")],
+    "SellingGeneralAndAdministrativeExpense": [("ifrs-full", "SellingGeneralAndAdministrativeExpense")],
+    "GeneralAndAdministrativeExpense": [("ifrs-full", "AdministrativeExpense")],
+    "MarketingExpense": [("ifrs-full", "SellingExpense")],
+    "AllocatedShareBasedCompensationExpense": [("ifrs-full", "ExpenseFromSharebasedPaymentTransactionsWithEmployees")],
+    "DepreciationDepletionAndAmortization": [("ifrs-full", "DepreciationAndAmortisationExpense")],
+    "InterestExpense": [("ifrs-full", "InterestExpense"), ("ifrs-full", "FinanceCosts")],
+    "IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest": [
+        ("ifrs-full", "ProfitLossBeforeTax"),
+    ],
+    "IncomeTaxExpenseBenefit": [("ifrs-full", "IncomeTaxExpenseContinuingOperations")],
+    "NetIncomeLoss": [("ifrs-full", "ProfitLossAttributableToOwnersOfParent"), ("ifrs-full", "ProfitLoss")],
+    "ProfitLoss": [("ifrs-full", "ProfitLoss")],
+    "EarningsPerShareBasic": [("ifrs-full", "BasicEarningsLossPerShare")],
+    "EarningsPerShareDiluted": [("ifrs-full", "DilutedEarningsLossPerShare")],
+    "WeightedAverageNumberOfSharesOutstandingBasic": [("ifrs-full", "WeightedAverageShares")],
+    "WeightedAverageNumberOfDilutedSharesOutstanding": [("ifrs-full", "AdjustedWeightedAverageShares")],
+
+    # Balance sheet
+    "Assets": [("ifrs-full", "Assets")],
+    "AssetsCurrent": [("ifrs-full", "CurrentAssets")],
+    "CashAndCashEquivalentsAtCarryingValue": [("ifrs-full", "CashAndCashEquivalents")],
+    "AccountsReceivableNetCurrent": [("ifrs-full", "TradeAndOtherCurrentReceivables"), ("ifrs-full", "CurrentTradeReceivables")],
+    "InventoryNet": [("ifrs-full", "Inventories")],
+    "OtherAssetsCurrent": [("ifrs-full", "OtherCurrentAssets")],
+    "AssetsNoncurrent": [("ifrs-full", "NoncurrentAssets")],
+    "PropertyPlantAndEquipmentNet": [("ifrs-full", "PropertyPlantAndEquipment")],
+    "OperatingLeaseRightOfUseAsset": [("ifrs-full", "RightofuseAssets")],
+    "Goodwill": [("ifrs-full", "Goodwill")],
+    "IntangibleAssetsNetExcludingGoodwill": [("ifrs-full", "IntangibleAssetsOtherThanGoodwill")],
+    "Liabilities": [("ifrs-full", "Liabilities")],
+    "LiabilitiesCurrent": [("ifrs-full", "CurrentLiabilities")],
+    "AccountsPayableCurrent": [("ifrs-full", "TradeAndOtherCurrentPayables")],
+    "ShortTermBorrowings": [("ifrs-full", "ShorttermBorrowings")],
+    "OperatingLeaseLiabilityCurrent": [("ifrs-full", "CurrentLeaseLiabilities")],
+    "OperatingLeaseLiabilityNoncurrent": [("ifrs-full", "NoncurrentLeaseLiabilities")],
+    "LiabilitiesNoncurrent": [("ifrs-full", "NoncurrentLiabilities")],
+    "LongTermDebtNoncurrent": [("ifrs-full", "LongtermBorrowings")],
+    "DeferredTaxLiabilitiesNoncurrent": [("ifrs-full", "DeferredTaxLiabilities")],
+    "StockholdersEquity": [("ifrs-full", "EquityAttributableToOwnersOfParent"), ("ifrs-full", "Equity")],
+    "CommonStockValue": [("ifrs-full", "IssuedCapital")],
+    "AdditionalPaidInCapital": [("ifrs-full", "SharePremium")],
+    "RetainedEarningsAccumulatedDeficit": [("ifrs-full", "RetainedEarnings")],
+    "TreasuryStockValue": [("ifrs-full", "TreasuryShares")],
+    "NoncontrollingInterest": [("ifrs-full", "NoncontrollingInterests")],
+    "CommonStockSharesIssued": [("ifrs-full", "NumberOfSharesIssued")],
+    "CommonStockSharesOutstanding": [("ifrs-full", "NumberOfSharesOutstanding"), ("dei", "EntityCommonStockSharesOutstanding")],
+    "LiabilitiesAndStockholdersEquity": [("ifrs-full", "EquityAndLiabilities")],
+
+    # Cash flow
+    "NetCashProvidedByUsedInOperatingActivities": [("ifrs-full", "CashFlowsFromUsedInOperatingActivities")],
+    "NetCashProvidedByUsedInInvestingActivities": [("ifrs-full", "CashFlowsFromUsedInInvestingActivities")],
+    "NetCashProvidedByUsedInFinancingActivities": [("ifrs-full", "CashFlowsFromUsedInFinancingActivities")],
+    "PaymentsToAcquirePropertyPlantAndEquipment": [
+        ("ifrs-full", "PurchaseOfPropertyPlantAndEquipmentClassifiedAsInvestingActivities"),
+        ("ifrs-full", "PurchaseOfPropertyPlantAndEquipment"),
+    ],
+    "PaymentsToAcquireBusinessesNetOfCashAcquired": [
+        ("ifrs-full", "CashFlowsUsedInObtainingControlOfSubsidiariesOrOtherBusinessesClassifiedAsInvestingActivities"),
+    ],
+    "PaymentsForRepurchaseOfCommonStock": [("ifrs-full", "PaymentsToAcquireOrRedeemEntitysShares")],
+    "ProceedsFromIssuanceOfCommonStock": [("ifrs-full", "ProceedsFromIssuingShares")],
+    "ShareBasedCompensation": [("ifrs-full", "AdjustmentsForSharebasedPayments")],
+    "EffectOfExchangeRateOnCashCashEquivalentsRestrictedCashAndRestrictedCashEquivalents": [
+        ("ifrs-full", "EffectOfExchangeRateChangesOnCashAndCashEquivalents"),
+    ],
+    "CashCashEquivalentsRestrictedCashAndRestrictedCashEquivalentsPeriodIncreaseDecreaseIncludingExchangeRateEffect": [
+        ("ifrs-full", "IncreaseDecreaseInCashAndCashEquivalents"),
+    ],
+    "CashCashEquivalentsRestrictedCashAndRestrictedCashEquivalents": [("ifrs-full", "CashAndCashEquivalents")],
+}
+
+
+def split_tag(name, default=PRIMARY_TAXONOMY):
+    """'dei:EntityPublicFloat' -> ('dei', 'EntityPublicFloat'); an unqualified name is in the default taxonomy."""
+    taxonomy, sep, tag = name.partition(":")
+    return (taxonomy, tag) if sep else (default, name)
+
+
+def is_currency(unit):
+    return len(unit) == 3 and unit.isalpha() and unit.isupper()
+
+
+def reporting_currency(facts, taxonomies=CURRENCY_TAXONOMIES):
+    """The ISO currency unit with the most facts across the financial taxonomies (USD wins ties; USD if none)."""
+    counts = Counter()
+    for taxonomy in taxonomies:
+        for fact in facts.get(taxonomy, {}).values():
+            for unit, entries in fact.get("units", {}).items():
+                counts[unit] += len(entries)
+    return currency_from_counts(counts)
+
+
+def currency_from_counts(counts):
+    """Reporting-currency rule over {unit: number of facts} (non-currency units are ignored)."""
+    counts = {unit: n for unit, n in counts.items() if is_currency(unit)}
+    if not counts:
+        return CURRENCY_UNIT
+    return max(counts, key=lambda unit: (counts[unit], unit == CURRENCY_UNIT, unit))
+
+
+def currency_units(units, currency):
+    """A fact's units with the reporting currency (and per-share currency) moved into the USD slots."""
+    if currency == CURRENCY_UNIT:
+        return units
+    units = dict(units)
+    for native, slot in ((currency, CURRENCY_UNIT), (f"{currency}/shares", f"{CURRENCY_UNIT}/shares")):
+        if native in units:
+            units[slot] = units[native]
+    return units
+
+
+def with_currency(panel, currencies, level="CIK"):
+    """A (CIK, ...) panel with a leading CURRENCY_COLUMN from {cik: reporting currency} (USD if unknown)."""
+    panel = panel.drop(columns=CURRENCY_COLUMN, errors="ignore")
+    ciks = panel.index.get_level_values(level)
+    panel.insert(0, CURRENCY_COLUMN, pd.Series([currencies.get(cik) or CURRENCY_UNIT for cik in ciks],
+                                               index=panel.index, dtype=object))
+    return panel
+
+
+def view_tags(tags, aliases=TAXONOMY_ALIASES):
+    """Every tag name a view may read for these us-gaap tags (for flatten_company_facts' tags filter)."""
+    names = set(tags)
+    for tag in tags:
+        names.update(alias for _, alias in aliases.get(tag, ()))
+    return names
+
+
+class TaxonomyView(Mapping):
+    """
+    Read-only {tag: fact} mapping over every taxonomy of one companyfacts document,
+    shaped like data["facts"]["us-gaap"] so extract_* and resolve_concepts take it as is.
+    Lookups are resolved lazily and memoized; nothing is copied up front.
+    """
+
+    def __init__(self, facts, aliases=TAXONOMY_ALIASES, primary=PRIMARY_TAXONOMY, currency=None):
+        self.facts = facts
+        self.aliases = aliases
+        self.primary = primary
+        self.currency = currency or reporting_currency(facts)
+        self.sources = {}   # tag -> (taxonomy, tag) it was read from
+        self._resolved = {}
+
+    def _resolve(self, name):
+        if name in self._resolved:
+            return self._resolved[name]
+        taxonomy, tag = split_tag(name, self.primary)
+        candidates = [(taxonomy, tag)]
+        if taxonomy == self.primary and ":" not in name:
+            candidates += self.aliases.get(tag, [])
+        fact = None
+        for source in candidates:
+            raw = self.facts.get(source[0], {}).get(source[1])
+            if raw is not None:
+                fact = dict(raw, units=currency_units(raw.get("units", {}), self.currency))
+                self.sources[name] = source
+                break
+        self._resolved[name] = fact
+        return fact
+
+    def __getitem__(self, name):
+        fact = self._resolve(name)
+        if fact is None:
+            raise KeyError(name)
+        return fact
+
+    def __iter__(self):
+        seen = set()
+        for tag in list(self.facts.get(self.primary, {})) + list(self.aliases):
+            if tag not in seen and self._resolve(tag) is not None:
+                seen.add(tag)
+                yield tag
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def taxonomy(self, name):
+        """Raw {tag: fact} of one taxonomy (ifrs-full, dei, srt, ...)."""
+        return self.facts.get(name, {})
+
+
+def company_facts_view(data, **options):
+    """
+    TaxonomyView over a decoded companyfacts document ({} facts if the document is empty).
+    A streamed document (facts_stream) carries the reporting currency of the whole filing.
+    """
+    options.setdefault("currency", data.get("reportingCurrency"))
+    return TaxonomyView(data.get("facts", {}), **options)
+
+
+# ==========================================
+# FACT-TABLE (VECTORIZED) VIEW
+# ==========================================
+
+def view_fact_rows(facts, aliases=TAXONOMY_ALIASES, primary=PRIMARY_TAXONOMY):
+    """
+    The fact-table equivalent of TaxonomyView: alias rows (ifrs-full, dei) relabelled to the
+    us-gaap tag they stand in for where that company has no us-gaap fact for the tag, and
+    reporting-currency units moved into the USD slots. Returns rows labelled `primary`.
+    """
+    taxonomy = facts["taxonomy"].astype(str).to_numpy()
+    tag = facts["tag"].astype(str).to_numpy()
+    unit = facts["unit"].astype(str).to_numpy()
+    cik = facts["cik"].astype(str).to_numpy()
+
+    # Stand-in candidates: (taxonomy, tag) -> (us-gaap tag, rank); rank 0 = the us-gaap tag itself
+    candidates = pd.DataFrame(
+        [(primary, t, t, 0) for t in np.unique(tag[taxonomy == primary])]
+        + [(tx, alias, target, rank + 1) for target, chain in aliases.items() for rank, (tx, alias) in enumerate(chain)],
+        columns=["taxonomy", "tag", "target", "rank"],
+    )
+    rows = pd.DataFrame({"position": np.arange(len(facts)), "cik": cik, "taxonomy": taxonomy, "tag": tag})
+    rows = rows.merge(candidates, on=["taxonomy", "tag"])
+    # Per (cik, us-gaap tag) only the best-ranked source that exists survives
+    rows = rows[rows["rank"] == rows.groupby(["cik", "target"])["rank"].transform("min")]
+
+    out = facts.iloc[rows["position"].to_numpy()].copy()
+    out["taxonomy"] = pd.Categorical([primary] * len(out))
+    out["tag"] = pd.Categorical(rows["target"].to_numpy())
+    return currency_rows(out, reporting_currencies(facts, cik, taxonomy, unit))
+
+
+def reporting_currencies(facts, cik=None, taxonomy=None, unit=None):
+    """{cik: reporting currency}, same rule as reporting_currency()."""
+    cik = facts["cik"].astype(str).to_numpy() if cik is None else cik
+    taxonomy = facts["taxonomy"].astype(str).to_numpy() if taxonomy is None else taxonomy
+    unit = facts["unit"].astype(str).to_numpy() if unit is None else unit
+    mask = np.isin(taxonomy, list(CURRENCY_TAXONOMIES)) & np.array([is_currency(u) for u in unit], dtype=bool)
+    counts = pd.DataFrame({"cik": cik[mask], "unit": unit[mask]}).value_counts().rename("n").reset_index()
+    counts["usd"] = counts["unit"] == CURRENCY_UNIT
+    counts = counts.sort_values(["cik", "n", "usd", "unit"], ascending=[True, False, False, False])
+    return dict(counts.drop_duplicates("cik")[["cik", "unit"]].itertuples(index=False))
+
+
+def currency_rows(facts, currencies):
+    """Move each company's reporting-currency rows into the USD slots (dropping the USD rows they replace)."""
+    foreign = {cik: cur for cik, cur in currencies.items() if cur != CURRENCY_UNIT}
+    if not foreign or facts.empty:
+        return facts
+    cik = facts["cik"].astype(str)
+    native = cik.map(foreign)
+    unit = facts["unit"].astype(str)
+    slot = pd.Series(np.where(unit == native, CURRENCY_UNIT,
+                              np.where(unit == native + "/shares", f"{CURRENCY_UNIT}/shares", unit)), index=facts.index)
+    moved = slot != unit
+    # A native entry in a slot replaces that fact's own USD entries, as in currency_units()
+    replaced = pd.MultiIndex.from_arrays([cik[moved], facts["tag"].astype(str)[moved], slot[moved]])
+    own = pd.MultiIndex.from_arrays([cik, facts["tag"].astype(str), unit])
+    keep = moved | ~(native.notna() & own.isin(replaced))
+    facts = facts[keep.to_numpy()].copy()
+    facts["unit"] = pd.Categorical(slot[keep].to_numpy())
+    return facts
@@ -0,0 +1,201 @@
+import json
+import os
+import re
+import time
+
+import requests
+
+from diagnostics import get_logger
+from edgar_cache import CACHE_DIR, normalize_cik, write_atomic
+from settings import HEADERS
+
+log = get_logger("ticker_index")
+
+# ==========================================
+# TICKER INDEX CONFIGURATION
+# ==========================================
+# SEC's company_tickers.json ({"0": {"cik_str": 1045810, "ticker": "NVDA", "title": "NVIDIA CORP"}, ...})
+# is downloaded once, kept next to the companyfacts cache and refreshed after TICKER_TTL_SECONDS
+# (a conditional request, so an unchanged file costs a 304). Lookups by ticker, CIK and
+# name prefix are dict lookups; a whole ticker list resolves without further requests.
+#   resolve_cik("nvda") -> "0001045810"      resolve_cik("320193") -> "0000320193" (no index needed)
+#   get_ticker_index().by_name("advanced micro") -> [{"cik": "0000002488", "ticker": "AMD", ...}]
+TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+TICKER_INDEX_PATH = os.environ.get("TICKER_INDEX_PATH", os.path.join(os.path.dirname(CACHE_DIR), "company_tickers.json"))
+TICKER_TTL_SECONDS = 24 * 60 * 60
+NAME_PREFIX_LENGTH = 12   # name prefixes indexed up to this length; longer queries filter that bucket
+
+
+def normalize_ticker(ticker):
+    """'brk.b' -> 'BRK-B' (SEC writes share classes with a dash)."""
+    return ticker.strip().upper().replace(".", "-").replace("/", "-")
+
+
+def normalize_name(name):
+    """Upper case, punctuation and repeated spaces collapsed: 'Apple Inc.' -> 'APPLE INC'."""
+    return " ".join(re.sub(r"[^0-9A-Z]+", " ", name.upper()).split())
+
+
+def is_cik(identifier):
+    """True for a numeric CIK, with or without leading zeros or a CIK prefix."""
+    text = str(identifier).strip().upper()
+    return text.removeprefix("CIK").isdigit()
+
+
+class TickerIndex:
+    """
+    In-memory lookups over SEC's ticker list. Companies are dicts {"cik", "ticker", "name"}
+    in the file's order; a CIK with several share classes has one entry per ticker.
+    """
+
+    def __init__(self, companies):
+        self.companies = companies
+        self.tickers = {}
+        self.ciks = {}
+        for company in companies:
+            self.tickers.setdefault(normalize_ticker(company["ticker"]), company)
+            self.ciks.setdefault(company["cik"], []).append(company)
+        self._names = None
+
+    @classmethod
+    def from_sec(cls, data):
+        """Index a decoded company_tickers.json."""
+        return cls([
+            {"cik": normalize_cik(row["cik_str"]), "ticker": row["ticker"], "name": row["title"]}
+            for row in data.values()
+        ])
+
+    def __len__(self):
+        return len(self.companies)
+
+    def by_ticker(self, ticker):
+        return self.tickers.get(normalize_ticker(ticker))
+
+    def by_cik(self, cik):
+        return self.ciks.get(normalize_cik(cik), [])
+
+    def by_name(self, prefix):
+        """Companies whose normalized name starts with prefix (built on first use)."""
+        if self._names is None:
+            self._names = {}
+            for company in self.companies:
+                name = normalize_name(company["name"])
+                for length in range(1, min(len(name), NAME_PREFIX_LENGTH) + 1):
+                    self._names.setdefault(name[:length], []).append(company)
+        prefix = normalize_name(prefix)
+        matches = self._names.get(prefix[:NAME_PREFIX_LENGTH], [])
+        if len(prefix) > NAME_PREFIX_LENGTH:
+            matches = [c for c in matches if normalize_name(c["name"]).startswith(prefix)]
+        return matches
+
+    def resolve(self, identifier):
+        """
+        CIK for a CIK, ticker or company name. A name must match one company exactly
+        or be the prefix of exactly one company's name; otherwise KeyError lists the candidates.
+        """
+        if is_cik(identifier):
+            return normalize_cik(identifier)
+        company = self.by_ticker(identifier)
+        if company is not None:
+            return company["cik"]
+        matches = self.by_name(identifier)
+        ciks = list(dict.fromkeys(c["cik"] for c in matches))
+        exact = [c["cik"] for c in matches if normalize_name(c["name"]) == normalize_name(identifier)]
+        if len(ciks) == 1 or len(set(exact)) == 1:
+            return exact[0] if exact else ciks[0]
+        if not ciks:
+            raise KeyError(f"No company with ticker or name {identifier!r}")
+        names = ", ".join(f"{c['ticker']} ({c['name']})" for c in matches[:5])
+        raise KeyError(f"{identifier!r} matches {len(ciks)} companies: {names}{', ...' if len(ciks) > 5 else ''}")
+
+
+# ==========================================
+# CACHED DOWNLOAD
+# ==========================================
+
+def meta_path(path):
+    return path[:-len(".json")] + ".meta.json" if path.endswith(".json") else path + ".meta.json"
+
+
+def load_ticker_file(path=TICKER_INDEX_PATH, ttl=TICKER_TTL_SECONDS, headers=None, refresh=False):
+    """
+    The decoded company_tickers.json, from disk while younger than ttl, otherwise revalidated
+    with SEC. If SEC cannot be reached a stale copy is used (with a warning).
+    """
+    try:
+        with open(meta_path(path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        meta = None
+    cached = meta is not None and os.path.exists(path)
+    if cached and not refresh and time.time() - meta.get("fetched_at", 0) < ttl:
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+
+    request_headers = dict(headers or HEADERS)
+    if cached and meta.get("etag"):
+        request_headers["If-None-Match"] = meta["etag"]
+    if cached and meta.get("last_modified"):
+        request_headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        response = requests.get(TICKERS_URL, headers=request_headers, timeout=60)
+        status = response.status_code
+    except requests.RequestException as e:
+        status, response = None, e
+    if status == 200:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        write_atomic(path, response.content)
+        meta = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+        log.info("Downloaded %s", TICKERS_URL)
+        data = response.json()
+    elif cached:
+        if status != 304:
+            log.warning("Ticker index refresh failed (%s), using the copy from %s", status or response, path)
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
+    else:
+        raise RuntimeError(f"Could not download {TICKERS_URL}: {status or response}")
+    meta["fetched_at"] = time.time()
+    write_atomic(meta_path(path), json.dumps(meta).encode("utf-8"))
+    return data
+
+
+_default_index = None
+
+
+def get_ticker_index(refresh=False):
+    """Process-wide TickerIndex over the cached ticker file."""
+    global _default_index
+    if _default_index is None or refresh:
+        _default_index = TickerIndex.from_sec(load_ticker_file(refresh=refresh))
+    return _default_index
+
+
+def resolve_cik(identifier, index=None):
+    """CIK for a CIK, ticker or company name; plain CIKs never load the index."""
+    if is_cik(identifier):
+        return normalize_cik(identifier)
+    return (index or get_ticker_index()).resolve(identifier)
+
+
+def resolve_many(identifiers, index=None):
+    """{identifier: CIK} for a batch (one index load at most); unresolvable ones are logged and left out."""
+    resolved = {}
+    for identifier in identifiers:
+        try:
+            resolved[identifier] = resolve_cik(identifier, index)
+        except KeyError as e:
+            log.warning("%s", e.args[0])
+    return resolved
+
+
+if __name__ == "__main__":
+    import sys
+    index = get_ticker_index(refresh="--refresh" in sys.argv)
+    print(f"{len(index)} tickers in {TICKER_INDEX_PATH}")
+    for identifier in (arg for arg in sys.argv[1:] if arg != "--refresh"):
+        try:
+            cik = index.resolve(identifier)
+            print(f"{identifier}: {cik} {[c['ticker'] for c in index.by_cik(cik)]}")
+        except KeyError as e:
+            print(f"{identifier}: {e.args[0]}")
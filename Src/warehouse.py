@@ -0,0 +1,315 @@
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from concept_index import CONCEPTS, concept_tags, document_version, get_concept_index
+from diagnostics import configure_logging, get_logger
+from edgar_cache import get_cache, normalize_cik
+from edgar_client import get_company_facts_path, load_company_facts
+from facts_stream import wanted_facts
+from MasterAnalysisFinal import run_master_analysis
+from profiling import configure_profiling, stage
+from settings import year_window
+from statement_engine import (STATEMENTS, load_statement_module, master_columns, records_to_statements,
+                              select_statements, statement_facts)
+from taxonomies import CURRENCY_COLUMN, CURRENCY_UNIT, PRIMARY_TAXONOMY, company_facts_view, with_currency
+
+log = get_logger("warehouse")
+
+# ==========================================
+# WAREHOUSE CONFIGURATION
+# ==========================================
+# Selected annual facts and the provenance they were chosen on, in one SQLite file,
+# one row per (cik, concept, fy). Concepts are the master-analysis columns
+# ("IS_Revenue", "BS_Total Assets", ...) and the canonical concept_index concepts
+# ("Revenue", "NetIncome", ...). Screening, peer comparison and the master analysis are
+# queries against this file; a company is only re-extracted when its companyfacts
+# document (same ETag-based version as the concept index) or the fiscal-year window changed.
+#
+#   python src/warehouse.py                  load CIKS into WAREHOUSE_PATH
+#   python src/cli.py NVDA AMD --warehouse warehouse.sqlite
+WAREHOUSE_PATH = os.environ.get("WAREHOUSE_PATH", "warehouse.sqlite")
+CIKS = ["0001045810", "0000002488"]   # companies `python src/warehouse.py` loads
+
+PROVENANCE_FIELDS = ("form", "fp", "frame", "qtrs", "start", "end", "duration_days", "score")
+FACT_COLUMNS = ("cik", "concept", "fy", "value", "statement", "category", "item", "taxonomy", "tag", "unit",
+                *PROVENANCE_FIELDS, "loaded_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annual_facts (
+    cik           TEXT    NOT NULL,
+    concept       TEXT    NOT NULL,
+    fy            INTEGER NOT NULL,
+    value         REAL,
+    statement     TEXT,
+    category      TEXT,
+    item          TEXT,
+    taxonomy      TEXT,
+    tag           TEXT,
+    unit          TEXT,
+    form          TEXT,
+    fp            TEXT,
+    frame         TEXT,
+    qtrs          INTEGER,
+    start         TEXT,
+    "end"         TEXT,
+    duration_days INTEGER,
+    score         TEXT,
+    loaded_at     REAL,
+    PRIMARY KEY (cik, concept, fy)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS annual_facts_concept_fy ON annual_facts (concept, fy, value);
+CREATE INDEX IF NOT EXISTS annual_facts_fy_cik ON annual_facts (fy, cik);
+CREATE TABLE IF NOT EXISTS companies (
+    cik              TEXT PRIMARY KEY,
+    name             TEXT,
+    currency         TEXT,
+    document_version TEXT,
+    year_window      TEXT,
+    loaded_at        REAL
+);
+"""
+COMPANY_COLUMNS = {"year_window": "TEXT"}   # added after the first release; older files get them on open
+
+UPSERT_FACT = (
+    "INSERT INTO annual_facts (" + ", ".join(f'"{c}"' for c in FACT_COLUMNS) + ") "
+    "VALUES (" + ", ".join("?" for _ in FACT_COLUMNS) + ") "
+    "ON CONFLICT (cik, concept, fy) DO UPDATE SET " + ", ".join(f'"{c}" = excluded."{c}"' for c in FACT_COLUMNS[3:])
+)
+UPSERT_COMPANY = (
+    "INSERT INTO companies (cik, name, currency, document_version, year_window, loaded_at) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (cik) DO UPDATE SET name = excluded.name, currency = excluded.currency, "
+    "document_version = excluded.document_version, year_window = excluded.year_window, loaded_at = excluded.loaded_at"
+)
+
+
+# ==========================================
+# ROWS
+# ==========================================
+
+def window_label(window=None):
+    """"2014-2025" for a (first, last) fiscal-year window (default: the current one)."""
+    first, last = window or year_window()
+    return f"{first}-{last}"
+
+
+def _row(cik, concept, year, info, statement, category, item, source, unit, loaded_at):
+    taxonomy, tag = source
+    provenance = [info.get(field) for field in PROVENANCE_FIELDS]
+    if provenance[-1] is not None:
+        provenance[-1] = json.dumps(list(provenance[-1]))
+    return (cik, concept, int(year), info["value"], statement, category, item, taxonomy, tag, unit,
+            *provenance, loaded_at)
+
+
+def _source(view, tag):
+    sources = getattr(view, "sources", {})
+    return sources.get(tag, (PRIMARY_TAXONOMY, tag))
+
+
+def _unit(view, unit):
+    """The reporting currency for the USD slot (TaxonomyView moves it there), else the unit itself."""
+    if unit == CURRENCY_UNIT:
+        return getattr(view, "currency", None) or unit
+    return unit
+
+
+def statement_rows(cik, selected, view=None, loaded_at=None):
+    """
+    annual_facts rows for statement_engine.select_statements output. For a label fed by
+    several tags the last tag in registry order wins, as in assemble_statements.
+    """
+    concepts = {(key, category, label): column for column, (key, category, label, _) in master_columns().items()}
+    rows = {}
+    for key, (_, tags_attr, _, _) in STATEMENTS.items():
+        for tag, (label, unit, category) in getattr(load_statement_module(key), tags_attr).items():
+            for year, info in (selected.get((key, tag)) or {}).items():
+                concept = concepts[(key, category, label)]
+                rows[(concept, year)] = _row(cik, concept, year, info, key, category, label,
+                                             _source(view, tag), _unit(view, unit), loaded_at)
+    return list(rows.values())
+
+
+def concept_rows(cik, resolved, view=None, loaded_at=None, concepts=CONCEPTS):
+    """annual_facts rows for concept_index.resolve_concepts output."""
+    rows = []
+    for concept, years in resolved.items():
+        statement, unit, _ = concepts[concept]
+        for year, info in years.items():
+            rows.append(_row(cik, concept, year, info, statement, None, None,
+                             _source(view, info.get("tag")), _unit(view, unit), loaded_at))
+    return rows
+
+
+# ==========================================
+# WAREHOUSE
+# ==========================================
+
+class Warehouse:
+    """
+    SQLite file of selected annual facts. store_company() upserts one company's selection
+    and drops the rows it no longer selects; the query helpers return DataFrames.
+    Safe to open from several processes (WAL journal, writers wait for the lock).
+    """
+
+    def __init__(self, path=WAREHOUSE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(companies)")}
+        for column, kind in COMPANY_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE companies ADD COLUMN {column} {kind}")
+
+    def close(self):
+        self.conn.close()
+
+    def version(self, cik):
+        """Document version the stored selection of this CIK was made from (None if not loaded)."""
+        return self.stamp(cik)[0]
+
+    def stamp(self, cik):
+        """(document version, year window label) the stored selection of this CIK was made with."""
+        row = self.conn.execute("SELECT document_version, year_window FROM companies WHERE cik = ?",
+                                (normalize_cik(cik),)).fetchone()
+        return tuple(row) if row else (None, None)
+
+    def store_company(self, cik, selected, resolved, view=None, version=None, name=None):
+        """Upsert one company's statement selections and concept resolutions (with provenance)."""
+        cik = normalize_cik(cik)
+        if version is None:
+            version = document_version(get_cache().load_meta(cik))
+        loaded_at = time.time()
+        rows = statement_rows(cik, selected, view, loaded_at) + concept_rows(cik, resolved, view, loaded_at)
+        with self.conn:
+            self.conn.executemany(UPSERT_FACT, rows)
+            self.conn.execute("DELETE FROM annual_facts WHERE cik = ? AND loaded_at < ?", (cik, loaded_at))
+            self.conn.execute(UPSERT_COMPANY, (cik, name, getattr(view, "currency", None), version,
+                                               window_label(), loaded_at))
+        log.info("Stored %d fact(s) for %s", len(rows), cik)
+        return len(rows)
+
+    def query(self, sql, params=()):
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def facts(self, ciks=None, concepts=None, years=None):
+        """Long frame of stored facts (every column, provenance included), optionally filtered."""
+        clauses, params = [], []
+        for column, values in (("cik", ciks and [normalize_cik(c) for c in ciks]), ("concept", concepts), ("fy", years)):
+            if values is not None:
+                values = list(values)
+                clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params += values
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.query(f"SELECT * FROM annual_facts{where} ORDER BY cik, concept, fy", params)
+
+    def currencies(self, ciks=None):
+        """{cik: reporting currency} of the stored companies."""
+        rows = self.query("SELECT cik, currency FROM companies")
+        wanted = None if ciks is None else {normalize_cik(c) for c in ciks}
+        return {cik: currency for cik, currency in rows.itertuples(index=False) if wanted is None or cik in wanted}
+
+    def panel(self, concepts, ciks=None, years=None):
+        """(CIK, Year) x concept frame of values, for peer comparison, led by each company's reporting Currency."""
+        facts = self.facts(ciks, concepts, years)
+        panel = facts.pivot_table(index=["cik", "fy"], columns="concept", values="value", aggfunc="first")
+        panel.index = panel.index.set_names(["CIK", "Year"])
+        panel.columns.name = None
+        return with_currency(panel.reindex(columns=list(concepts)).astype("float64"), self.currencies(ciks))
+
+    def screen(self, year, currency=None, **bounds):
+        """
+        Companies whose fiscal-year values fall inside every (low, high) bound (None = open):
+        screen(2024, Revenue=(1000, None), NetIncome=(0, None)). One row per CIK, its reporting
+        Currency and one column per concept. Bounds on amounts only make sense within one currency:
+        screen(2024, currency="USD", Revenue=(1000, None)) keeps the companies reporting in USD.
+        """
+        concepts = list(bounds)
+        columns = ", ".join(f'MAX(CASE WHEN concept = ? THEN value END) AS "{c}"' for c in concepts)
+        reporting = f"COALESCE(companies.currency, '{CURRENCY_UNIT}')"
+        having, params = [], list(concepts) + [year] + concepts
+        where = f"fy = ? AND concept IN ({', '.join('?' for _ in concepts)})"
+        if currency is not None:
+            where += f" AND {reporting} = ?"
+            params.append(currency)
+        for concept, (low, high) in bounds.items():
+            if low is not None:
+                having.append(f'"{concept}" >= ?')
+                params.append(low)
+            if high is not None:
+                having.append(f'"{concept}" <= ?')
+                params.append(high)
+            having.append(f'"{concept}" IS NOT NULL')
+        sql = (f'SELECT annual_facts.cik AS cik, {reporting} AS "{CURRENCY_COLUMN}", {columns} '
+               f"FROM annual_facts LEFT JOIN companies ON companies.cik = annual_facts.cik "
+               f"WHERE {where} GROUP BY annual_facts.cik HAVING {' AND '.join(having)} ORDER BY annual_facts.cik")
+        return self.query(sql, params).set_index("cik")
+
+    def statements(self, cik):
+        """Stored statement selections back as {"IS": ..., "BS": ..., "CF": ...} statement dicts."""
+        rows = self.conn.execute(
+            "SELECT cik, statement, category, item, fy, value FROM annual_facts "
+            "WHERE cik = ? AND item IS NOT NULL ORDER BY statement, fy", (normalize_cik(cik),))
+        return records_to_statements(rows.fetchall())
+
+    def concepts(self, cik, concepts=CONCEPTS):
+        """Stored concept resolutions as {concept: {year: {"value", "tag"}}}."""
+        resolved = {concept: {} for concept in concepts}
+        rows = self.conn.execute(
+            "SELECT concept, fy, value, tag FROM annual_facts WHERE cik = ? AND item IS NULL ORDER BY fy",
+            (normalize_cik(cik),))
+        for concept, year, value, tag in rows:
+            if concept in resolved:
+                resolved[concept][year] = {"value": value, "tag": tag}
+        return resolved
+
+    def master_frame(self, cik):
+        """MasterAnalysisFinal's frame (with ratios) for a stored company, without touching its JSON."""
+        return run_master_analysis(normalize_cik(cik), self.statements(cik), self.concepts(cik))
+
+
+_default_warehouses = {}
+
+
+def get_warehouse(path=WAREHOUSE_PATH):
+    """Process-wide Warehouse per file."""
+    if path not in _default_warehouses:
+        _default_warehouses[path] = Warehouse(path)
+    return _default_warehouses[path]
+
+
+def load_company(cik, warehouse=None, headers=None, force=False):
+    """
+    Extract one company into the warehouse unless its stored selection was made from the
+    current companyfacts document under the current year window. Returns True if it was (re)loaded.
+    """
+    warehouse = warehouse or get_warehouse()
+    cik = normalize_cik(cik)
+    path = get_company_facts_path(cik, headers)
+    if path is None:
+        log.warning("No companyfacts for %s", cik)
+        return False
+    version = document_version(get_cache(headers).load_meta(cik))
+    if not force and version is not None and warehouse.stamp(cik) == (version, window_label()):
+        log.debug("Warehouse up to date for %s (%s, %s)", cik, version, window_label())
+        return False
+    data = load_company_facts(path, cik, statement_facts() | wanted_facts(concept_tags()))
+    view = company_facts_view(data)
+    selected = select_statements(view, cik)
+    resolved = get_concept_index().resolve(view, cik, version)
+    with stage("store", cik) as s:
+        s["items"] = warehouse.store_company(cik, selected, resolved, view, version, data.get("entityName"))
+    return True
+
+
+if __name__ == "__main__":
+    configure_logging()
+    configure_profiling()
+    warehouse = get_warehouse()
+    loaded = sum(load_company(cik, warehouse) for cik in CIKS)
+    count, = warehouse.conn.execute("SELECT COUNT(*) FROM annual_facts").fetchone()
+    print(f"{loaded}/{len(CIKS)} companies (re)loaded; {count} facts in {WAREHOUSE_PATH}")
@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Src")
+sys.path.insert(0, SRC_DIR)
+
+# Keep the suite off the user's real caches (read at import time by edgar_cache / concept_index)
+_scratch = tempfile.mkdtemp(prefix="fae-tests-")
+os.environ.setdefault("EDGAR_CACHE_DIR", os.path.join(_scratch, "companyfacts"))
+os.environ.setdefault("CONCEPT_CACHE_DIR", os.path.join(_scratch, "concepts"))
+
+
+@pytest.fixture
+def set_year_window():
+    """settings.set_year_window, with the window restored after the test."""
+    import settings
+    window = settings.year_window()
+    yield settings.set_year_window
+    settings.set_year_window(*window)
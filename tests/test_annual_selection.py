@@ -0,0 +1,110 @@
+import pytest
+
+from annual_selection import compare_with_reference, extract_statements_from_document
+from synthetic_facts import make_company_facts
+
+REVENUE = ("IS", "Revenues", "Total Net Revenues", "Revenues")
+ASSETS = ("BS", "Total Assets", "Total assets", "Assets")
+IMPAIRMENT = ("CF", "Operating Cash Flow", "Impairment of long-lived assets", "ImpairmentOfLongLivedAssetsHeldForUse")
+
+
+def fact(val, end, fy, start=None, fp="FY", form="10-K", frame=None, **extra):
+    entry = {"val": val, "end": end, "fy": fy, "fp": fp, "form": form,
+             "filed": extra.pop("filed", f"{end[:4]}-03-01"), "accn": extra.pop("accn", f"0000000001-{end[2:4]}-000001")}
+    if start is not None:
+        entry["start"] = start
+    if frame is not None:
+        entry["frame"] = frame
+    entry.update(extra)
+    return entry
+
+
+def document(*items):
+    """companyfacts document with (item, [entries]) pairs, item being one of the line-item tuples above."""
+    gaap = {}
+    for (_, _, _, tag), entries in items:
+        gaap.setdefault(tag, {"label": tag, "description": "", "units": {"USD": []}})["units"]["USD"].extend(entries)
+    return {"cik": 1, "entityName": "Fixture Co", "facts": {"us-gaap": gaap}}
+
+
+def selected(data, item):
+    """The batched selection's {year: value} for one line item; also asserts parity with the per-entry rules."""
+    assert compare_with_reference(data) == []
+    key, category, label, _ = item
+    return extract_statements_from_document(data)[key].get(category, {}).get(label, {})
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_synthetic_documents_match_reference(seed):
+    assert compare_with_reference(make_company_facts(cik=seed + 1, seed=seed)) == []
+
+
+@pytest.mark.parametrize("item", [REVENUE, IMPAIRMENT])
+def test_amended_filing_ties_keep_document_order(item):
+    original = fact(100e6, "2023-01-31", 2023, start="2022-02-01", frame="CY2022", form="10-K")
+    amended = fact(120e6, "2023-01-31", 2023, start="2022-02-01", frame="CY2022", form="10-K/A",
+                   filed="2023-09-01", accn="0000000001-23-000099")
+    assert set(selected(document((item, [original, amended])), item).values()) == {100.0}
+    assert set(selected(document((item, [amended, original])), item).values()) == {120.0}
+
+
+def test_amended_annual_form_beats_quarterly_report():
+    quarterly = fact(30e6, "2023-12-31", 2023, start="2023-01-01", fp="Q4", form="10-Q")
+    amended = fact(110e6, "2023-12-31", 2023, start="2023-01-01", fp="FY", form="10-K/A")
+    assert selected(document((REVENUE, [quarterly, amended])), REVENUE) == {2023: 110.0}
+
+
+def test_balance_sheet_amendment_with_longer_period_wins():
+    instant = fact(500e6, "2023-12-31", 2023, form="10-K")
+    amended = fact(520e6, "2023-12-31", 2023, start="2023-01-01", form="10-K/A")
+    assert selected(document((ASSETS, [instant, amended])), ASSETS) == {2023: 520.0}
+
+
+def test_fiscal_year_mismatch_drops_comparatives_from_balance_sheet_and_cash_flow():
+    # the prior year's figure repeated in the next 10-K carries the later fy
+    current = fact(400e6, "2023-12-31", 2023, start="2023-01-01")
+    comparative = fact(390e6, "2023-12-31", 2024, start="2023-01-01", accn="0000000001-24-000001")
+    for item in (ASSETS, IMPAIRMENT):
+        assert selected(document((item, [comparative, current])), item) == {2023: 400.0}
+        assert selected(document((item, [comparative])), item) == {}
+
+
+def test_fiscal_year_mismatch_income_uses_period_year():
+    # fiscal year 2024 ending in January: the income rule keys the fact by end (or frame) year
+    entry = fact(60e6, "2024-01-28", 2023, start="2023-01-30")
+    assert selected(document((REVENUE, [entry])), REVENUE) == {2024: 60.0}
+    framed = fact(60e6, "2024-01-28", 2023, start="2023-01-30", frame="CY2023")
+    assert selected(document((REVENUE, [framed])), REVENUE) == {2023: 60.0}
+    assert selected(document((ASSETS, [entry])), ASSETS) == {}
+
+
+def test_missing_fy_falls_back_to_end_year():
+    entry = fact(700e6, "2022-12-31", None, start="2022-01-01")
+    assert selected(document((ASSETS, [entry])), ASSETS) == {2022: 700.0}
+
+
+def test_duplicate_frames_prefer_full_year_facts():
+    partial = fact(10e6, "2023-03-31", 2023, start="2023-01-01", fp="Q1", form="10-Q", frame="CY2023")
+    full = fact(80e6, "2023-12-31", 2023, start="2023-01-01", frame="CY2023")
+    assert selected(document((REVENUE, [partial, full])), REVENUE) == {2023: 80.0}
+
+
+def test_duplicate_frames_same_score_keep_first():
+    first = fact(80e6, "2023-12-31", 2023, start="2023-01-01", frame="CY2023")
+    restated = fact(82e6, "2023-12-31", 2024, start="2023-01-01", frame="CY2023", accn="0000000001-24-000002")
+    assert selected(document((REVENUE, [first, restated])), REVENUE) == {2023: 80.0}
+    assert selected(document((REVENUE, [restated, first])), REVENUE) == {2023: 82.0}
+
+
+def test_duplicate_frames_longer_duration_wins():
+    short = fact(70e6, "2023-12-31", 2023, start="2023-02-01", frame="CY2023")
+    full = fact(80e6, "2023-12-31", 2023, start="2023-01-01", frame="CY2023")
+    assert selected(document((REVENUE, [short, full])), REVENUE) == {2023: 80.0}
+
+
+def test_qtrs_rules():
+    bad_qtrs = fact(90e6, "2023-12-31", 2023, start="2023-01-01", qtrs=1)
+    good_qtrs = fact(95e6, "2023-12-31", 2023, start="2023-01-01", qtrs="4", accn="0000000001-23-000003")
+    assert selected(document((IMPAIRMENT, [bad_qtrs, good_qtrs])), IMPAIRMENT) == {2023: 95.0}
+    short_no_qtrs = fact(20e6, "2023-12-31", 2023, start="2023-10-01")
+    assert selected(document((IMPAIRMENT, [short_no_qtrs])), IMPAIRMENT) == {}
@@ -0,0 +1,72 @@
+import benchmark
+
+
+def measurement(facts_per_second, peak_bytes, facts=1000):
+    return {"seconds": facts / facts_per_second, "facts": facts, "companies": 1, "facts_per_second": facts_per_second,
+            "companies_per_minute": 60 * facts_per_second / facts, "peak_bytes": peak_bytes}
+
+
+def test_check_mode_without_baseline_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(benchmark, "run_benchmarks", lambda: {})
+    missing = tmp_path / "baseline.json"
+    assert benchmark.main(["--baseline", str(missing)]) == 2
+    assert not missing.exists()
+
+
+def test_only_update_writes_the_baseline(tmp_path, monkeypatch):
+    results = {"set": {"case": measurement(100.0, 10)}}
+    monkeypatch.setattr(benchmark, "run_benchmarks", lambda: results)
+    path = tmp_path / "baseline.json"
+    assert benchmark.main(["--update", "--baseline", str(path)]) == 0
+    assert benchmark.load_baseline(str(path))["results"] == results
+    assert benchmark.main(["--baseline", str(path)]) == 0
+
+
+def test_committed_baseline_covers_the_fixtures():
+    baseline = benchmark.load_baseline()
+    assert baseline is not None
+    assert "fixtures" in baseline["results"]
+    assert len(benchmark.load_fixtures()) > 0
+
+
+def test_regressions():
+    baseline = {"results": {"set": {"fast": measurement(100.0, 10), "small": measurement(100.0, 10),
+                                    "changed": measurement(100.0, 10, facts=999)}}}
+    results = {"set": {"fast": measurement(40.0, 10), "small": measurement(100.0, 20),
+                       "changed": measurement(100.0, 10), "new": measurement(1.0, 10)}}
+    regressions = benchmark.compare_with_baseline(results, baseline)
+    assert [line.split(":")[0] for line in regressions] == ["set / fast", "set / small", "set / changed"]
+
+
+
+def work(n):
+    def run():
+        sum(i * i for i in range(n))
+    return run
+
+
+def test_compare_flags_a_real_slowdown_and_not_noise():
+    baseline = {"results": {"set": {"case": benchmark.measure(work(20_000), 1000, 1, repeat=3)}}}
+    slower = {"set": {"case": benchmark.measure(work(100_000), 1000, 1, repeat=3)}}   # 5x the work per fact
+    assert [line.split(":")[0] for line in benchmark.compare_with_baseline(slower, baseline)] == ["set / case"]
+
+    then = baseline["results"]["set"]["case"]
+    for factor in (0.65, 0.8, 1.2, 1.4):   # run-to-run spread seen on a shared single-CPU machine
+        noisy = {"set": {"case": measurement(then["facts_per_second"] * factor, then["peak_bytes"])}}
+        assert benchmark.compare_with_baseline(noisy, baseline) == []
+
+
+def test_slow_cases_are_remeasured_before_they_count(monkeypatch):
+    baseline = {"results": {"set": {"noisy": measurement(100.0, 10), "slow": measurement(100.0, 10),
+                                    "fine": measurement(100.0, 10)}}}
+    results = {"set": {"noisy": measurement(30.0, 10), "slow": measurement(30.0, 10), "fine": measurement(90.0, 10)}}
+    remeasured = []
+
+    def rerun(only):
+        remeasured.append(only)
+        return {"set": {"noisy": measurement(95.0, 10), "slow": measurement(35.0, 10)}}
+    monkeypatch.setattr(benchmark, "run_benchmarks", rerun)
+    results = benchmark.confirm_slow_cases(results, baseline)
+    assert remeasured == [{"set": ["noisy", "slow"]}, {"set": ["slow"]}]
+    assert results["set"]["noisy"]["facts_per_second"] == 95.0
+    assert [line.split(":")[0] for line in benchmark.compare_with_baseline(results, baseline)] == ["set / slow"]
@@ -0,0 +1,66 @@
+import json
+import zipfile
+
+import pandas as pd
+import pytest
+
+import bulk_universe
+from bulk_universe import _extract_batch_safe, init_worker, list_archive_members, open_archive, run_universe
+from statement_engine import extract_all_statements, statement_records
+from synthetic_facts import make_company_facts
+from taxonomies import company_facts_view
+
+CIKS = ["0000000001", "0000000002", "0000000003"]
+CORRUPT = "0000000004"
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """companyfacts.zip with three synthetic companies and one truncated member."""
+    path = str(tmp_path / "companyfacts.zip")
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, cik in enumerate(CIKS):
+            zf.writestr(f"CIK{cik}.json", json.dumps(make_company_facts(cik=int(cik), seed=i)))
+        zf.writestr(f"CIK{CORRUPT}.json", json.dumps(make_company_facts(cik=4, seed=9))[:5000])
+        zf.writestr("README.txt", "not a company")
+    yield path
+    init_worker()   # drop the cached handle to this archive
+
+
+def expected_records():
+    rows = []
+    for i, cik in enumerate(CIKS):
+        statements = extract_all_statements(company_facts_view(make_company_facts(cik=int(cik), seed=i)), cik)
+        rows.extend(statement_records(cik, statements))
+    return pd.DataFrame(rows, columns=["CIK", "Statement", "Category", "Item", "Year", "Value"])
+
+
+def test_members_are_listed_without_other_files(archive):
+    assert [cik for cik, _ in list_archive_members(archive)] == CIKS + [CORRUPT]
+    assert list_archive_members(archive, ["1", "3"]) == [("0000000001", "CIK0000000001.json"),
+                                                         ("0000000003", "CIK0000000003.json")]
+
+
+def test_corrupt_member_does_not_fail_its_batch(archive):
+    results, _ = _extract_batch_safe((archive, list_archive_members(archive)))
+    assert [cik for cik, statements in results if statements is not None] == CIKS
+    assert dict(results)[CORRUPT] is None
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_universe_output_matches_per_company_extraction(archive, tmp_path, suffix):
+    output = str(tmp_path / f"UNIVERSE_STATEMENTS{suffix}")
+    df = run_universe(archive, workers=1, output_file=output)
+    expected = expected_records()
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), expected)
+    written = pd.read_csv(output, dtype={"CIK": str}) if suffix == ".csv" else pd.read_parquet(output)
+    pd.testing.assert_frame_equal(written, expected, check_dtype=False)
+
+
+def test_worker_pool_reads_the_archive_once_per_worker(archive, tmp_path):
+    assert open_archive(archive) is open_archive(archive)
+    init_worker()
+    assert archive not in bulk_universe._archives
+    single = run_universe(archive, workers=1, output_file=None)
+    pooled = run_universe(archive, workers=2, output_file=None)
+    pd.testing.assert_frame_equal(pooled.reset_index(drop=True), single.reset_index(drop=True))
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from charts import CHARTS, REVENUE, chart_path, load_manifest, render_charts
+from concept_index import resolve_concepts
+from MasterAnalysisFinal import build_master_frame
+from ratio_engine import add_ratios
+from statement_engine import extract_all_statements
+from synthetic_facts import make_company_facts
+from taxonomies import company_facts_view
+
+CIK = "0000000001"
+
+
+@pytest.fixture
+def frame():
+    view = company_facts_view(make_company_facts(cik=1, seed=4))
+    return add_ratios(build_master_frame(extract_all_statements(view), resolve_concepts(view)))
+
+
+def render(frame, chart_dir, **options):
+    return render_charts({CIK: frame}, chart_dir=str(chart_dir), workers=1, **options)[CIK]
+
+
+def test_unchanged_data_is_not_redrawn(frame, tmp_path):
+    assert render(frame, tmp_path) == {chart: "rendered" for chart in CHARTS}
+    assert set(load_manifest(str(tmp_path), CIK)) == set(CHARTS)
+    drawn = {chart: os.path.getmtime(chart_path(str(tmp_path), CIK, chart)) for chart in CHARTS}
+
+    assert render(frame, tmp_path) == {chart: "unchanged" for chart in CHARTS}
+    assert {chart: os.path.getmtime(chart_path(str(tmp_path), CIK, chart)) for chart in CHARTS} == drawn
+
+    changed = frame.copy()
+    changed.loc[changed.index[-1], REVENUE] = changed[REVENUE].iloc[-1] + 1
+    status = render(changed, tmp_path)
+    assert status.pop("revenue_margin") == "rendered"
+    assert set(status.values()) == {"unchanged"}
+
+
+def test_missing_file_or_force_redraws(frame, tmp_path):
+    render(frame, tmp_path)
+    os.remove(chart_path(str(tmp_path), CIK, "fcf_trend"))
+    status = render(frame, tmp_path)
+    assert status.pop("fcf_trend") == "rendered"
+    assert set(status.values()) == {"unchanged"}
+    assert render(frame, tmp_path, force=True) == {chart: "rendered" for chart in CHARTS}
+
+
+def test_chart_without_data_is_skipped(frame, tmp_path):
+    status = render(frame.drop(columns=CHARTS["fcf_trend"][1]), tmp_path)
+    assert "fcf_trend" not in status
+    assert not os.path.exists(chart_path(str(tmp_path), CIK, "fcf_trend"))
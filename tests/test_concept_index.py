@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import concept_index
+from edgar_cache import get_cache
+from MasterAnalysisFinal import extract_company
+from synthetic_facts import make_company_facts
+from warehouse import Warehouse, load_company
+
+
+@pytest.fixture
+def resolutions(monkeypatch):
+    """Counts the concept resolutions actually computed (cache misses)."""
+    calls = []
+    resolve = concept_index.resolve_concepts
+
+    def counting(xbrl_data, concepts=concept_index.CONCEPTS):
+        calls.append(1)
+        return resolve(xbrl_data, concepts)
+    monkeypatch.setattr(concept_index, "resolve_concepts", counting)
+    return calls
+
+
+def cache_document(cik, etag):
+    get_cache().store(cik, json.dumps(make_company_facts(cik=cik, seed=cik)).encode(), {"ETag": etag})
+
+
+def test_extract_company_resolves_through_the_index(resolutions):
+    cache_document(501, '"v1"')
+    first = extract_company(501)[1]
+    assert extract_company(501)[1] == first
+    assert len(resolutions) == 1
+    cache_document(501, '"v2"')
+    extract_company(501)
+    assert len(resolutions) == 2
+
+
+def test_warehouse_load_resolves_through_the_index(resolutions, tmp_path):
+    cache_document(502, '"v1"')
+    extract_company(502)
+    warehouse = Warehouse(str(tmp_path / "w.sqlite"))
+    assert load_company(502, warehouse)
+    assert len(resolutions) == 1
+    assert warehouse.concepts(502)["Revenue"]
+    warehouse.close()
+
+
+def test_changed_year_window_misses_the_cache(resolutions, set_year_window):
+    cache_document(503, '"v1"')
+    assert set(concept_index.concepts_for_cik(503)["Revenue"]) - {2020, 2021}
+    set_year_window(2020, 2021)
+    assert set(concept_index.concepts_for_cik(503)["Revenue"]) <= {2020, 2021}
+    assert len(resolutions) == 2
+    fresh = concept_index.ConceptIndex()   # reads the disk cache
+    assert set(concept_index.concepts_for_cik(503, index=fresh)["Revenue"]) <= {2020, 2021}
+    assert len(resolutions) == 2
+
+
+def test_warehouse_reloads_on_a_changed_year_window(set_year_window, tmp_path):
+    cache_document(504, '"v1"')
+    warehouse = Warehouse(str(tmp_path / "w.sqlite"))
+    assert load_company(504, warehouse)
+    assert not load_company(504, warehouse)
+    set_year_window(2020, 2021)
+    assert load_company(504, warehouse)
+    assert set(warehouse.facts([504])["fy"]) <= {2020, 2021}
+    assert not load_company(504, warehouse)
+    warehouse.close()
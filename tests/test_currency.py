@@ -0,0 +1,50 @@
+import pandas as pd
+
+from concept_index import resolve_concepts, universe_master_panel
+from fact_store import flatten_company_facts
+from peer_panel import percentile_ranks
+from ratio_engine import RATIOS
+from statement_engine import select_statements
+from synthetic_facts import make_company_facts
+from taxonomies import company_facts_view
+from warehouse import Warehouse
+
+
+def documents():
+    """Three synthetic filers; the second reports in EUR."""
+    docs = {cik: make_company_facts(cik=cik, seed=cik) for cik in (1, 2, 3)}
+    for concept in docs[2]["facts"]["us-gaap"].values():
+        concept["units"] = {("EUR" if unit == "USD" else unit): entries for unit, entries in concept["units"].items()}
+    return docs
+
+
+def test_universe_panel_carries_reporting_currency():
+    facts = pd.concat([flatten_company_facts(data, cik) for cik, data in documents().items()], ignore_index=True)
+    for column in ("taxonomy", "tag", "unit", "fp", "form", "frame", "qtrs"):
+        facts[column] = facts[column].astype(str).astype("category")
+    panel = universe_master_panel(facts)
+    assert panel.columns[0] == "Currency"
+    assert panel["Currency"].groupby(level="CIK").unique().map(list).to_dict() == {
+        "0000000001": ["USD"], "0000000002": ["EUR"], "0000000003": ["USD"]}
+
+
+def test_warehouse_panel_and_screen_carry_currency(tmp_path):
+    w = Warehouse(str(tmp_path / "w.sqlite"))
+    for cik, data in documents().items():
+        view = company_facts_view(data)
+        w.store_company(cik, select_statements(view, cik), resolve_concepts(view), view, version="v1")
+    panel = w.panel(["Revenue"], years=[2020])
+    assert panel["Currency"].tolist() == ["USD", "EUR", "USD"]
+    assert w.screen(2020, Revenue=(None, None))["Currency"].to_dict() == {
+        "0000000001": "USD", "0000000002": "EUR", "0000000003": "USD"}
+    assert w.screen(2020, currency="EUR", Revenue=(None, None)).index.tolist() == ["0000000002"]
+    w.close()
+
+
+def test_money_ratios_rank_within_currency():
+    index = pd.MultiIndex.from_product([["A", "B", "C"], [2024]], names=["CIK", "CalendarYear"])
+    panel = pd.DataFrame({"Currency": ["USD", "JPY", "USD"], "Calc_FCF": [10.0, 5000.0, 20.0],
+                          "Calc_Net_Margin": [0.1, 0.3, 0.2]}, index=index)
+    ranks = percentile_ranks(panel, {name: RATIOS[name] for name in ("Calc_FCF", "Calc_Net_Margin")})
+    assert ranks["Calc_FCF"].tolist() == [0.5, 1.0, 1.0]
+    assert ranks["Calc_Net_Margin"].tolist() == [1 / 3, 1.0, 2 / 3]
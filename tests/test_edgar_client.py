@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import edgar_client
+from edgar_cache import CompanyFactsCache
+from edgar_client import AsyncEdgarClient, TokenBucket
+from facts_stream import wanted_facts
+
+CIK = "0000000001"
+DOCUMENT = {
+    "cik": 1,
+    "entityName": "Stub Corp",
+    "facts": {"us-gaap": {
+        "Revenues": {"units": {"USD": [{"val": 1, "fy": 2024, "fp": "FY", "form": "10-K"}]}},
+        "Unused": {"units": {"USD": [{"val": 2, "fy": 2024, "fp": "FY", "form": "10-K"}]}},
+    }},
+}
+
+
+class StubSEC:
+    """Local data.sec.gov stand-in: replies with a scripted list of statuses, records every request."""
+
+    def __init__(self, statuses=(200,), etag='"v1"', retry_after=None, chunk_delay=None):
+        self.statuses = list(statuses)
+        self.etag = etag
+        self.retry_after = retry_after
+        self.chunk_delay = chunk_delay
+        self.requests = []
+        self.peers = []
+
+    async def companyfacts(self, request):
+        self.requests.append(request)
+        self.peers.append(request.transport.get_extra_info("peername"))
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        if status == 200 and request.headers.get("If-None-Match") == self.etag:
+            return web.Response(status=304)
+        if status != 200:
+            headers = {"Retry-After": self.retry_after} if self.retry_after else {}
+            return web.Response(status=status, headers=headers)
+        body = json.dumps(DOCUMENT).encode()
+        if self.chunk_delay is None:
+            return web.Response(body=body, content_type="application/json", headers={"ETag": self.etag})
+        # Trickle the body out so concurrent downloads overlap
+        response = web.StreamResponse(headers={"ETag": self.etag, "Content-Type": "application/json"})
+        await response.prepare(request)
+        for i in range(0, len(body), 16):
+            await response.write(body[i:i + 16])
+            await asyncio.sleep(self.chunk_delay)
+        await response.write_eof()
+        return response
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/api/xbrl/companyfacts/CIK{cik}.json", self.companyfacts)
+        return app
+
+
+def run(stub, tmp_path, scenario, **client_options):
+    """Start the stub server, run scenario(client, cache) against it, return its result."""
+    async def main():
+        server = TestServer(stub.app())
+        await server.start_server()
+        try:
+            base_url = str(server.make_url("")).rstrip("/")
+            cache = CompanyFactsCache(cache_dir=str(tmp_path), base_url=base_url, ttl=0)
+            async with AsyncEdgarClient(headers={"User-Agent": "tests"}, base_url=base_url, cache=cache,
+                                        **client_options) as client:
+                return await scenario(client, cache)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+@contextmanager
+def serving(stub):
+    """The stub server on a background thread, for the synchronous wrappers; yields its base URL."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = TestServer(stub.app())
+    asyncio.run_coroutine_threadsafe(server.start_server(), loop).result()
+    try:
+        yield str(server.make_url("")).rstrip("/")
+    finally:
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(edgar_client, "BACKOFF_BASE_SECONDS", 0.001)
+
+
+def test_retries_429_and_5xx_then_succeeds(tmp_path):
+    stub = StubSEC(statuses=[429, 503, 200], retry_after="0")
+    path = run(stub, tmp_path, lambda client, cache: client.get_company_facts_path(CIK))
+    assert len(stub.requests) == 3
+    with open(path, "rb") as f:
+        assert json.load(f) == DOCUMENT
+
+
+def test_gives_up_after_max_retries(tmp_path):
+    stub = StubSEC(statuses=[500])
+    path = run(stub, tmp_path, lambda client, cache: client.get_company_facts_path(CIK), max_retries=2)
+    assert path is None
+    assert len(stub.requests) == 3
+
+
+def test_retry_after_is_a_floor():
+    assert edgar_client.backoff_delay(0, "1.5") >= 1.5
+    assert edgar_client.backoff_delay(0, "not a number") <= edgar_client.BACKOFF_BASE_SECONDS
+
+
+def test_token_bucket_throttles():
+    async def acquire_all():
+        bucket = TokenBucket(rate=50, capacity=1)
+        start = time.monotonic()
+        for _ in range(11):
+            await bucket.acquire()
+        return time.monotonic() - start
+    # One token up front, then one every 1/50 s
+    assert asyncio.run(acquire_all()) >= 10 / 50 * 0.9
+
+
+def test_conditional_request_uses_etag_and_keeps_the_copy(tmp_path):
+    stub = StubSEC()
+
+    async def scenario(client, cache):
+        first = await client.get_company_facts_path(CIK)
+        fetched_at = cache.load_meta(CIK)["fetched_at"]
+        second = await client.get_company_facts_path(CIK, revalidate=True)
+        return first, second, fetched_at, cache.load_meta(CIK)["fetched_at"]
+
+    first, second, fetched_at, refetched_at = run(stub, tmp_path, scenario)
+    assert first == second
+    assert stub.requests[1].headers["If-None-Match"] == '"v1"'
+    assert refetched_at >= fetched_at
+    with open(second, "rb") as f:
+        assert json.load(f) == DOCUMENT
+
+
+def test_stale_cache_served_when_sec_fails(tmp_path):
+    stub = StubSEC(statuses=[200, 503])
+
+    async def scenario(client, cache):
+        await client.get_company_facts_path(CIK)
+        return await client.get_company_facts(CIK, revalidate=True, wanted=wanted_facts(["Revenues"]))
+
+    data = run(stub, tmp_path, scenario, max_retries=1)
+    assert len(stub.requests) == 3
+    assert list(data["facts"]["us-gaap"]) == ["Revenues"]
+
+
+def test_streamed_download_is_pruned_and_cached(tmp_path):
+    stub = StubSEC()
+
+    async def scenario(client, cache):
+        data = await client.get_company_facts(CIK, wanted=wanted_facts(["Revenues"]))
+        return data, cache.data_path(CIK)
+
+    data, path = run(stub, tmp_path, scenario)
+    assert list(data["facts"]["us-gaap"]) == ["Revenues"]
+    with open(path, "rb") as f:
+        assert json.load(f) == DOCUMENT
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+
+def test_concurrent_downloads_of_one_cik_do_not_collide(tmp_path):
+    stub = StubSEC(chunk_delay=0.001)
+
+    async def scenario(client, cache):
+        wanted = wanted_facts(["Revenues"])
+        documents = await asyncio.gather(*(client.get_company_facts(CIK, wanted=wanted) for _ in range(3)))
+        return documents, cache.data_path(CIK)
+
+    documents, path = run(stub, tmp_path, scenario)
+    for data in documents:
+        assert list(data["facts"]["us-gaap"]) == ["Revenues"]
+    assert len(stub.requests) == 3
+    with open(path, "rb") as f:
+        assert json.load(f) == DOCUMENT
+    assert not [name for name in os.listdir(tmp_path) if ".tmp" in name]
+
+
+def test_fetch_many_fetches_a_repeated_cik_once(tmp_path):
+    stub = StubSEC()
+    result = run(stub, tmp_path, lambda client, cache: client.fetch_many([CIK, CIK], decode=False))
+    assert list(result) == [CIK]
+    assert len(stub.requests) == 1
+
+
+def test_sync_calls_share_one_session_and_rate_limit(tmp_path, monkeypatch):
+    stub = StubSEC()
+    monkeypatch.setattr(edgar_client, "MAX_REQUESTS_PER_SECOND", 2)   # a burst of two, then one every 0.5 s
+    edgar_client.close_sync_clients()
+    with serving(stub) as base_url:
+        cache = CompanyFactsCache(cache_dir=str(tmp_path), base_url=base_url, ttl=0)
+        monkeypatch.setattr(edgar_client, "get_cache", lambda headers=None: cache)
+        start = time.monotonic()
+        try:
+            assert edgar_client.get_company_facts_path(CIK) == cache.data_path(CIK)
+            assert edgar_client.get_company_facts(CIK, wanted=wanted_facts(["Revenues"]))["entityName"] == "Stub Corp"
+            assert edgar_client.get_company_facts_path(CIK) == cache.data_path(CIK)
+            elapsed = time.monotonic() - start
+        finally:
+            edgar_client.close_sync_clients()
+    assert len(stub.requests) == 3
+    assert len(set(stub.peers)) == 1          # one pooled connection across the three calls
+    assert elapsed >= 0.5 * 0.9               # the third call waited for the shared bucket
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from fact_store import flatten_company_facts, read_fact_store, write_fact_store
+from MasterAnalysisFinal import run_master_analysis
+from concept_index import resolve_concepts
+from statement_engine import assemble_statements, select_statements
+from synthetic_facts import make_company_facts
+from taxonomies import company_facts_view
+
+
+@pytest.fixture
+def store(tmp_path):
+    documents = {seed + 1: make_company_facts(cik=seed + 1, seed=seed) for seed in range(4)}
+    for cik, data in documents.items():
+        write_fact_store(flatten_company_facts(data, cik), tmp_path)
+    return tmp_path, documents
+
+
+def test_partitions_round_trip(store):
+    root, documents = store
+    facts = read_fact_store(root, ciks=[2])
+    assert set(facts["cik"]) == {"0000000002"}
+    assert len(facts) == len(flatten_company_facts(documents[2], 2))
+
+
+def test_master_frame_from_store_matches_document_path(store):
+    root, documents = store
+    for cik, data in documents.items():
+        view = company_facts_view(data)
+        expected = run_master_analysis(cik, assemble_statements(select_statements(view, cik)), resolve_concepts(view))
+        pd.testing.assert_frame_equal(run_master_analysis(cik, fact_store=root), expected, check_dtype=False)
+
+
+def test_missing_partition_is_an_error(store):
+    root, _ = store
+    with pytest.raises(ValueError):
+        run_master_analysis(99, fact_store=root)
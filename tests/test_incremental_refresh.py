@@ -0,0 +1,130 @@
+import asyncio
+import copy
+
+import pandas as pd
+import pytest
+
+from incremental_refresh import dataset_path, load_watermark, refresh_company
+
+CIK = "0000000001"
+
+
+def revenue(val, year, accn):
+    return {"val": val, "start": f"{year}-01-01", "end": f"{year}-12-31", "fy": year, "fp": "FY",
+            "form": "10-K", "frame": f"CY{year}", "filed": f"{year + 1}-02-20", "accn": accn}
+
+
+class FakeClient:
+    """Stands in for AsyncEdgarClient: a submissions index and a companyfacts document that can lag it."""
+
+    def __init__(self):
+        self.filings = []
+        self.entries = []
+
+    def file(self, accn, year, with_facts=True, val=None):
+        self.filings.append((accn, f"{year + 1}-02-20", "10-K"))
+        if with_facts:
+            self.publish(accn, year, val)
+
+    def publish(self, accn, year, val=None):
+        self.entries.append(revenue(val or year * 1_000_000, year, accn))
+
+    async def get_submissions(self, cik):
+        accns, dates, forms = zip(*self.filings) if self.filings else ((), (), ())
+        return {"filings": {"recent": {"accessionNumber": list(accns), "filingDate": list(dates), "form": list(forms)}}}
+
+    async def get_company_facts(self, cik, revalidate=False, wanted=None):
+        if not self.entries:
+            return {}
+        return {"cik": 1, "facts": {"us-gaap": {"Revenues": {"units": {"USD": copy.deepcopy(self.entries)}}}}}
+
+
+def refresh(client, tmp_path):
+    return asyncio.run(refresh_company(client, CIK, str(tmp_path)))
+
+
+def revenue_years(tmp_path):
+    records = pd.read_csv(dataset_path(str(tmp_path), CIK))
+    return dict(zip(records["Year"], records["Value"]))
+
+
+def test_new_filing_refreshes_once(tmp_path):
+    client = FakeClient()
+    client.file("a-2022", 2022)
+    assert refresh(client, tmp_path) == "full"
+    assert refresh(client, tmp_path) == "skipped"
+    client.file("a-2023", 2023)
+    assert refresh(client, tmp_path) == "incremental"
+    assert revenue_years(tmp_path) == {2022: 2022.0, 2023: 2023.0}
+    assert refresh(client, tmp_path) == "skipped"
+
+
+def test_lagging_companyfacts_keeps_filing_pending(tmp_path):
+    client = FakeClient()
+    client.file("a-2022", 2022)
+    assert refresh(client, tmp_path) == "full"
+
+    # indexed in submissions, facts not in companyfacts yet (or a stale cached copy served)
+    client.file("a-2023", 2023, with_facts=False)
+    assert refresh(client, tmp_path) == "pending"
+    assert refresh(client, tmp_path) == "pending"
+    assert load_watermark(str(tmp_path), CIK)["accessions"] == ["a-2022"]
+    assert revenue_years(tmp_path) == {2022: 2022.0}
+
+    client.publish("a-2023", 2023)
+    assert refresh(client, tmp_path) == "incremental"
+    assert revenue_years(tmp_path) == {2022: 2022.0, 2023: 2023.0}
+    assert load_watermark(str(tmp_path), CIK)["accessions"] == ["a-2022", "a-2023"]
+    assert refresh(client, tmp_path) == "skipped"
+
+
+def test_pending_filing_survives_a_later_filing(tmp_path):
+    client = FakeClient()
+    client.file("a-2022", 2022)
+    assert refresh(client, tmp_path) == "full"
+
+    # a-2023 is indexed without facts, then a-2024 arrives with facts and moves last_filed past it
+    client.file("a-2023", 2023, with_facts=False)
+    client.file("a-2024", 2024)
+    assert refresh(client, tmp_path) == "incremental"
+    watermark = load_watermark(str(tmp_path), CIK)
+    assert watermark["last_filed"] == "2025-02-20"
+    assert watermark["accessions"] == ["a-2022", "a-2024"] and watermark["pending"] == ["a-2023"]
+    assert refresh(client, tmp_path) == "pending"
+
+    client.publish("a-2023", 2023)
+    assert refresh(client, tmp_path) == "incremental"
+    assert revenue_years(tmp_path) == {2022: 2022.0, 2023: 2023.0, 2024: 2024.0}
+    watermark = load_watermark(str(tmp_path), CIK)
+    assert watermark["accessions"] == ["a-2022", "a-2023", "a-2024"] and watermark["pending"] == []
+    assert refresh(client, tmp_path) == "skipped"
+
+
+def test_first_run_only_records_filings_with_facts(tmp_path):
+    client = FakeClient()
+    client.file("a-2022", 2022)
+    client.file("a-2023", 2023, with_facts=False)
+    assert refresh(client, tmp_path) == "full"
+    assert load_watermark(str(tmp_path), CIK) == {"cik": CIK, "last_filed": "2023-02-20", "accessions": ["a-2022"],
+                                                  "pending": ["a-2023"]}
+
+    client.publish("a-2023", 2023)
+    assert refresh(client, tmp_path) == "incremental"
+    assert revenue_years(tmp_path) == {2022: 2022.0, 2023: 2023.0}
+
+
+def test_unavailable_companyfacts_writes_nothing(tmp_path):
+    client = FakeClient()
+    client.filings.append(("a-2022", "2023-02-20", "10-K"))
+    with pytest.raises(ValueError):
+        refresh(client, tmp_path)
+    assert load_watermark(str(tmp_path), CIK) is None
+
+
+def test_filings_before_the_first_run_without_facts_are_not_pending(tmp_path):
+    client = FakeClient()
+    client.file("a-2008", 2008, with_facts=False)   # pre-XBRL 10-K
+    client.file("a-2022", 2022)
+    assert refresh(client, tmp_path) == "full"
+    assert load_watermark(str(tmp_path), CIK)["pending"] == []
+    assert refresh(client, tmp_path) == "skipped"
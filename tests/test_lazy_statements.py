@@ -0,0 +1,51 @@
+import json
+
+import pandas as pd
+
+from concept_index import resolve_concepts
+from diagnostics import get_counters, reset_counters
+from edgar_cache import get_cache
+from lazy_statements import LazyStatements, column_facts, load_lazy_statements
+from MasterAnalysisFinal import build_master_frame
+from ratio_engine import RATIOS, add_ratios, ratio_inputs
+from statement_engine import extract_all_statements
+from synthetic_facts import make_company_facts
+from taxonomies import company_facts_view
+
+
+def scanned():
+    return sum(counts.get("facts_scanned", 0) for counts in get_counters().values())
+
+
+def test_columns_are_resolved_once_and_share_selections():
+    lazy = LazyStatements(company_facts_view(make_company_facts(cik=1, seed=1)))
+    reset_counters()
+    revenue = lazy["Revenue"]
+    after_concept = scanned()
+    assert after_concept > 0 and lazy.resolved() == ["Revenue"]
+    assert lazy["Revenue"] == revenue
+    # the master column reads the same (IS, Revenues, USD) selection as the concept's first tag
+    lazy["IS_Total Net Revenues"]
+    assert scanned() == after_concept
+    assert lazy.resolved() == ["Revenue", "IS_Total Net Revenues"]
+
+
+def test_lazy_values_match_the_full_extraction():
+    view = company_facts_view(make_company_facts(cik=2, seed=2))
+    lazy = LazyStatements(view)
+    expected = add_ratios(build_master_frame(extract_all_statements(view), resolve_concepts(view)))
+    ratios = lazy.ratios()
+    pd.testing.assert_frame_equal(ratios[list(RATIOS)], expected.reindex(index=ratios.index)[list(RATIOS)],
+                                  check_dtype=False, check_freq=False)
+    assert lazy.concept_values() == resolve_concepts(view)
+    assert set(lazy.resolved()) == set(ratio_inputs()) | set(lazy.concepts)
+
+
+def test_column_facts_decodes_only_what_the_columns_read():
+    wanted = column_facts(["Revenue"])
+    assert ("us-gaap", "Revenues") in wanted and ("us-gaap", "Assets") not in wanted
+    get_cache().store(601, json.dumps(make_company_facts(cik=601, seed=3)).encode(), {"ETag": '"v1"'})
+    lazy = load_lazy_statements(601, columns=["Revenue"])
+    assert set(lazy.facts) <= {tag for _, tag in wanted}
+    assert lazy["Revenue"]
+    assert lazy["BS_Total assets"] == {}
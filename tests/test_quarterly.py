@@ -0,0 +1,75 @@
+import math
+
+from fact_store import flatten_company_facts
+from quarterly import extract_quarterly, quarterly_frame
+
+REVENUE = "Total Net Revenues"
+EPS = "Earnings Per Share (Basic)"
+QUARTER_ENDS = {1: "03-31", 2: "06-30", 3: "09-30", 4: "12-31"}
+QUARTER_STARTS = {1: "01-01", 2: "04-01", 3: "07-01", 4: "10-01"}
+
+
+def entry(val, year, first, last, form="10-Q"):
+    """A duration fact from the start of quarter `first` to the end of quarter `last` of a calendar fiscal year."""
+    span = last - first + 1
+    fp = "FY" if span == 4 else f"Q{last}"
+    form = "10-K" if span == 4 else form
+    return {"val": val, "start": f"{year}-{QUARTER_STARTS[first]}", "end": f"{year}-{QUARTER_ENDS[last]}",
+            "fy": year, "fp": fp, "form": form, "filed": f"{year + (last == 4)}-{'02' if last == 4 else '11'}-15",
+            "accn": f"0000000001-{year % 100:02d}-{first}{last}"}
+
+
+def quarters(facts_by_tag):
+    """extract_quarterly rows of a one-company document, {(Item, Period): (Value, TTM)}."""
+    gaap = {tag: {"label": tag, "units": {unit: entries}} for tag, (unit, entries) in facts_by_tag.items()}
+    rows = extract_quarterly(flatten_company_facts({"cik": 7, "facts": {"us-gaap": gaap}}, 7))
+    return {(row.Item, row.Period): (row.Value, row.TTM) for row in rows.itertuples()}
+
+
+def annual_with_quarters(year, fy, q1, q2, q3):
+    return [entry(fy * 1e6, year, 1, 4), entry(q1 * 1e6, year, 1, 1), entry(q2 * 1e6, year, 2, 2),
+            entry(q3 * 1e6, year, 3, 3)]
+
+
+def test_q4_is_fy_minus_first_three_quarters_and_ttm_sums_four():
+    rows = quarters({"Revenues": ("USD", annual_with_quarters(2021, 1000, 100, 200, 300)
+                                  + annual_with_quarters(2022, 2000, 400, 500, 600))})
+    assert [rows[(REVENUE, f"2021Q{q}")][0] for q in (1, 2, 3, 4)] == [100, 200, 300, 400]
+    assert rows[(REVENUE, "2022Q4")][0] == 500
+    assert math.isnan(rows[(REVENUE, "2021Q3")][1])          # fewer than four quarters so far
+    assert rows[(REVENUE, "2021Q4")][1] == 1000               # TTM at Q4 is the fiscal year
+    assert rows[(REVENUE, "2022Q1")][1] == 200 + 300 + 400 + 400
+    assert rows[(REVENUE, "2022Q4")][1] == 2000
+
+
+def test_ytd_only_filer_is_differenced():
+    entries = [entry(100e6, 2022, 1, 1), entry(300e6, 2022, 1, 2), entry(600e6, 2022, 1, 3), entry(1000e6, 2022, 1, 4)]
+    rows = quarters({"Revenues": ("USD", entries)})
+    assert [rows[(REVENUE, f"2022Q{q}")][0] for q in (1, 2, 3, 4)] == [100, 200, 300, 400]
+    assert rows[(REVENUE, "2022Q4")][1] == 1000
+
+
+def test_missing_quarter_leaves_q4_and_ttm_missing():
+    # Q2 was never reported, neither discretely nor as a half-year figure
+    entries = [entry(1000e6, 2022, 1, 4), entry(100e6, 2022, 1, 1), entry(600e6, 2022, 1, 3), entry(300e6, 2022, 3, 3)]
+    rows = quarters({"Revenues": ("USD", entries)})
+    assert rows[(REVENUE, "2022Q1")][0] == 100 and rows[(REVENUE, "2022Q3")][0] == 300
+    assert (REVENUE, "2022Q2") not in rows and (REVENUE, "2022Q4") not in rows
+    assert all(math.isnan(ttm) for (item, _), (_, ttm) in rows.items() if item == REVENUE)
+
+
+def test_non_additive_units_are_not_derived_or_summed():
+    eps = [entry(4.0, 2022, 1, 4), entry(1.0, 2022, 1, 1), entry(0.9, 2022, 2, 2), entry(1.1, 2022, 3, 3),
+           entry(2.2, 2022, 1, 3)]
+    rows = quarters({"EarningsPerShareBasic": ("pure", eps)})
+    assert [rows[(EPS, f"2022Q{q}")][0] for q in (1, 2, 3)] == [1.0, 0.9, 1.1]
+    assert (EPS, "2022Q4") not in rows
+    assert all(math.isnan(ttm) for _, ttm in rows.values())
+
+
+def test_quarterly_frame_has_one_column_per_period():
+    facts = flatten_company_facts({"cik": 7, "facts": {"us-gaap": {
+        "Revenues": {"label": "Revenues", "units": {"USD": annual_with_quarters(2022, 1000, 100, 200, 300)}}}}}, 7)
+    frame = quarterly_frame(extract_quarterly(facts), "IS")
+    assert list(frame.columns) == ["Category", "Item", "2022Q1", "2022Q2", "2022Q3", "2022Q4"]
+    assert frame.iloc[0, 2:].tolist() == [100.0, 200.0, 300.0, 400.0]
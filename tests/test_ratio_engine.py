@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from ratio_engine import RatioGraph
+
+
+def panel():
+    return pd.DataFrame({"NetIncome": [10.0, 20.0], "TotalAssets": [100.0, 0.0], "Equity": [50.0, 40.0]})
+
+
+def test_redefined_ratio_is_not_read_from_shared_memo():
+    graph = RatioGraph({})
+    memo = {}
+    graph.add("Calc_ROA", {"NetIncome": 1}, {"TotalAssets": 1})
+    first = graph.evaluate(panel(), memo=memo)
+    assert first["Calc_ROA"].iloc[0] == 0.1 and np.isnan(first["Calc_ROA"].iloc[1])
+
+    graph.add("Calc_ROA", {"NetIncome": 1}, {"Equity": 1})
+    assert graph.evaluate(panel(), memo=memo)["Calc_ROA"].tolist() == [0.2, 0.5]
+    assert len([node for node in graph.nodes if node[0] == "ratio"]) == 1
+
+
+def test_shared_sides_are_one_node():
+    graph = RatioGraph({})
+    graph.add("A", {"NetIncome": 1}, {"TotalAssets": 1, "Equity": 1})
+    graph.add("B", {"Equity": 1}, {"Equity": 1, "TotalAssets": 1})
+    assert graph.nodes[graph.ratios["A"]][1] == graph.nodes[graph.ratios["B"]][1]
+    assert len([node for node in graph.nodes if node[0] == "sum"]) == 1
+    memo = {}
+    graph.evaluate(panel(), ["A"], memo)
+    computed = set(memo)
+    graph.evaluate(panel(), ["B"], memo)
+    assert set(memo) - computed == {graph.ratios["B"]}
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ratio_engine import CASH, CURRENT_ASSETS, CURRENT_LIABILITIES, RECEIVABLES, SECURITIES, compute_ratios
+from stress_scenarios import StressCube, scenario_grid, stress_test
+
+
+@pytest.fixture
+def panel():
+    index = pd.MultiIndex.from_tuples([("0000000001", 2022), ("0000000001", 2023), ("0000000002", 2023),
+                                       ("0000000003", 2023)], names=["CIK", "Year"])
+    return pd.DataFrame({
+        CASH: [10.0, 12.0, 5.0, 8.0],
+        RECEIVABLES: [20.0, 18.0, np.nan, 4.0],      # company 2 reports no receivables
+        SECURITIES: [30.0, 25.0, 7.0, 0.0],
+        CURRENT_ASSETS: [90.0, 80.0, 20.0, 15.0],
+        CURRENT_LIABILITIES: [40.0, 50.0, 10.0, 0.0],  # company 3: zero liabilities
+    }, index=index)
+
+
+def shocked(panel, securities_haircut=0.0, receivables_writedown=0.0, liability_increase=0.0):
+    """The panel with one scenario applied to its lines."""
+    receivables_loss = panel[RECEIVABLES].fillna(0) * receivables_writedown
+    securities_loss = panel[SECURITIES].fillna(0) * securities_haircut
+    return panel.assign(**{
+        RECEIVABLES: panel[RECEIVABLES] * (1 - receivables_writedown),
+        SECURITIES: panel[SECURITIES] * (1 - securities_haircut),
+        CURRENT_ASSETS: panel[CURRENT_ASSETS] - receivables_loss - securities_loss,
+        CURRENT_LIABILITIES: panel[CURRENT_LIABILITIES] * (1 + liability_increase),
+    })
+
+
+def test_broadcast_matches_ratios_of_shocked_panels(panel):
+    cube = stress_test(panel)
+    assert cube.shape == (2, len(panel), len(scenario_grid()))
+    for _, scenario in scenario_grid().iterrows():
+        shocks = scenario.to_dict()
+        expected = compute_ratios(shocked(panel, **shocks))
+        pd.testing.assert_series_equal(cube.sel("quick", **shocks), expected["Calc_Quick_Ratio_Base"],
+                                       check_names=False)
+        pd.testing.assert_series_equal(cube.sel("current", **shocks), expected["Calc_Current_Ratio"],
+                                       check_names=False)
+
+
+def test_grid_points_reproduce_the_stress_columns(panel):
+    cube = stress_test(panel)
+    ratios = compute_ratios(panel)
+    for haircut, column in ((0.10, "Calc_Stress_Quick_10pct"), (0.25, "Calc_Stress_Quick_25pct")):
+        np.testing.assert_allclose(cube.sel("quick", securities_haircut=haircut), ratios[column])
+    with pytest.raises(KeyError):
+        cube.sel("quick", securities_haircut=0.33)
+
+
+@pytest.mark.parametrize("by_year", [False, True])
+def test_save_load_round_trip(panel, tmp_path, by_year):
+    if by_year:
+        panel = panel.xs("0000000001", level="CIK")
+    cube = stress_test(panel, scenario_grid(liability_increase=[0.0, 0.5]))
+    path = str(tmp_path / "cube.npz")
+    cube.save(path)
+    loaded = StressCube.load(path)
+    np.testing.assert_array_equal(loaded.values, cube.values)
+    pd.testing.assert_index_equal(loaded.index, cube.index, exact=False)
+    pd.testing.assert_frame_equal(loaded.scenarios, cube.scenarios)
+    assert loaded.ratios == cube.ratios
+    pd.testing.assert_frame_equal(loaded.to_long(), cube.to_long(), check_dtype=False)
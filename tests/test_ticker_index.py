@@ -0,0 +1,79 @@
+import json
+import time
+
+import pytest
+import requests
+
+import ticker_index
+from ticker_index import TickerIndex, load_ticker_file, meta_path, resolve_cik
+
+TICKERS = {
+    "0": {"cik_str": 1045810, "ticker": "NVDA", "title": "NVIDIA CORP"},
+    "1": {"cik_str": 2488, "ticker": "AMD", "title": "ADVANCED MICRO DEVICES INC"},
+    "2": {"cik_str": 1067983, "ticker": "BRK-B", "title": "BERKSHIRE HATHAWAY INC"},
+    "3": {"cik_str": 1067983, "ticker": "BRK-A", "title": "BERKSHIRE HATHAWAY INC"},
+    "4": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+    "5": {"cik_str": 1418091, "ticker": "APLE", "title": "Apple Hospitality REIT, Inc."},
+    "6": {"cik_str": 1000001, "ticker": "APIH", "title": "APPLE INC HOLDINGS"},
+}
+
+
+class FakeResponse:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self.content = json.dumps(data).encode() if data is not None else b""
+        self.headers = {"ETag": '"t1"'}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+@pytest.fixture
+def index():
+    return TickerIndex.from_sec(TICKERS)
+
+
+def test_resolve_by_ticker_cik_and_name(index):
+    assert index.resolve("nvda") == "0001045810"
+    assert index.resolve("brk.b") == "0001067983"
+    assert index.resolve("CIK2488") == "0000002488"
+    assert index.resolve("advanced micro") == "0000002488"
+    assert index.resolve("Berkshire") == "0001067983"        # one company, two share classes
+    assert index.resolve("apple inc") == "0000320193"         # exact name beats the longer prefix match
+    assert [c["ticker"] for c in index.by_cik(1067983)] == ["BRK-B", "BRK-A"]
+
+
+def test_ambiguous_or_unknown_names_raise(index):
+    with pytest.raises(KeyError, match="matches 3 companies"):
+        index.resolve("apple")
+    with pytest.raises(KeyError, match="No company"):
+        index.resolve("zzz")
+
+
+def test_plain_cik_needs_no_index(monkeypatch):
+    monkeypatch.setattr(ticker_index, "get_ticker_index", lambda refresh=False: pytest.fail("index loaded"))
+    assert resolve_cik("320193") == "0000320193"
+
+
+def test_stale_copy_is_used_when_sec_is_unreachable(tmp_path, monkeypatch):
+    path = str(tmp_path / "company_tickers.json")
+    monkeypatch.setattr(ticker_index.requests, "get", lambda *a, **k: FakeResponse(200, TICKERS))
+    assert load_ticker_file(path) == TICKERS
+
+    with open(meta_path(path), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["fetched_at"] = time.time() - 2 * ticker_index.TICKER_TTL_SECONDS
+    with open(meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    def unreachable(*args, **kwargs):
+        assert kwargs["headers"]["If-None-Match"] == '"t1"'
+        raise requests.ConnectionError("offline")
+    monkeypatch.setattr(ticker_index.requests, "get", unreachable)
+    assert load_ticker_file(path) == TICKERS
+
+
+def test_no_copy_and_no_sec_is_an_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(ticker_index.requests, "get", lambda *a, **k: FakeResponse(503))
+    with pytest.raises(RuntimeError):
+        load_ticker_file(str(tmp_path / "company_tickers.json"))